@@ -0,0 +1,84 @@
+"""
+Recall@k (against exact flat search), QPS and memory for each FAISS index type.
+
+By default it uses random normalized vectors; pass --vectors embeddings.npy
+(e.g. dumped catalog or listing embeddings) for realistic recall numbers.
+
+    python benchmarks/ann_bench.py --n 200000 --k 10
+    python benchmarks/ann_bench.py --vectors listing_vectors.npy --nprobe 8 32 --ef-search 32 128
+"""
+import argparse
+import sys
+import time
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.vector_index import IndexConfig, build_index, search_params, index_memory_bytes, normalize  # noqa: E402
+
+
+def load_data(args, rng):
+    if args.vectors:
+        data = normalize(np.load(args.vectors))
+        rng.shuffle(data)
+        return data[args.queries:], data[:args.queries]
+    data = normalize(rng.standard_normal((args.n + args.queries, args.dim), dtype="float32"))
+    return data[args.queries:], data[:args.queries]
+
+
+def run(config: IndexConfig, base: np.ndarray, queries: np.ndarray, k: int, truth: np.ndarray):
+    start = time.perf_counter()
+    index = build_index(base.shape[1], config, train_vectors=base[: max(config.min_train_size, 1)])
+    index.add_with_ids(base, np.arange(len(base), dtype="int64"))
+    build_s = time.perf_counter() - start
+
+    params = search_params(index, config)
+    start = time.perf_counter()
+    _, labels = index.search(queries, k, params=params)
+    search_s = time.perf_counter() - start
+
+    recall = np.mean([len(set(found) & set(expected)) / k for found, expected in zip(labels, truth)])
+    return recall, len(queries) / search_s, index_memory_bytes(index), build_s
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1_000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--vectors", help=".npy file of embeddings to use instead of random data")
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 64])
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[32, 64, 128])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    base, queries = load_data(args, rng)
+    print(f"{len(base):,} vectors x {base.shape[1]} dims, {len(queries)} queries, k={args.k}\n")
+
+    flat = IndexConfig(kind="flat")
+    flat_index = build_index(base.shape[1], flat)
+    flat_index.add_with_ids(base, np.arange(len(base), dtype="int64"))
+    _, truth = flat_index.search(queries, args.k)
+    del flat_index
+
+    configs = [("flat", flat)]
+    ivfpq = IndexConfig(kind="ivfpq", nlist=args.nlist, pq_m=args.pq_m)
+    configs += [(f"ivfpq nprobe={p}", replace(ivfpq, nprobe=p)) for p in args.nprobe]
+    hnsw = IndexConfig(kind="hnsw", hnsw_m=args.hnsw_m)
+    configs += [(f"hnsw ef_search={ef}", replace(hnsw, ef_search=ef)) for ef in args.ef_search]
+
+    print(f"{'index':<22}{'recall@k':>10}{'QPS':>12}{'memory MB':>12}{'build s':>10}")
+    for name, config in configs:
+        recall, qps, memory, build_s = run(config, base, queries, args.k, truth)
+        print(f"{name:<22}{recall:>10.3f}{qps:>12,.0f}{memory / 2**20:>12.1f}{build_s:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
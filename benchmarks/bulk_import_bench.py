@@ -0,0 +1,75 @@
+"""
+Bulk import throughput against the configured database.
+
+Generates synthetic NDJSON listings for existing brand/model pairs, runs them through
+the same importer as POST /cars/used/bulk at several chunk sizes and reports rows/s.
+Inserted rows are deleted afterwards unless --keep is given.
+
+    python benchmarks/bulk_import_bench.py --seller-id 1 --rows 10000 --chunk-sizes 100 1000 5000
+"""
+import argparse
+import io
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import delete  # noqa: E402
+from database import SessionLocal  # noqa: E402
+from models import Brand, Model, Car  # noqa: E402
+from services.bulk_import import import_used_cars, iter_ndjson  # noqa: E402
+from services.stats import count_deleted  # noqa: E402
+
+FUELS = ["Petrol", "Diesel", "Hybrid", "Electric"]
+TRANSMISSIONS = ["Manual", "Automatic"]
+
+
+def make_body(pairs, rows: int) -> str:
+    lines = []
+    for _ in range(rows):
+        brand, model = random.choice(pairs)
+        lines.append(json.dumps({
+            "brand_name": brand, "model_name": model,
+            "year": random.randint(2005, 2025), "mileage": random.randint(0, 250_000),
+            "transmission": random.choice(TRANSMISSIONS), "fuel_type": random.choice(FUELS),
+            "horsepower": random.randint(70, 400), "price": round(random.uniform(3_000, 90_000), 2),
+            "location": "Benchmark", "description": "Synthetic listing",
+        }))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seller-id", type=int, required=True)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        pairs = db.query(Brand.name, Model.name).join(Model, Model.brand_id == Brand.id).all()
+        if not pairs:
+            sys.exit("No brand/model pairs in the database")
+        body = make_body(pairs, args.rows)
+        print(f"{args.rows} rows, {len(body) / 2**20:.1f} MB NDJSON, {len(pairs)} brand/model pairs\n")
+
+        for chunk_size in args.chunk_sizes:
+            start = time.perf_counter()
+            result = import_used_cars(db, args.seller_id, iter_ndjson(io.StringIO(body)), chunk_size=chunk_size)
+            elapsed = time.perf_counter() - start
+            print(f"chunk={chunk_size:<6} {len(result.inserted_ids) / elapsed:8.0f} rows/s  "
+                  f"{elapsed:6.2f} s  inserted={len(result.inserted_ids)} failed={result.failed}")
+            if not args.keep and result.inserted_ids:
+                # Core delete (no after_flush listener): take the rows back out of the stats counters too
+                deleted = db.execute(
+                    delete(Car).where(Car.id.in_(result.inserted_ids)).returning(Car.seller_id, Car.price, Car.posted_at)
+                ).all()
+                count_deleted(db, Car, deleted)
+                db.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Runs EXPLAIN (ANALYZE, BUFFERS) on the query behind each endpoint and flags sequential
+scans that read more than --min-rows rows. Small reference tables (brands, models, ...)
+are scanned whole on purpose and stay under the threshold.
+
+Needs a migrated database (`alembic upgrade head`) with seed.sql loaded. --seed adds a
+synthetic dataset scaled to --cars listings first (sellers, dealers, versions, conversations,
+messages, AI chats, auctions, bids); --drop-seed removes it again. Exits with status 1 when
+any query is flagged, so it can gate CI.
+
+    python benchmarks/explain_audit.py --seed --cars 50000
+    python benchmarks/explain_audit.py --verbose
+    python benchmarks/explain_audit.py --drop-seed
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import asc, desc, func, insert, literal, or_, select, text, Integer  # noqa: E402
+from database import SessionLocal  # noqa: E402
+from models import (  # noqa: E402
+    AIConversation, AIMessage, Auction, AuctionStatus, Bid, Brand, Car, CarFeature, Category, Conversation,
+    Dealer, Feature, Message, Model, StatsCounter, User, UserRole, Version,
+)
+from routers.used_cars import used_car_list_query  # noqa: E402
+from routers.new_cars import VERSION_LIST_COLUMNS  # noqa: E402
+from routers.dealers import DEALER_COLUMNS, DEALER_META_COLUMNS, VERSION_COLUMNS  # noqa: E402
+from services.stats import reconcile  # noqa: E402
+
+SEED_EMAIL_DOMAIN = "explain.seed"
+TABLES = ["users", "cars", "car_category_map", "car_features", "versions", "dealers_meta", "conversations",
+          "messages", "ai_conversations", "ai_messages", "auctions", "bids", "stats_counters"]
+
+
+# --- Synthetic dataset ---
+def seed(db, cars: int) -> None:
+    model_ids = [id for (id,) in db.query(Model.id)]
+    category_ids = [id for (id,) in db.query(Category.id)]
+    feature_ids = [id for (id,) in db.query(Feature.id)]
+    if not model_ids or not category_ids or not feature_ids:
+        sys.exit("Load seed.sql first: models, categories and features are needed")
+
+    stamp = datetime.utcnow().strftime("%H%M%S")  # lets --seed run twice without email or version name clashes
+
+    def users(role: UserRole, n: int):
+        rows = [{"email": f"{role.value}{i}@{stamp}.{SEED_EMAIL_DOMAIN}", "hashed_password": "!", "role": role,
+                 "full_name": f"Seed {role.value} {i}", "is_active": True} for i in range(n)]
+        return db.execute(insert(User).returning(User.id, sort_by_parameter_order=True), rows).scalars().all()
+
+    seller_ids = users(UserRole.seller, max(cars // 10, 1))
+    dealer_ids = users(UserRole.dealer, max(cars // 100, 1))
+    params = {"models": model_ids, "sellers": seller_ids, "dealers": dealer_ids, "categories": category_ids,
+              "features": feature_ids, "n": cars, "stamp": stamp}
+
+    def pick(name: str, index: str) -> str:
+        """SQL for params[name][index % len] (1-based Postgres array subscript)."""
+        return f"(CAST(:{name} AS int[]))[1 + ({index}) % {len(params[name])}]"
+
+    statements = [
+        # Listings spread over the last ~year
+        f"""INSERT INTO "CarPlace".cars (model_id, seller_id, year, mileage, transmission, fuel_type, horsepower,
+               price, location, description, posted_at, updated_at)
+           SELECT {pick("models", "g")}, {pick("sellers", "g * 7")}, 2005 + g % 20, (g * 37) % 250000,
+                  CASE WHEN g % 3 = 0 THEN 'Manual' ELSE 'Automatic' END,
+                  (ARRAY['Diesel', 'Petrol', 'Hybrid', 'Electric'])[1 + g % 4], 70 + g % 250,
+                  5000 + (g * 131) % 90000, 'Tunis', 'Seeded listing',
+                  now() - make_interval(mins => g * 10), now() - make_interval(mins => g * 5)
+           FROM generate_series(1, :n) g""",
+        f"""INSERT INTO "CarPlace".car_category_map (car_id, category_id)
+           SELECT c.id, {pick("categories", "c.id")} FROM "CarPlace".cars c
+           WHERE c.seller_id = ANY(CAST(:sellers AS int[])) ON CONFLICT DO NOTHING""",
+        f"""INSERT INTO "CarPlace".car_features (car_id, feature_id)
+           SELECT c.id, {pick("features", "c.id + k * 7")} FROM "CarPlace".cars c, generate_series(0, 5) k
+           WHERE c.seller_id = ANY(CAST(:sellers AS int[])) ON CONFLICT DO NOTHING""",
+        """INSERT INTO "CarPlace".dealers_meta (user_id, name, location, contact)
+           SELECT d, 'Seed showroom ' || d, 'Tunis', '+216 00 000 000' FROM unnest(CAST(:dealers AS int[])) d""",
+        f"""INSERT INTO "CarPlace".versions (model_id, dealer_id, name, year, transmission, fuel_type, horsepower, price, updated_at)
+           SELECT {pick("models", "g")}, {pick("dealers", "g")}, 'Seed ' || :stamp || ' ' || g, 2020 + g % 6,
+                  'Automatic', 'Petrol', 90 + g % 200, 20000 + (g * 97) % 150000, now()
+           FROM generate_series(1, GREATEST(:n / 4, 1)) g""",
+        # One buyer conversation on every 4th listing, 10 messages each
+        f"""INSERT INTO "CarPlace".conversations (used_car_id, buyer_id, owner_id, created_at, last_message_at)
+           SELECT c.id, {pick("sellers", "c.id * 13")}, c.seller_id, c.posted_at, c.posted_at + interval '10 minutes'
+           FROM "CarPlace".cars c
+           WHERE c.seller_id = ANY(CAST(:sellers AS int[])) AND c.id % 4 = 0 ON CONFLICT DO NOTHING""",
+        """INSERT INTO "CarPlace".messages (conversation_id, sender_id, body, sent_at)
+           SELECT v.id, CASE WHEN k % 2 = 0 THEN v.buyer_id ELSE v.owner_id END, 'Seeded message ' || k,
+                  v.created_at + make_interval(mins => k)
+           FROM "CarPlace".conversations v, generate_series(1, 10) k
+           WHERE v.owner_id = ANY(CAST(:sellers AS int[]))""",
+        """INSERT INTO "CarPlace".ai_conversations (user_id, used_car_id, created_at)
+           SELECT c.seller_id, c.id, c.posted_at FROM "CarPlace".cars c
+           WHERE c.seller_id = ANY(CAST(:sellers AS int[])) AND c.id % 5 = 0""",
+        """INSERT INTO "CarPlace".ai_messages (ai_conversation_id, role, content, sent_at)
+           SELECT a.id, CASE WHEN k % 2 = 0 THEN 'assistant' ELSE 'user' END, 'Seeded AI message', a.created_at + make_interval(mins => k)
+           FROM "CarPlace".ai_conversations a, generate_series(1, 6) k
+           WHERE a.user_id = ANY(CAST(:sellers AS int[]))""",
+        """INSERT INTO "CarPlace".auctions (vehicle_id, starting_bid, reserve_price, duration, status, created_at, ends_at)
+           SELECT v.id, v.price * 0.7, v.price * 0.9, 1440,
+                  CAST((ARRAY['pending', 'active', 'closed'])[1 + v.id % 3] AS "CarPlace".auctionstatus),
+                  now() - make_interval(hours => v.id % 48), now() + make_interval(hours => v.id % 48 - 24)
+           FROM "CarPlace".versions v WHERE v.dealer_id = ANY(CAST(:dealers AS int[]))""",
+        f"""INSERT INTO "CarPlace".bids (auction_id, user_id, amount, created_at)
+           SELECT a.id, {pick("sellers", "a.id + k")}, a.starting_bid + k * 100, a.created_at + make_interval(mins => k)
+           FROM "CarPlace".auctions a JOIN "CarPlace".versions v ON v.id = a.vehicle_id, generate_series(1, 5) k
+           WHERE v.dealer_id = ANY(CAST(:dealers AS int[]))""",
+    ]
+    for statement in statements:
+        db.execute(text(statement), params)
+    db.commit()
+    reconcile(db)  # raw SQL bypasses the stats counters
+    analyze(db)
+    print(f"[explain_audit] Seeded {cars} listings, {len(seller_ids)} sellers, {len(dealer_ids)} dealers")
+
+
+def drop_seed(db) -> None:
+    seeded = select(User.id).where(User.email.like(f"%.{SEED_EMAIL_DOMAIN}"))
+    versions = select(Version.id).where(Version.dealer_id.in_(seeded))
+    auctions = select(Auction.id).where(Auction.vehicle_id.in_(versions))
+    # bids and auctions have no ON DELETE CASCADE; everything else cascades from users
+    db.query(Bid).filter(or_(Bid.user_id.in_(seeded), Bid.auction_id.in_(auctions))).delete(synchronize_session=False)
+    db.query(Auction).filter(Auction.id.in_(auctions)).delete(synchronize_session=False)
+    deleted = db.query(User).filter(User.email.like(f"%.{SEED_EMAIL_DOMAIN}")).delete(synchronize_session=False)
+    db.commit()
+    reconcile(db)
+    analyze(db)
+    print(f"[explain_audit] Removed {deleted} seeded users and their data")
+
+
+def analyze(db) -> None:
+    for table in TABLES:
+        db.execute(text(f'ANALYZE "CarPlace".{table}'))
+    db.commit()
+
+
+# --- Endpoint queries (mirroring the routers) ---
+def sample_ids(db) -> dict:
+    def busiest(column, *filters):
+        return db.query(column).filter(*filters).group_by(column).order_by(func.count().desc()).limit(1).scalar()
+
+    conversation_id = busiest(Message.conversation_id)
+    return {
+        "seller": busiest(Car.seller_id),
+        "dealer": busiest(Version.dealer_id),
+        "user": busiest(Conversation.buyer_id),
+        "car": db.query(func.max(Car.id)).scalar(),
+        "feature_ids": [id for (id,) in db.query(CarFeature.feature_id).group_by(CarFeature.feature_id).order_by(func.count().desc()).limit(2)],
+        "conversation": conversation_id,
+        "conversation_ids": [id for (id,) in db.query(Conversation.id).order_by(Conversation.last_message_at.desc()).limit(50)],
+        "ai_conversation": busiest(AIMessage.ai_conversation_id),
+        "ai_user": busiest(AIConversation.user_id),
+        "auction": busiest(Bid.auction_id),
+    }
+
+
+def endpoint_queries(db, ids: dict) -> dict:
+    since = datetime.utcnow() - timedelta(days=1)
+    return {
+        "GET /cars/used (posted_at desc)": used_car_list_query(db).order_by(desc(Car.posted_at)).limit(20),
+        "GET /cars/used?order_by=price": used_car_list_query(db).order_by(asc(Car.price)).limit(20),
+        "GET /cars/used?brand=&model=": used_car_list_query(db).filter(
+            Brand.name.ilike("%peugeot%"), Model.name.ilike("%208%")).order_by(desc(Car.posted_at)).limit(20),
+        "GET /cars/used/{id}": used_car_list_query(db).filter(Car.id == ids["car"]),
+        "GET /cars/used?features=a&features=b (all)": used_car_list_query(db).filter(
+            Car.feature_ids.contains(ids["feature_ids"])).order_by(desc(Car.posted_at)).limit(20),
+        "GET /cars/used?features=a&features=b (any)": used_car_list_query(db).filter(
+            Car.feature_ids.overlap(ids["feature_ids"])).order_by(desc(Car.posted_at)).limit(20),
+        "GET /cars/used/mine": used_car_list_query(db).filter(Car.seller_id == ids["seller"]).order_by(Car.id).limit(20),
+        "GET /cars/used/stats/mine": db.query(StatsCounter).filter(StatsCounter.scope == "cars", StatsCounter.owner_id == ids["seller"]),
+        "GET /cars/used/export?since": db.query(Car.id, Car.price).filter(Car.updated_at > since).order_by(Car.id),
+        "GET /cars/new (name asc)": db.query(*VERSION_LIST_COLUMNS).select_from(Version).join(
+            Model, Version.model_id == Model.id).join(Brand, Model.brand_id == Brand.id).order_by(asc(Version.name)).limit(20),
+        "GET /cars/new/mine": db.query(*VERSION_LIST_COLUMNS).filter(Version.dealer_id == ids["dealer"]).order_by(Version.id).limit(20),
+        "GET /cars/new/stats/mine": db.query(StatsCounter).filter(StatsCounter.scope == "versions", StatsCounter.owner_id == ids["dealer"]),
+        "GET /admin/stats": db.query(StatsCounter.scope, StatsCounter.row_count).filter(
+            StatsCounter.scope.in_(["brands", "models", "categories", "versions", "users"]), StatsCounter.owner_id == 0),
+        "GET /dealers?include_meta": db.query(*DEALER_COLUMNS, *DEALER_META_COLUMNS).select_from(User).outerjoin(
+            Dealer, Dealer.user_id == User.id).filter(User.role == UserRole.dealer, User.is_active == True).order_by(asc(User.full_name)).limit(20),
+        "GET /dealers/{id}/cars": db.query(*VERSION_COLUMNS).filter(Version.dealer_id == ids["dealer"]).order_by(Version.id).limit(20),
+        "GET /conversations": db.query(Conversation).filter(
+            (Conversation.buyer_id == ids["user"]) | (Conversation.owner_id == ids["user"])).order_by(Conversation.last_message_at.desc()),
+        "conversation last messages (DISTINCT ON)": db.query(Message).filter(Message.conversation_id.in_(ids["conversation_ids"])).distinct(
+            Message.conversation_id).order_by(Message.conversation_id, Message.sent_at.desc()),
+        "GET /conversations/{id} messages": db.query(Message).filter(Message.conversation_id == ids["conversation"]).order_by(Message.sent_at),
+        "POST /conversations (existing check)": db.query(Conversation).filter(
+            Conversation.used_car_id == ids["car"], Conversation.buyer_id == ids["user"]),
+        "POST /chat (conversation upsert lookup)": db.query(AIConversation.id).filter(
+            AIConversation.user_id == ids["ai_user"], AIConversation.used_car_id.is_not_distinct_from(literal(ids["car"], Integer))).limit(1),
+        "POST /chat (history)": db.query(AIMessage).filter(AIMessage.ai_conversation_id == ids["ai_conversation"]).order_by(AIMessage.sent_at.asc()),
+        "GET /chat/conversations": db.query(AIConversation).filter(AIConversation.user_id == ids["ai_user"]),
+        "auction bids": db.query(Bid).filter(Bid.auction_id == ids["auction"]).order_by(Bid.created_at),
+        "active auctions ending soon": db.query(Auction).filter(Auction.status == AuctionStatus.active, Auction.ends_at < datetime.utcnow() + timedelta(hours=1)),
+        "rollup listings window": db.query(Car.model_id, func.count()).filter(Car.posted_at > since).group_by(Car.model_id),
+        "rollup auctions window": db.query(func.count()).select_from(Auction).filter(Auction.ends_at > since),
+        "rollup messages window": db.query(func.count()).select_from(Message).filter(Message.sent_at > since),
+        "DELETE /admin/users/{id} (listing ids)": db.query(Car.id).filter(Car.seller_id == ids["seller"]),
+    }
+
+
+# --- Plan analysis ---
+def walk(node):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from walk(child)
+
+
+def seq_scans(plan: dict, min_rows: int):
+    """(relation, rows read) for every Seq Scan reading at least `min_rows` rows across its loops."""
+    for node in walk(plan):
+        if node["Node Type"] != "Seq Scan":
+            continue
+        read = (node.get("Actual Rows", 0) + node.get("Rows Removed by Filter", 0)) * node.get("Actual Loops", 1)
+        if read >= min_rows:
+            yield node["Relation Name"], int(read)
+
+
+def explain(db, query) -> dict:
+    sql = str(query.statement.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True}))
+    raw = db.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")).scalar()
+    db.rollback()
+    return (json.loads(raw) if isinstance(raw, str) else raw)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", action="store_true", help="insert a synthetic dataset before auditing")
+    parser.add_argument("--cars", type=int, default=50_000, help="listings to seed (other tables scale with it)")
+    parser.add_argument("--drop-seed", action="store_true", help="remove the synthetic dataset and exit")
+    parser.add_argument("--min-rows", type=int, default=1000, help="flag sequential scans reading at least this many rows")
+    parser.add_argument("--verbose", action="store_true", help="print the text plan of flagged queries")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.drop_seed:
+            return drop_seed(db)
+        if args.seed:
+            seed(db, args.cars)
+
+        ids = sample_ids(db)
+        flagged = 0
+        print(f"{'query':<44} {'ms':>8}  sequential scans (>= {args.min_rows} rows)")
+        for name, query in endpoint_queries(db, ids).items():
+            result = explain(db, query)
+            scans = list(seq_scans(result["Plan"], args.min_rows))
+            flagged += bool(scans)
+            detail = ", ".join(f"{relation} ({rows} rows)" for relation, rows in scans) or "-"
+            print(f"{name:<44} {result['Execution Time']:8.2f}  {'SEQ SCAN ' if scans else ''}{detail}")
+            if scans and args.verbose:
+                sql = str(query.statement.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True}))
+                for (line,) in db.execute(text(f"EXPLAIN ANALYZE {sql}")):
+                    print(f"    {line}")
+                db.rollback()
+
+    print(f"\n{flagged} flagged quer{'y' if flagged == 1 else 'ies'}")
+    sys.exit(1 if flagged else 0)
+
+
+if __name__ == "__main__":
+    main()
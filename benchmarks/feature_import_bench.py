@@ -0,0 +1,52 @@
+"""
+Import time and RSS of `main` per CARPLACE_FEATURES set, each in a fresh interpreter:
+core alone, core plus each optional feature, and everything. The difference to the core
+row is what a feature costs a worker (torch/sentence-transformers/faiss for ai,
+pytesseract/Pillow for ocr).
+
+    python benchmarks/feature_import_bench.py --repeat 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+from services.features import feature_report, rss_mb
+print(json.dumps({"import_s": elapsed, "rss_mb": rss_mb(), "features": feature_report}))
+"""
+
+FEATURE_SETS = ["core", "core,auction", "core,ocr", "core,ai", "core,auction,ai,ocr"]
+
+
+def probe(features: str) -> dict:
+    env = {**os.environ, "CARPLACE_FEATURES": features}
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'CARPLACE_FEATURES':<22} {'import ms':>10} {'RSS MB':>8}   per feature (ms / MB, in registration order)")
+    for features in FEATURE_SETS:
+        runs = [probe(features) for _ in range(args.repeat)]
+        import_ms = statistics.median(r["import_s"] for r in runs) * 1000
+        rss = statistics.median(r["rss_mb"] for r in runs)
+        detail = ", ".join(f"{name} {e['import_ms']:.0f}/{e['rss_mb']:.0f}" for name, e in runs[-1]["features"].items())
+        print(f"{features:<22} {import_ms:10.0f} {rss:8.0f}   {detail}")
+
+
+if __name__ == "__main__":
+    main()
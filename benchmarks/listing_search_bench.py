@@ -0,0 +1,75 @@
+"""
+Query latency of the used-car listing vector index at catalog scale.
+
+Uses random normalized vectors instead of real embeddings so the numbers
+isolate index cost (embedding a query adds ~5-15 ms on CPU).
+
+    python benchmarks/listing_search_bench.py --sizes 100000 1000000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.listing_search import ListingIndex, EMBEDDING_DIM  # noqa: E402
+
+FUELS = ["diesel", "petrol", "hybrid", "electric"]
+
+
+def build(n: int, rng: np.random.Generator, batch: int = 100_000) -> ListingIndex:
+    index = ListingIndex(EMBEDDING_DIM)
+    for start in range(0, n, batch):
+        size = min(batch, n - start)
+        vectors = rng.standard_normal((size, EMBEDDING_DIM), dtype="float32")
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        index.add(
+            np.arange(start + 1, start + size + 1),
+            vectors,
+            rng.uniform(3_000, 80_000, size),
+            rng.integers(2000, 2026, size),
+            rng.choice(FUELS, size),
+        )
+    return index
+
+
+def measure(index: ListingIndex, queries: np.ndarray, k: int, **filters):
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q, k=k, **filters)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings = np.asarray(timings)
+    return np.percentile(timings, 50), np.percentile(timings, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    scenarios = {
+        "no filter": {},
+        "price <= 15000": {"max_price": 15_000},
+        "diesel, year >= 2018": {"fuel_type": "diesel", "min_year": 2018},
+    }
+
+    for n in args.sizes:
+        start = time.perf_counter()
+        index = build(n, rng)
+        print(f"\n{n:,} listings (built in {time.perf_counter() - start:.1f}s)")
+        queries = rng.standard_normal((args.queries, EMBEDDING_DIM), dtype="float32")
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        for name, filters in scenarios.items():
+            p50, p95 = measure(index, queries, args.k, **filters)
+            print(f"  {name:<24} p50={p50:7.2f} ms  p95={p95:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
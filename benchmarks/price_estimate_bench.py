@@ -0,0 +1,97 @@
+"""
+Latency of /cars/used/estimate's in-memory kNN at catalog scale (no database: synthetic listings
+spread over models with a long-tailed size distribution, as in the real catalog).
+
+    python benchmarks/price_estimate_bench.py --listings 100000 1000000 --batch 100
+"""
+import argparse
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.price_estimator import EstimateQuery, PriceEstimator  # noqa: E402
+
+FUELS = ["diesel", "petrol", "hybrid", "electric"]
+GEARBOXES = ["manual", "automatic"]
+Row = namedtuple("Row", "id model_id year mileage horsepower fuel_type transmission price")
+
+
+def synthetic_rows(n: int, models: int, rng: np.random.Generator, start_id: int = 1):
+    popularity = np.arange(1, models + 1) ** -0.8  # the most listed model holds ~5% of the catalog
+    model_ids = rng.choice(models, n, p=popularity / popularity.sum()) + 1
+    years = rng.integers(2000, 2026, n)
+    mileage = np.maximum(0, (2026 - years) * rng.normal(15_000, 5_000, n)).astype(int)
+    horsepower = rng.integers(70, 400, n)
+    fuels = rng.integers(0, len(FUELS), n)
+    gearboxes = rng.integers(0, len(GEARBOXES), n)
+    base = 8_000 + model_ids % 50 * 1_500 + horsepower * 60
+    price = base * 0.92 ** (2026 - years) * np.exp(-mileage / 400_000) * rng.lognormal(0, 0.1, n)
+    return [
+        Row(start_id + i, int(model_ids[i]), int(years[i]), int(mileage[i]), int(horsepower[i]),
+            FUELS[fuels[i]], GEARBOXES[gearboxes[i]], float(price[i]))
+        for i in range(n)
+    ]
+
+
+def queries_for(rows, count: int, rng: np.random.Generator):
+    picks = rng.integers(0, len(rows), count)
+    return [
+        EstimateQuery(rows[i].model_id, rows[i].year, rows[i].mileage, rows[i].horsepower, rows[i].fuel_type, rows[i].transmission)
+        for i in picks
+    ]
+
+
+def timed(fn, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--listings", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--models", type=int, default=2_000)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    for n in args.listings:
+        rows = synthetic_rows(n, args.models, rng)
+        estimator = PriceEstimator()
+        start = time.perf_counter()
+        estimator.load(rows)
+        largest = max(pool.size for pool in estimator.pools.values())
+        print(f"\n{n:,} listings, {len(estimator.pools):,} models (largest {largest:,}), built in {time.perf_counter() - start:.1f}s")
+
+        singles = queries_for(rows, args.repeat, rng)
+        it = iter(singles)
+        p50, p95 = timed(lambda: estimator.estimate([next(it)]), args.repeat)
+        print(f"  single listing             p50={p50:7.2f} ms  p95={p95:7.2f} ms")
+
+        popular = [q for q in singles if q.model_id == 1][:1] or singles[:1]
+        p50, p95 = timed(lambda: estimator.estimate(popular), args.repeat)
+        print(f"  single, largest model      p50={p50:7.2f} ms  p95={p95:7.2f} ms")
+
+        batches = [queries_for(rows, args.batch, rng) for _ in range(20)]
+        it = iter(batches * (args.repeat // 20 + 1))
+        p50, p95 = timed(lambda: estimator.estimate(next(it)), args.repeat)
+        print(f"  batch of {args.batch:<4}              p50={p50:7.2f} ms  p95={p95:7.2f} ms")
+
+        changes = synthetic_rows(1_000, args.models, rng, start_id=n + 1)
+        start = time.perf_counter()
+        estimator.upsert(changes)
+        estimator.remove([r.id for r in rows[:1_000]])
+        print(f"  incremental refresh        {(time.perf_counter() - start) * 1000:7.2f} ms per 1,000 inserts + 1,000 deletes")
+
+
+if __name__ == "__main__":
+    main()
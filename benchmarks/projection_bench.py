@@ -0,0 +1,85 @@
+"""
+ORM entity loads against column projections for the listing endpoints, on 10k-row scans
+of the configured database.
+
+  orm         db.query(Car) with joinedload(model/brand, categories, features), as the
+              list endpoint did, then the UsedCarOut serializer
+  projection  used_car_list_query() rows + render_used_car_rows() (current list endpoint)
+
+Also compares full User/Version entities with their UserOut/VersionOut projections.
+
+    python benchmarks/projection_bench.py --rows 10000 --repeat 5
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy.orm import joinedload  # noqa: E402
+from database import SessionLocal  # noqa: E402
+from models import Car, Model, CarCategoryMap, CarFeature, User, Version  # noqa: E402
+from schemas import UserOut, VersionOut  # noqa: E402
+from routers.used_cars import used_car_list_query, render_used_car_rows, used_car_serializer  # noqa: E402
+from services.serialization import schema_columns  # noqa: E402
+
+
+def used_cars_orm(db, rows):
+    cars = db.query(Car).options(
+        joinedload(Car.model).joinedload(Model.brand),
+        joinedload(Car.categories).joinedload(CarCategoryMap.category),
+        joinedload(Car.features).joinedload(CarFeature.feature),
+    ).order_by(Car.id).limit(rows).all()
+    return [used_car_serializer(car) for car in cars]
+
+
+def used_cars_projection(db, rows):
+    return render_used_car_rows(db, used_car_list_query(db).order_by(Car.id).limit(rows).all())
+
+
+def users_orm(db, rows):
+    return db.query(User).order_by(User.id).limit(rows).all()
+
+
+def users_projection(db, rows):
+    return db.query(*schema_columns(UserOut, User)).order_by(User.id).limit(rows).all()
+
+
+def versions_orm(db, rows):
+    return db.query(Version).order_by(Version.id).limit(rows).all()
+
+
+def versions_projection(db, rows):
+    return db.query(*schema_columns(VersionOut, Version)).order_by(Version.id).limit(rows).all()
+
+
+def bench(fn, rows: int, repeat: int):
+    timings, count = [], 0
+    for _ in range(repeat):
+        with SessionLocal() as db:  # fresh session: no identity-map hits between runs
+            start = time.perf_counter()
+            count = len(fn(db, rows))
+            timings.append(time.perf_counter() - start)
+    return min(timings) * 1000, count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for label, orm, projection in [
+        ("used cars", used_cars_orm, used_cars_projection),
+        ("users", users_orm, users_projection),
+        ("versions", versions_orm, versions_projection),
+    ]:
+        orm_ms, n = bench(orm, args.rows, args.repeat)
+        proj_ms, _ = bench(projection, args.rows, args.repeat)
+        print(f"{label:<10} rows={n:<6} orm={orm_ms:8.1f} ms  projection={proj_ms:8.1f} ms  "
+              f"({orm_ms / proj_ms if proj_ms else float('nan'):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Serialization time per 100 used-car listings: the former path (UsedCarOut.construct +
+from_orm per relation, then FastAPI's response_model validation and JSON encoding) against
+the fast path (compiled serializer + orjson) used by the listing/detail endpoints.
+
+Uses in-memory objects shaped like the ORM rows, so no database is needed.
+
+    python benchmarks/serialization_bench.py --listings 100 --repeat 200
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import warnings
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace as Row
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pydantic import TypeAdapter  # noqa: E402
+from schemas import UsedCarOut, CategoryOut, FeatureOut  # noqa: E402
+from services.serialization import compile_serializer, json_response  # noqa: E402
+
+# Same sources as routers/used_cars.py
+used_car_serializer = compile_serializer(UsedCarOut, {
+    "brand_name": lambda car: car.model.brand.name,
+    "model_name": lambda car: car.model.name,
+    "categories": lambda car: [m.category for m in car.categories],
+    "features": lambda car: [f.feature for f in car.features],
+})
+
+
+def make_cars(n: int):
+    categories = [Row(id=i, name=f"Category {i}") for i in range(1, 9)]
+    features = [Row(id=i, name=f"Feature {i}") for i in range(1, 31)]
+    brand = Row(id=1, name="Peugeot")
+    return [
+        Row(
+            id=i, seller_id=7, year=random.randint(2005, 2025), mileage=random.randint(0, 250_000),
+            transmission="Automatic", fuel_type="Diesel", horsepower=130, price=Decimal("18500.00"),
+            location="Tunis", description="Well maintained, full service history. " * 8, posted_at=datetime.utcnow(),
+            model=Row(id=3, name="3008", brand=brand),
+            categories=[Row(category=c) for c in random.sample(categories, 2)],
+            features=[Row(feature=f) for f in random.sample(features, 8)],
+        )
+        for i in range(n)
+    ]
+
+
+def legacy(cars) -> bytes:
+    models = [
+        UsedCarOut.construct(
+            id=car.id, seller_id=car.seller_id, year=car.year, mileage=car.mileage, transmission=car.transmission,
+            fuel_type=car.fuel_type, horsepower=car.horsepower, price=car.price, location=car.location,
+            description=car.description, posted_at=car.posted_at, brand_name=car.model.brand.name, model_name=car.model.name,
+            categories=[CategoryOut.from_orm(m.category) for m in car.categories],
+            features=[FeatureOut.from_orm(f.feature) for f in car.features],
+        )
+        for car in cars
+    ]
+    # What FastAPI does with response_model: dump the models, validate again, dump to JSON-able data, json.dumps
+    validated = LIST_ADAPTER.validate_python([m.model_dump() for m in models])
+    return json.dumps(LIST_ADAPTER.dump_python(validated, mode="json")).encode()
+
+
+def fast(cars) -> bytes:
+    return json_response([used_car_serializer(car) for car in cars]).body
+
+
+LIST_ADAPTER = TypeAdapter(List[UsedCarOut])
+
+
+def bench(fn, cars, repeat: int) -> float:
+    fn(cars)  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(cars)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--listings", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")  # construct() leaves Decimal prices, which pydantic warns about on dump
+    cars = make_cars(args.listings)
+    assert json.loads(legacy(cars)) == json.loads(fast(cars)), "fast path output differs from response_model output"
+
+    legacy_ms, fast_ms = bench(legacy, cars, args.repeat), bench(fast, cars, args.repeat)
+    print(f"{args.listings} listings, {len(fast(cars)) / 1024:.0f} KB JSON")
+    print(f"construct + response_model : {legacy_ms:7.2f} ms")
+    print(f"compiled + orjson          : {fast_ms:7.2f} ms  ({legacy_ms / fast_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
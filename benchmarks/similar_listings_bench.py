@@ -0,0 +1,79 @@
+"""
+Build time, memory and refresh cost of the precomputed similar-listings index at catalog scale
+(no database: synthetic listings with category/feature sets, long-tailed model popularity).
+
+    python benchmarks/similar_listings_bench.py --listings 100000 1000000
+"""
+import argparse
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.similar_listings import SimilarListings  # noqa: E402
+
+CATEGORIES, FEATURES = range(1, 21), range(1, 31)  # as in seed.sql
+Row = namedtuple("Row", "id model_id price year mileage horsepower")
+
+
+def synthetic(n: int, models: int, rng: np.random.Generator, start_id: int = 1):
+    popularity = np.arange(1, models + 1) ** -0.8
+    model_ids = rng.choice(models, n, p=popularity / popularity.sum()) + 1
+    years = rng.integers(2000, 2026, n)
+    mileage = np.maximum(0, (2026 - years) * rng.normal(15_000, 5_000, n)).astype(int)
+    horsepower = rng.integers(70, 400, n)
+    price = (8_000 + model_ids % 50 * 1_500 + horsepower * 60) * 0.92 ** (2026 - years) * rng.lognormal(0, 0.1, n)
+    ids = np.arange(start_id, start_id + n)
+    rows = [Row(int(ids[i]), int(model_ids[i]), float(price[i]), int(years[i]), int(mileage[i]), int(horsepower[i])) for i in range(n)]
+    # 1-3 categories (body type follows the model) and 3-12 features per listing
+    categories = [(int(car_id), int(model_id % 10) + 1) for car_id, model_id in zip(ids, model_ids)]
+    categories += [(int(car_id), int(c)) for car_id in ids[rng.random(n) < 0.6] for c in rng.choice(range(11, 21), 1)]
+    features = [(int(car_id), int(f)) for car_id in ids for f in rng.choice(FEATURES, rng.integers(3, 13), replace=False)]
+    return rows, categories, features
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--listings", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--models", type=int, default=2_000)
+    parser.add_argument("--changes", type=int, default=1_000)
+    parser.add_argument("--lookups", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    brand_of = {model_id: (model_id - 1) // 10 + 1 for model_id in range(1, args.models + 1)}
+    for n in args.listings:
+        rows, categories, features = synthetic(n, args.models, rng)
+        index = SimilarListings(brand_of, CATEGORIES, FEATURES)
+        start = time.perf_counter()
+        index.load(rows, categories, features)
+        print(f"\n{n:,} listings: built in {time.perf_counter() - start:.1f}s, {index.nbytes / 2**20:.0f} MB")
+
+        ids = rng.integers(1, n + 1, args.lookups)
+        start = time.perf_counter()
+        for car_id in ids:
+            index.similar(int(car_id), 10)
+        print(f"  lookup                     {(time.perf_counter() - start) / args.lookups * 1e6:7.1f} us")
+
+        same_model = np.mean([
+            np.mean([rows[neighbour - 1].model_id == rows[car_id - 1].model_id for neighbour in index.similar(int(car_id), 10)])
+            for car_id in ids[:1000]
+        ])
+        print(f"  neighbours of the same model {same_model:.0%}")
+
+        new_rows, new_categories, new_features = synthetic(args.changes, args.models, rng, start_id=n + 1)
+        updated = [row._replace(price=row.price * 0.9) for row in rows[args.changes:2 * args.changes]]
+        kept = {row.id for row in updated}
+        changed_categories = new_categories + [pair for pair in categories if pair[0] in kept]
+        changed_features = new_features + [pair for pair in features if pair[0] in kept]
+        start = time.perf_counter()
+        index.apply(new_rows + updated, changed_categories, changed_features, deleted=range(1, args.changes + 1))
+        print(f"  refresh                    {time.perf_counter() - start:7.2f} s for {args.changes:,} inserts, updates and deletes each")
+
+
+if __name__ == "__main__":
+    main()
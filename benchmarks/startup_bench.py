@@ -0,0 +1,93 @@
+"""
+Cold-start time of an app process, each run in a fresh interpreter:
+
+  import main     module import + router registration (no database work any more)
+  readiness       the single startup query (check_readiness)
+  create_all      what every process used to run at import: CREATE SCHEMA + Base.metadata.create_all
+  uvicorn         end to end: spawn `uvicorn main:app` until GET / answers 200
+
+Needs the configured database for the readiness / create_all rows (create_all is a no-op
+on a migrated database, but still pays the catalog introspection round trips).
+
+    python benchmarks/startup_bench.py --repeat 5
+    python benchmarks/startup_bench.py --repeat 3 --skip-uvicorn
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from services.readiness import check_readiness
+readiness = check_readiness()
+ready = time.perf_counter()
+from sqlalchemy import text
+from database import Base, engine
+with engine.connect() as connection:
+    connection.execute(text('CREATE SCHEMA IF NOT EXISTS "CarPlace"'))
+    connection.commit()
+Base.metadata.create_all(bind=engine)
+created = time.perf_counter()
+print(json.dumps({"import main": imported - start, "readiness": ready - imported, "create_all": created - ready,
+                  "ready": readiness["ready"]}))
+"""
+
+
+def probe() -> dict:
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def uvicorn_cold_start(port: int, timeout: float = 120) -> float:
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.02)
+        raise TimeoutError(f"uvicorn did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--skip-uvicorn", action="store_true")
+    args = parser.parse_args()
+
+    runs = [probe() for _ in range(args.repeat)]
+    if not runs[-1]["ready"]:
+        print("note: database is not at head; run `python manage.py migrate` for representative numbers")
+    timings = {name: [run[name] for run in runs] for name in ("import main", "readiness", "create_all")}
+    if not args.skip_uvicorn:
+        timings["uvicorn"] = [uvicorn_cold_start(args.port) for _ in range(args.repeat)]
+
+    print(f"{'step':<12} {'median ms':>10} {'min ms':>10}")
+    for name, values in timings.items():
+        print(f"{name:<12} {statistics.median(values) * 1000:10.1f} {min(values) * 1000:10.1f}")
+    saved = statistics.median(timings["create_all"]) - statistics.median(timings["readiness"])
+    print(f"\nper process, startup no longer spends ~{saved * 1000:.1f} ms on schema management")
+
+
+if __name__ == "__main__":
+    main()
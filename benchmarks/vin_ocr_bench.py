@@ -0,0 +1,64 @@
+"""
+Throughput and latency of the VIN OCR pipeline over a corpus of sample images.
+
+Runs every image through the same bounded process pool the API uses, at the
+given concurrency, and reports images/s plus p50/p95 latency. When the corpus
+file names are the expected VINs (e.g. KMHxxxxxxxxxxxxxx.jpg) accuracy is reported too.
+
+    python benchmarks/vin_ocr_bench.py path/to/vin_images --concurrency 1 4 8
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services import vin_ocr  # noqa: E402
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"}
+
+
+async def run(images, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, correct = [], 0
+
+    async def one(path: Path, data: bytes):
+        nonlocal correct
+        async with semaphore:
+            start = time.perf_counter()
+            text = await vin_ocr.run_ocr(data)
+            latencies.append((time.perf_counter() - start) * 1000)
+        if text == path.stem.upper():
+            correct += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(path, data) for path, data in images))
+    elapsed = time.perf_counter() - start
+    return len(images) / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 95), correct
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus", type=Path)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    images = [(p, p.read_bytes()) for p in sorted(args.corpus.iterdir()) if p.suffix.lower() in IMAGE_SUFFIXES]
+    if not images:
+        sys.exit(f"No images found in {args.corpus}")
+    vin_ocr.VIN_OCR_MAX_QUEUE = max(args.concurrency)
+    print(f"{len(images)} images, {vin_ocr.VIN_OCR_WORKERS} OCR workers\n")
+
+    asyncio.run(run(images[:1], 1))  # warm up the pool
+    for concurrency in args.concurrency:
+        throughput, p50, p95, correct = asyncio.run(run(images, concurrency))
+        print(f"concurrency={concurrency:<3} {throughput:6.1f} img/s  p50={p50:7.1f} ms  p95={p95:7.1f} ms  "
+              f"exact VIN matches={correct}/{len(images)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 import os
 from dotenv import load_dotenv
 from sqlalchemy import create_engine , MetaData, text 
+from sqlalchemy.exc import ProgrammingError
 from sqlalchemy.orm import sessionmaker, declarative_base , Session
-from typing import Generator
+from typing import Generator, Optional
 
 load_dotenv()
 
@@ -22,17 +23,15 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 metadata = MetaData(schema="CarPlace")
 Base = declarative_base(metadata=metadata)
 
-# --- Utility to create schema (NEW) ---
-def create_schema_if_not_exists(engine):
-    
-    schema_name = metadata.schema
-    try:
-        with engine.connect() as connection:
-            connection.execute(text(f"CREATE SCHEMA IF NOT EXISTS \"{schema_name}\""))
-            connection.commit()
-    except Exception as e:
-        # Don't block app startup on DB/schema errors; log and continue.
-        print(f"Warning: could not create schema '{schema_name}' at startup: {e}")
+# --- Readiness ---
+# Schema changes are applied by `python manage.py migrate` (Alembic), never at app startup.
+def schema_revision(engine) -> Optional[str]:
+    """Alembic revision the database is at (one query); None when it has never been migrated."""
+    with engine.connect() as connection:
+        try:
+            return connection.execute(text(f'SELECT version_num FROM "{metadata.schema}".alembic_version')).scalar()
+        except ProgrammingError:
+            return None
 
 # --- Dependency ---
 def get_db() -> Generator[Session, None, None]:
@@ -1,34 +1,75 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from routers import auth, new_cars, used_cars, admin, brands, dealers, public_models, vin_decoder , compare , auction, conversations , chat
+from services.features import feature_enabled, include_routers
+from services.readiness import check_readiness
+from services.response_cache import ResponseCacheMiddleware
+import services.stats  # noqa: F401  registers the stats counter upkeep on every Session
 
-from database import Base, engine, create_schema_if_not_exists 
 
+# Schema changes are applied by `python manage.py migrate`, not by app processes.
+# Startup only runs one readiness query and never blocks on its result.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    readiness = await run_in_threadpool(check_readiness)
+    if not readiness["ready"]:
+        print(f"[startup] Database not ready: {readiness} (run `python manage.py migrate`)")
+    if feature_enabled("ai"):
+        # Listing writes on pods without "ai" reach this process's semantic search index by polling
+        from services.listing_search import start_index_sync
+        start_index_sync()
+        # Catalog ingestions interrupted by the previous shutdown/crash
+        from services.catalog_store import resume_interrupted_ingestions
+        try:
+            resumed = await run_in_threadpool(resume_interrupted_ingestions)
+            if resumed:
+                print(f"[startup] Re-queued {resumed} catalog documents left pending/processing")
+        except Exception as e:
+            print(f"[startup] Could not resume catalog ingestions: {e}")
+    yield
 
-app = FastAPI(title="SouQ Craheb API", version="1.0")
 
-# --- Ensure the schema exists before creating tables ---
-create_schema_if_not_exists(engine)
+app = FastAPI(title="SouQ Craheb API", version="1.0", lifespan=lifespan)
 
-# Ensure all models are loaded before creating tables
-Base.metadata.create_all(bind=engine)
+# Public GET responses (new cars, used car detail, dealers) are cached with ETags; brands/models do their own
+app.add_middleware(ResponseCacheMiddleware)
+
+# routers: (feature, module) in registration order; a module is imported only if its feature is
+# enabled in CARPLACE_FEATURES (core, auction, ai, ocr)
+ROUTERS = [
+    ("core", "auth"),
+    ("core", "admin"),
+    ("core", "analytics"),
+    ("ai", "catalogs"),
+    ("core", "brands"),
+    ("core", "dealers"),
+    ("core", "public_models"),
+    ("core", "new_cars"),
+    ("ai", "used_car_search"),      # before used_cars: /cars/used/search vs /cars/used/{car_id}
+    ("insights", "price_estimate"), # before used_cars: /cars/used/estimate vs /cars/used/{car_id}
+    ("insights", "similar_listings"),
+    ("core", "used_cars"),
+    ("core", "vin_decoder"),
+    ("ocr", "vin_scan"),
+    ("ai", "compare"),
+    ("auction", "auction"),
+    ("core", "conversations"),
+    ("core", "saved_searches"),
+    ("ai", "chat"),
+]
+include_routers(app, ROUTERS)
 
-# routers
-app.include_router(auth.router)
-app.include_router(admin.router)
-app.include_router(brands.router)
-app.include_router(dealers.router)
-app.include_router(public_models.router)
-app.include_router(new_cars.router)
-app.include_router(used_cars.router)
-app.include_router(vin_decoder.router)
-app.include_router(compare.router)
-app.include_router(auction.router)
-app.include_router(conversations.router)
-app.include_router(chat.router)
 @app.get("/")
 def root():
-    return {"message": "Welcome to the SouQ Craheb API 🚗"}
\ No newline at end of file
+    return {"message": "Welcome to the SouQ Craheb API 🚗"}
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 once the database is reachable and migrated to this build's head."""
+    readiness = check_readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
@@ -0,0 +1,133 @@
+"""
+Operational commands; run them once per deploy, not from every app process.
+
+    python manage.py migrate              # alembic upgrade head (creates the CarPlace schema if needed)
+    python manage.py bootstrap            # migrate, then load seed.sql into an empty reference catalog
+    python manage.py check                # readiness check, exits 1 if not reachable or not at head
+    python manage.py reconcile-stats      # repair drift in the stats counters (cron, after raw SQL loads)
+    python manage.py rollup               # incremental analytics rollups (cron, every few minutes)
+    python manage.py rollup --backfill --since 2025-01-01 [--until 2025-02-01] [--pipeline listings]
+    python manage.py saved-search-alerts  # match new listings against saved searches and email digests (long-running)
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import text  # noqa: E402
+from database import SessionLocal, engine, metadata  # noqa: E402
+from services.readiness import ALEMBIC_INI, check_readiness  # noqa: E402
+from services.stats import reconcile  # noqa: E402
+from services.analytics import PIPELINES, backfill_pipeline, run_pipeline  # noqa: E402
+from services.saved_searches import SAVED_SEARCH_INTERVAL_SECONDS, SavedSearchMatcher, send_email_alerts  # noqa: E402
+
+SEED_FILE = Path(__file__).resolve().parent / "seed.sql"
+# seed.sql inserts explicit ids into these, so their sequences must be moved past them
+SEEDED_TABLES = ["brands", "models", "categories", "features"]
+
+
+def migrate(revision: str = "head") -> None:
+    from alembic import command
+    from alembic.config import Config
+    command.upgrade(Config(str(ALEMBIC_INI)), revision)
+
+
+def bootstrap() -> None:
+    migrate()
+    schema = metadata.schema
+    with engine.begin() as connection:
+        if connection.execute(text(f'SELECT EXISTS (SELECT 1 FROM "{schema}".brands)')).scalar():
+            print("[manage] Reference catalog already loaded, skipping seed.sql")
+            return
+        connection.exec_driver_sql(SEED_FILE.read_text(encoding="utf-8"))
+        for table in SEEDED_TABLES:
+            connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('\"{schema}\".{table}', 'id'), "
+                f'(SELECT COALESCE(MAX(id), 1) FROM "{schema}".{table}))'
+            ))
+    print(f"[manage] Loaded {SEED_FILE.name}")
+    reconcile_stats()  # seed.sql bypasses the stats counters
+
+
+def reconcile_stats(dry_run: bool = False) -> None:
+    with SessionLocal() as session:
+        report = reconcile(session, fix=not dry_run)
+    print(json.dumps(report, default=str))
+
+
+def rollup(pipelines, backfill: bool = False, since=None, until=None) -> None:
+    with SessionLocal() as session:
+        for name in pipelines or PIPELINES:
+            if backfill:
+                windows = backfill_pipeline(session, PIPELINES[name], since, until)
+                print(f"[manage] Backfilled {name}: {windows} windows")
+            else:
+                windows = run_pipeline(session, PIPELINES[name])
+                print(f"[manage] Rolled up {name}: {windows} windows")
+
+
+def saved_search_alerts(once: bool = False) -> None:
+    # one matcher per deployment: the index of saved searches lives in this process
+    matcher = SavedSearchMatcher()
+    while True:
+        try:
+            with SessionLocal() as session:
+                queued = matcher.run_once(session)
+                sent = send_email_alerts(session)
+            print(f"[manage] Saved searches: {queued} matches queued, {sent} digests emailed")
+        except Exception as e:
+            if once:
+                raise
+            print(f"[manage] Saved search alerts failed: {e}")
+        if once:
+            return
+        time.sleep(SAVED_SEARCH_INTERVAL_SECONDS)
+
+
+def check() -> None:
+    readiness = check_readiness()
+    print(json.dumps(readiness))
+    sys.exit(0 if readiness["ready"] else 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = commands.add_parser("migrate", help="apply Alembic migrations")
+    migrate_parser.add_argument("revision", nargs="?", default="head")
+    commands.add_parser("bootstrap", help="migrate and load seed.sql into an empty database")
+    commands.add_parser("check", help="readiness check (DB reachable and at head)")
+    reconcile_parser = commands.add_parser("reconcile-stats", help="compare stats counters with the tables and repair drift")
+    reconcile_parser.add_argument("--dry-run", action="store_true", help="report drift without repairing it")
+    rollup_parser = commands.add_parser("rollup", help="aggregate new rows into the analytics rollups")
+    rollup_parser.add_argument("--pipeline", action="append", choices=list(PIPELINES), help="default: all")
+    rollup_parser.add_argument("--backfill", action="store_true", help="recompute the buckets in [--since, --until) from the source")
+    rollup_parser.add_argument("--since", type=datetime.fromisoformat)
+    rollup_parser.add_argument("--until", type=datetime.fromisoformat, help="default: the pipeline watermark")
+    alerts_parser = commands.add_parser("saved-search-alerts", help="match new listings against saved searches and send alerts")
+    alerts_parser.add_argument("--once", action="store_true", help="run a single pass instead of looping")
+    args = parser.parse_args()
+    if args.command == "rollup" and args.backfill and not args.since:
+        parser.error("--backfill needs --since")
+
+    if args.command == "migrate":
+        migrate(args.revision)
+    elif args.command == "bootstrap":
+        bootstrap()
+    elif args.command == "reconcile-stats":
+        reconcile_stats(args.dry_run)
+    elif args.command == "rollup":
+        rollup(args.pipeline, args.backfill, args.since, args.until)
+    elif args.command == "saved-search-alerts":
+        saved_search_alerts(args.once)
+    else:
+        check()
+
+
+if __name__ == "__main__":
+    main()
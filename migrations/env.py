@@ -0,0 +1,57 @@
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import text
+from database import Base, engine
+import models  # noqa: F401  (registers every table on Base.metadata for autogenerate)
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+SCHEMA = target_metadata.schema
+
+
+def include_name(name, type_, parent_names):
+    # Only compare the app schema during autogenerate
+    if type_ == "schema":
+        return name == SCHEMA
+    return True
+
+
+def run_migrations_offline() -> None:
+    """Emits SQL to stdout (`alembic upgrade head --sql`) instead of running it."""
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        version_table_schema=SCHEMA,
+        include_schemas=True,
+        include_name=include_name,
+    )
+    with context.begin_transaction():
+        context.execute(f'CREATE SCHEMA IF NOT EXISTS "{SCHEMA}"')
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    with engine.connect() as connection:
+        # The version table lives in the app schema, so it has to exist before Alembic looks for it
+        connection.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{SCHEMA}"'))
+        connection.commit()
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            version_table_schema=SCHEMA,
+            include_schemas=True,
+            include_name=include_name,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,230 @@
+"""Baseline: the schema the app used to create at startup with Base.metadata.create_all
+
+Databases created that way already have these tables; mark them with
+`alembic stamp 0001` and then run `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "CarPlace"
+
+user_role = sa.Enum("admin", "seller", "dealer", name="userrole", schema=SCHEMA)
+auction_status = sa.Enum("pending", "active", "closed", name="auctionstatus", schema=SCHEMA)
+
+
+def fk(column: str, ondelete: Union[str, None] = None) -> sa.ForeignKey:
+    return sa.ForeignKey(f"{SCHEMA}.{column}", ondelete=ondelete)
+
+
+def id_column() -> sa.Column:
+    return sa.Column("id", sa.Integer, primary_key=True)
+
+
+def id_index(table: str) -> None:
+    # create_all named these after `index=True` on every primary key
+    op.create_index(f"ix_{SCHEMA}_{table}_id", table, ["id"], schema=SCHEMA)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "users",
+        id_column(),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        sa.Column("role", user_role, nullable=False),
+        sa.Column("full_name", sa.String(255)),
+        sa.Column("is_active", sa.Boolean),
+        sa.Column("is_2fa_enabled", sa.Boolean),
+        sa.Column("otp_code", sa.String(6), nullable=True),
+        sa.Column("otp_expires_at", sa.TIMESTAMP, nullable=True),
+        sa.Column("created_at", sa.TIMESTAMP),
+        schema=SCHEMA,
+    )
+    id_index("users")
+    op.create_index(f"ix_{SCHEMA}_users_email", "users", ["email"], unique=True, schema=SCHEMA)
+
+    # --- Reference tables ---
+    op.create_table(
+        "brands",
+        id_column(),
+        sa.Column("name", sa.String(100), nullable=False, unique=True),
+        sa.Column("country", sa.String(100)),
+        sa.Column("wmi", sa.String(4), nullable=True, unique=True),
+        schema=SCHEMA,
+    )
+    id_index("brands")
+    op.create_table(
+        "models",
+        id_column(),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("brand_id", sa.Integer, fk("brands.id", "CASCADE"), nullable=False),
+        sa.Column("vds", sa.String(10), nullable=True),
+        sa.UniqueConstraint("name", "brand_id", name="_name_brand_uc"),
+        schema=SCHEMA,
+    )
+    id_index("models")
+    for table in ("categories", "features"):
+        op.create_table(
+            table,
+            id_column(),
+            sa.Column("name", sa.String(100), nullable=False, unique=True),
+            schema=SCHEMA,
+        )
+        id_index(table)
+
+    # --- New cars / used cars ---
+    op.create_table(
+        "versions",
+        id_column(),
+        sa.Column("model_id", sa.Integer, fk("models.id", "CASCADE"), nullable=False),
+        sa.Column("dealer_id", sa.Integer, fk("users.id", "CASCADE"), nullable=False),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("year", sa.Integer),
+        sa.Column("transmission", sa.String(50)),
+        sa.Column("fuel_type", sa.String(50)),
+        sa.Column("horsepower", sa.Integer),
+        sa.Column("price", sa.DECIMAL(10, 2), nullable=False),
+        sa.UniqueConstraint("name", "model_id", name="_version_name_model_uc"),
+        schema=SCHEMA,
+    )
+    id_index("versions")
+    op.create_table(
+        "cars",
+        id_column(),
+        sa.Column("model_id", sa.Integer, fk("models.id", "CASCADE"), nullable=False),
+        sa.Column("seller_id", sa.Integer, fk("users.id", "CASCADE"), nullable=False),
+        sa.Column("year", sa.Integer, nullable=False),
+        sa.Column("mileage", sa.Integer, nullable=False),
+        sa.Column("transmission", sa.String(50)),
+        sa.Column("fuel_type", sa.String(50)),
+        sa.Column("horsepower", sa.Integer),
+        sa.Column("price", sa.DECIMAL(10, 2), nullable=False),
+        sa.Column("location", sa.String(100)),
+        sa.Column("description", sa.Text),
+        sa.Column("posted_at", sa.TIMESTAMP),
+        schema=SCHEMA,
+    )
+    id_index("cars")
+    op.create_table(
+        "car_category_map",
+        sa.Column("car_id", sa.Integer, fk("cars.id", "CASCADE"), primary_key=True),
+        sa.Column("category_id", sa.Integer, fk("categories.id", "CASCADE"), primary_key=True),
+        schema=SCHEMA,
+    )
+    op.create_table(
+        "car_features",
+        sa.Column("car_id", sa.Integer, fk("cars.id", "CASCADE"), primary_key=True),
+        sa.Column("feature_id", sa.Integer, fk("features.id", "CASCADE"), primary_key=True),
+        schema=SCHEMA,
+    )
+
+    # --- Dealers ---
+    op.create_table(
+        "dealers_meta",
+        id_column(),
+        sa.Column("user_id", sa.Integer, fk("users.id", "CASCADE"), nullable=False, unique=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("location", sa.String(100)),
+        sa.Column("contact", sa.String(100)),
+        schema=SCHEMA,
+    )
+    id_index("dealers_meta")
+
+    # --- Auctions ---
+    op.create_table(
+        "auctions",
+        id_column(),
+        sa.Column("vehicle_id", sa.Integer, fk("versions.id"), nullable=False),
+        sa.Column("starting_bid", sa.DECIMAL(10, 2), nullable=False),
+        sa.Column("reserve_price", sa.DECIMAL(10, 2), nullable=False),
+        sa.Column("duration", sa.Integer, nullable=False),
+        sa.Column("status", auction_status),
+        sa.Column("highest_bid", sa.DECIMAL(10, 2)),
+        sa.Column("highest_bidder_id", sa.Integer, fk("users.id")),
+        sa.Column("created_at", sa.TIMESTAMP),
+        sa.Column("ends_at", sa.TIMESTAMP),
+        schema=SCHEMA,
+    )
+    id_index("auctions")
+    op.create_table(
+        "bids",
+        id_column(),
+        sa.Column("auction_id", sa.Integer, fk("auctions.id"), nullable=False),
+        sa.Column("user_id", sa.Integer, fk("users.id"), nullable=False),
+        sa.Column("amount", sa.DECIMAL(10, 2), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP),
+        schema=SCHEMA,
+    )
+    id_index("bids")
+
+    # --- Messaging ---
+    op.create_table(
+        "conversations",
+        id_column(),
+        sa.Column("used_car_id", sa.Integer, fk("cars.id", "CASCADE"), nullable=False),
+        sa.Column("buyer_id", sa.Integer, fk("users.id", "CASCADE"), nullable=False),
+        sa.Column("owner_id", sa.Integer, fk("users.id", "CASCADE"), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP),
+        sa.Column("last_message_at", sa.TIMESTAMP),
+        sa.UniqueConstraint("used_car_id", "buyer_id", name="_conv_usedcar_buyer_uc"),
+        schema=SCHEMA,
+    )
+    id_index("conversations")
+    op.create_table(
+        "messages",
+        id_column(),
+        sa.Column("conversation_id", sa.Integer, fk("conversations.id", "CASCADE"), nullable=False),
+        sa.Column("sender_id", sa.Integer, fk("users.id", "CASCADE"), nullable=False),
+        sa.Column("body", sa.Text, nullable=False),
+        sa.Column("sent_at", sa.TIMESTAMP),
+        sa.Column("read_at", sa.TIMESTAMP, nullable=True),
+        schema=SCHEMA,
+    )
+    id_index("messages")
+
+    # --- AI assistant ---
+    op.create_table(
+        "ai_conversations",
+        id_column(),
+        sa.Column("user_id", sa.Integer, fk("users.id", "CASCADE"), nullable=False),
+        sa.Column("used_car_id", sa.Integer, fk("cars.id", "SET NULL"), nullable=True),
+        sa.Column("created_at", sa.TIMESTAMP),
+        schema=SCHEMA,
+    )
+    id_index("ai_conversations")
+    op.create_table(
+        "ai_messages",
+        id_column(),
+        sa.Column("ai_conversation_id", sa.Integer, fk("ai_conversations.id", "CASCADE"), nullable=False),
+        sa.Column("role", sa.String(20), nullable=False),
+        sa.Column("content", sa.Text, nullable=False),
+        sa.Column("sent_at", sa.TIMESTAMP),
+        schema=SCHEMA,
+    )
+    id_index("ai_messages")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in (
+        "ai_messages", "ai_conversations", "messages", "conversations", "bids", "auctions", "dealers_meta",
+        "car_features", "car_category_map", "cars", "versions", "features", "categories", "models", "brands", "users",
+    ):
+        op.drop_table(table, schema=SCHEMA)
+    auction_status.drop(op.get_bind(), checkfirst=True)
+    user_role.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,75 @@
+"""Catalog documents, catalog_version and updated_at on cars/versions
+
+Written with IF NOT EXISTS throughout: databases that ran the app with create_all may
+already have the tables (create_all never adds columns, so updated_at is usually missing).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "CarPlace"
+
+catalog_status = postgresql.ENUM("pending", "processing", "ready", "failed", name="catalogstatus", schema=SCHEMA, create_type=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        f"DO $$ BEGIN CREATE TYPE \"{SCHEMA}\".catalogstatus AS ENUM ('pending', 'processing', 'ready', 'failed'); "
+        "EXCEPTION WHEN duplicate_object THEN NULL; END $$"
+    )
+    op.create_table(
+        "catalog_documents",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("filename", sa.String(255), nullable=False),
+        sa.Column("file_path", sa.String(500), nullable=False),
+        sa.Column("brand_id", sa.Integer, sa.ForeignKey(f"{SCHEMA}.brands.id", ondelete="CASCADE"), nullable=True),
+        sa.Column("model_id", sa.Integer, sa.ForeignKey(f"{SCHEMA}.models.id", ondelete="CASCADE"), nullable=True),
+        sa.Column("status", catalog_status, nullable=False),
+        sa.Column("chunk_count", sa.Integer),
+        sa.Column("error", sa.Text, nullable=True),
+        sa.Column("created_at", sa.TIMESTAMP),
+        sa.Column("ingested_at", sa.TIMESTAMP, nullable=True),
+        schema=SCHEMA,
+        if_not_exists=True,
+    )
+    op.create_index(f"ix_{SCHEMA}_catalog_documents_id", "catalog_documents", ["id"], schema=SCHEMA, if_not_exists=True)
+
+    op.create_table(
+        "catalog_version",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("version", sa.BigInteger, nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP),
+        schema=SCHEMA,
+        if_not_exists=True,
+    )
+
+    # Export endpoints compare updated_at with If-Modified-Since; backfill so existing rows are not NULL
+    for table, backfill in (("cars", "COALESCE(posted_at, now())"), ("versions", "now()")):
+        op.execute(f'ALTER TABLE "{SCHEMA}".{table} ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE')
+        op.execute(f'UPDATE "{SCHEMA}".{table} SET updated_at = {backfill} WHERE updated_at IS NULL')
+        op.create_index(f"ix_{SCHEMA}_{table}_updated_at", table, ["updated_at"], schema=SCHEMA, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ("versions", "cars"):
+        op.drop_index(f"ix_{SCHEMA}_{table}_updated_at", table_name=table, schema=SCHEMA)
+        op.drop_column(table, "updated_at", schema=SCHEMA)
+    op.drop_table("catalog_version", schema=SCHEMA)
+    op.drop_table("catalog_documents", schema=SCHEMA)
+    op.execute(f'DROP TYPE IF EXISTS "{SCHEMA}".catalogstatus')
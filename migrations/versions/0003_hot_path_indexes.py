@@ -0,0 +1,62 @@
+"""Composite indexes for the endpoint WHERE / ORDER BY patterns
+
+Built CONCURRENTLY (outside the migration transaction) so writes to cars, messages
+and bids are not blocked while they build. Check the plans with
+`python benchmarks/explain_audit.py`.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "CarPlace"
+
+# (name, table, columns, INCLUDE columns) — mirrored by __table_args__ in models.py
+INDEXES = [
+    ("ix_users_role_full_name", "users", ["role", "full_name"], None),
+    ("ix_cars_seller_id_id", "cars", ["seller_id", "id"], ["price", "posted_at"]),
+    ("ix_cars_model_id_year", "cars", ["model_id", "year"], None),
+    ("ix_cars_posted_at_id", "cars", ["posted_at", "id"], None),
+    ("ix_cars_price", "cars", ["price"], None),
+    ("ix_car_category_map_category_id", "car_category_map", ["category_id"], None),
+    ("ix_car_features_feature_id", "car_features", ["feature_id"], None),
+    ("ix_versions_dealer_id_id", "versions", ["dealer_id", "id"], ["price"]),
+    ("ix_versions_model_id", "versions", ["model_id"], None),
+    ("ix_auctions_status_ends_at", "auctions", ["status", "ends_at"], None),
+    ("ix_auctions_vehicle_id", "auctions", ["vehicle_id"], None),
+    ("ix_bids_auction_id_created_at", "bids", ["auction_id", "created_at"], None),
+    ("ix_conversations_buyer_id_last_message_at", "conversations", ["buyer_id", "last_message_at"], None),
+    ("ix_conversations_owner_id_last_message_at", "conversations", ["owner_id", "last_message_at"], None),
+    ("ix_messages_conversation_id_sent_at", "messages", ["conversation_id", "sent_at"], None),
+    ("ix_messages_sender_id", "messages", ["sender_id"], None),
+    ("ix_ai_conversations_user_id_used_car_id", "ai_conversations", ["user_id", "used_car_id"], None),
+    ("ix_ai_messages_ai_conversation_id_sent_at", "ai_messages", ["ai_conversation_id", "sent_at"], None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns, include in INDEXES:
+            op.create_index(
+                name, table, columns, schema=SCHEMA, if_not_exists=True,
+                postgresql_concurrently=True, postgresql_include=include or [],
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, schema=SCHEMA, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,67 @@
+"""Denormalized stats counters (per seller/dealer and per table)
+
+Backfilled from the current rows so the stats endpoints are correct right after the
+upgrade; from then on services.stats keeps them in step with every write and
+`python manage.py reconcile-stats` repairs any drift.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "CarPlace"
+
+# (scope, table, owner column, price column, posted column) — same definitions as services.stats
+COUNTED = [
+    ("cars", "cars", "seller_id", "price", "posted_at"),
+    ("versions", "versions", "dealer_id", "price", None),
+    ("brands", "brands", None, None, None),
+    ("models", "models", None, None, None),
+    ("categories", "categories", None, None, None),
+    ("users", "users", None, None, None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "stats_counters",
+        sa.Column("scope", sa.String(32), primary_key=True),
+        sa.Column("owner_id", sa.Integer, primary_key=True),
+        sa.Column("row_count", sa.BigInteger, nullable=False, server_default="0"),
+        sa.Column("price_sum", sa.DECIMAL(18, 2), nullable=False, server_default="0"),
+        sa.Column("last_posted_at", sa.TIMESTAMP, nullable=True),
+        sa.Column("updated_at", sa.TIMESTAMP, server_default=sa.func.now()),
+        schema=SCHEMA,
+        if_not_exists=True,
+    )
+
+    for scope, table, owner, price, posted in COUNTED:
+        price_sum = f"COALESCE(SUM({price}), 0)" if price else "0"
+        last_posted = f"MAX({posted})" if posted else "NULL::timestamp"
+        select = f"SELECT '{scope}', {{owner}}, COUNT(*), {price_sum}, {last_posted} FROM \"{SCHEMA}\".{table}"
+        selects = [select.format(owner="0")]
+        if owner:
+            selects.append(select.format(owner=owner) + f" GROUP BY {owner}")
+        for statement in selects:
+            op.execute(
+                f'INSERT INTO "{SCHEMA}".stats_counters (scope, owner_id, row_count, price_sum, last_posted_at) '
+                f"{statement} ON CONFLICT (scope, owner_id) DO NOTHING"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("stats_counters", schema=SCHEMA)
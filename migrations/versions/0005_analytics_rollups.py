@@ -0,0 +1,92 @@
+"""Time-bucketed analytics rollups and their watermarks
+
+Created empty: the first `python manage.py rollup` run aggregates the existing history
+(in ANALYTICS_ROLLUP_WINDOW_DAYS steps) before it switches to incremental runs.
+Also indexes messages.sent_at and auctions.ends_at (CONCURRENTLY) for the watermark range scans.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "CarPlace"
+
+# Watermark range scans of the incremental runs: WHERE sent_at/ends_at > :watermark AND <= :horizon
+SOURCE_INDEXES = [
+    ("ix_messages_sent_at", "messages", ["sent_at"]),
+    ("ix_auctions_ends_at", "auctions", ["ends_at"]),
+]
+
+
+def counter(name: str) -> sa.Column:
+    return sa.Column(name, sa.Integer, nullable=False, server_default="0")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "rollup_watermarks",
+        sa.Column("pipeline", sa.String(32), primary_key=True),
+        sa.Column("processed_until", sa.TIMESTAMP, nullable=True),
+        sa.Column("updated_at", sa.TIMESTAMP),
+        schema=SCHEMA,
+        if_not_exists=True,
+    )
+    op.create_table(
+        "listing_daily_rollups",
+        sa.Column("day", sa.Date, primary_key=True),
+        sa.Column("model_id", sa.Integer, primary_key=True),
+        sa.Column("brand_id", sa.Integer, nullable=False),
+        counter("listings"),
+        sa.Column("price_sum", sa.DECIMAL(18, 2), nullable=False, server_default="0"),
+        sa.Column("price_min", sa.DECIMAL(10, 2)),
+        sa.Column("price_max", sa.DECIMAL(10, 2)),
+        schema=SCHEMA,
+        if_not_exists=True,
+    )
+    op.create_index("ix_listing_daily_rollups_brand_id_day", "listing_daily_rollups", ["brand_id", "day"], schema=SCHEMA, if_not_exists=True)
+    op.create_table(
+        "auction_daily_rollups",
+        sa.Column("day", sa.Date, primary_key=True),
+        counter("ended"),
+        counter("started"),
+        counter("sold"),
+        counter("bids"),
+        sa.Column("sold_value", sa.DECIMAL(18, 2), nullable=False, server_default="0"),
+        schema=SCHEMA,
+        if_not_exists=True,
+    )
+    op.create_table(
+        "message_hourly_rollups",
+        sa.Column("hour", sa.TIMESTAMP, primary_key=True),
+        counter("messages"),
+        schema=SCHEMA,
+        if_not_exists=True,
+    )
+    with op.get_context().autocommit_block():
+        for name, table, columns in SOURCE_INDEXES:
+            op.create_index(name, table, columns, schema=SCHEMA, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(SOURCE_INDEXES):
+            op.drop_index(name, table_name=table, schema=SCHEMA, if_exists=True, postgresql_concurrently=True)
+    op.drop_table("message_hourly_rollups", schema=SCHEMA)
+    op.drop_table("auction_daily_rollups", schema=SCHEMA)
+    op.drop_index("ix_listing_daily_rollups_brand_id_day", table_name="listing_daily_rollups", schema=SCHEMA)
+    op.drop_table("listing_daily_rollups", schema=SCHEMA)
+    op.drop_table("rollup_watermarks", schema=SCHEMA)
@@ -0,0 +1,61 @@
+"""Listing tombstones for incremental in-memory listing indexes
+
+A statement-level AFTER DELETE trigger on cars records the deleted ids (also for ORM cascades,
+bulk deletes and raw SQL), so the price estimator and other per-process listing indexes can
+drop them without reloading every listing. Tombstones older than a day are pruned by the same
+trigger; the indexes fully reload far more often than that.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "CarPlace"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "listing_tombstones",
+        sa.Column("car_id", sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column("deleted_at", sa.TIMESTAMP, nullable=False),
+        schema=SCHEMA,
+        if_not_exists=True,
+    )
+    op.create_index(f"ix_{SCHEMA}_listing_tombstones_deleted_at", "listing_tombstones", ["deleted_at"], schema=SCHEMA, if_not_exists=True)
+    # Timestamps are naive UTC like the rest of the schema (datetime.utcnow)
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION "{SCHEMA}".record_listing_tombstones() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO "{SCHEMA}".listing_tombstones (car_id, deleted_at)
+            SELECT id, timezone('utc', now()) FROM deleted_cars
+            ON CONFLICT (car_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+            DELETE FROM "{SCHEMA}".listing_tombstones WHERE deleted_at < timezone('utc', now()) - interval '1 day';
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(f'DROP TRIGGER IF EXISTS cars_listing_tombstones ON "{SCHEMA}".cars')
+    op.execute(
+        f'CREATE TRIGGER cars_listing_tombstones AFTER DELETE ON "{SCHEMA}".cars '
+        f'REFERENCING OLD TABLE AS deleted_cars FOR EACH STATEMENT EXECUTE FUNCTION "{SCHEMA}".record_listing_tombstones()'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(f'DROP TRIGGER IF EXISTS cars_listing_tombstones ON "{SCHEMA}".cars')
+    op.execute(f'DROP FUNCTION IF EXISTS "{SCHEMA}".record_listing_tombstones()')
+    op.drop_table("listing_tombstones", schema=SCHEMA)
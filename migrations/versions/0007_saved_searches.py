@@ -0,0 +1,73 @@
+"""Saved searches and their match queue
+
+saved_search_matches is both the alert outbox and the dedup record: one row per (search, listing),
+pushed over WebSocket by id order and emailed once (partial index on the rows still pending email).
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "CarPlace"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "saved_searches",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey(f"{SCHEMA}.users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("brand_id", sa.Integer, sa.ForeignKey(f"{SCHEMA}.brands.id", ondelete="CASCADE"), nullable=True),
+        sa.Column("model_id", sa.Integer, sa.ForeignKey(f"{SCHEMA}.models.id", ondelete="CASCADE"), nullable=True),
+        sa.Column("fuel_type", sa.String(50), nullable=True),
+        sa.Column("transmission", sa.String(50), nullable=True),
+        sa.Column("min_price", sa.DECIMAL(10, 2), nullable=True),
+        sa.Column("max_price", sa.DECIMAL(10, 2), nullable=True),
+        sa.Column("min_year", sa.Integer, nullable=True),
+        sa.Column("max_year", sa.Integer, nullable=True),
+        sa.Column("notify_email", sa.Boolean, nullable=False, server_default=sa.true()),
+        sa.Column("created_at", sa.TIMESTAMP),
+        sa.Column("updated_at", sa.TIMESTAMP),
+        schema=SCHEMA,
+        if_not_exists=True,
+    )
+    op.create_index(f"ix_{SCHEMA}_saved_searches_user_id", "saved_searches", ["user_id"], schema=SCHEMA, if_not_exists=True)
+    op.create_index(f"ix_{SCHEMA}_saved_searches_updated_at", "saved_searches", ["updated_at"], schema=SCHEMA, if_not_exists=True)
+
+    op.create_table(
+        "saved_search_matches",
+        sa.Column("id", sa.BigInteger, primary_key=True),
+        sa.Column("search_id", sa.Integer, sa.ForeignKey(f"{SCHEMA}.saved_searches.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey(f"{SCHEMA}.users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("car_id", sa.Integer, sa.ForeignKey(f"{SCHEMA}.cars.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("matched_at", sa.TIMESTAMP, nullable=False),
+        sa.Column("emailed_at", sa.TIMESTAMP, nullable=True),
+        sa.UniqueConstraint("search_id", "car_id", name="_saved_search_match_uc"),
+        schema=SCHEMA,
+        if_not_exists=True,
+    )
+    op.create_index("ix_saved_search_matches_user_id_id", "saved_search_matches", ["user_id", "id"], schema=SCHEMA, if_not_exists=True)
+    op.create_index("ix_saved_search_matches_car_id", "saved_search_matches", ["car_id"], schema=SCHEMA, if_not_exists=True)
+    op.create_index(
+        "ix_saved_search_matches_pending_email", "saved_search_matches", ["id"], schema=SCHEMA, if_not_exists=True,
+        postgresql_where=sa.text("emailed_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("saved_search_matches", schema=SCHEMA)
+    op.drop_table("saved_searches", schema=SCHEMA)
@@ -0,0 +1,83 @@
+"""Category / feature id arrays on cars, GIN-indexed
+
+cars.category_ids and cars.feature_ids mirror car_category_map and car_features (sorted ids) so
+"has all / any of these features" is one GIN index probe (@> / &&) instead of a join per feature,
+and list responses decode the names from the in-memory reference catalog instead of joining.
+Statement-level triggers on the association tables keep the arrays in sync for ORM writes, bulk
+imports, cascades and raw SQL alike (link rows are only ever inserted or deleted, never updated).
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, Sequence[str], None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "CarPlace"
+
+# (cars column, association table, id column, GIN index) — mirrored by Car in models.py
+ARRAYS = [
+    ("category_ids", "car_category_map", "category_id", "ix_cars_category_ids"),
+    ("feature_ids", "car_features", "feature_id", "ix_cars_feature_ids"),
+]
+
+
+def _aggregate(table: str, id_column: str) -> str:
+    return (
+        f'COALESCE((SELECT array_agg(l.{id_column} ORDER BY l.{id_column}) FROM "{SCHEMA}".{table} l '
+        f"WHERE l.car_id = c.id), '{{}}')"
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column, table, id_column, _ in ARRAYS:
+        op.execute(f"""ALTER TABLE "{SCHEMA}".cars ADD COLUMN IF NOT EXISTS {column} INTEGER[] NOT NULL DEFAULT '{{}}'""")
+        op.execute(f'UPDATE "{SCHEMA}".cars c SET {column} = {_aggregate(table, id_column)} WHERE EXISTS (SELECT 1 FROM "{SCHEMA}".{table} l WHERE l.car_id = c.id)')
+
+        # Same function for both triggers: the transition table is named changed_links in each
+        op.execute(f"""
+            CREATE OR REPLACE FUNCTION "{SCHEMA}".sync_cars_{column}() RETURNS trigger AS $$
+            BEGIN
+                UPDATE "{SCHEMA}".cars c SET {column} = {_aggregate(table, id_column)}
+                WHERE c.id IN (SELECT DISTINCT car_id FROM changed_links);
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        for event, transition in (("INSERT", "NEW"), ("DELETE", "OLD")):
+            trigger = f"{table}_sync_{column}_{event.lower()}"
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger} ON "{SCHEMA}".{table}')
+            op.execute(
+                f'CREATE TRIGGER {trigger} AFTER {event} ON "{SCHEMA}".{table} '
+                f'REFERENCING {transition} TABLE AS changed_links FOR EACH STATEMENT EXECUTE FUNCTION "{SCHEMA}".sync_cars_{column}()'
+            )
+
+    # Built CONCURRENTLY like 0003 so listing writes are not blocked while they build
+    with op.get_context().autocommit_block():
+        for column, _, _, index in ARRAYS:
+            op.create_index(
+                index, "cars", [column], schema=SCHEMA, if_not_exists=True,
+                postgresql_using="gin", postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for column, _, _, index in reversed(ARRAYS):
+            op.drop_index(index, table_name="cars", schema=SCHEMA, if_exists=True, postgresql_concurrently=True)
+    for column, table, _, _ in reversed(ARRAYS):
+        for event in ("insert", "delete"):
+            op.execute(f'DROP TRIGGER IF EXISTS {table}_sync_{column}_{event} ON "{SCHEMA}".{table}')
+        op.execute(f'DROP FUNCTION IF EXISTS "{SCHEMA}".sync_cars_{column}()')
+        op.execute(f'ALTER TABLE "{SCHEMA}".cars DROP COLUMN IF EXISTS {column}')
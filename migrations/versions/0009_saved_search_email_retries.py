@@ -0,0 +1,34 @@
+"""Retry state for saved-search email digests
+
+A digest that fails to send (SMTP error) leaves its matches pending; email_attempts and
+next_email_at space the retries out instead of marking the alerts handled.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, Sequence[str], None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "CarPlace"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(f'ALTER TABLE "{SCHEMA}".saved_search_matches ADD COLUMN IF NOT EXISTS email_attempts INTEGER NOT NULL DEFAULT 0')
+    op.execute(f'ALTER TABLE "{SCHEMA}".saved_search_matches ADD COLUMN IF NOT EXISTS next_email_at TIMESTAMP WITHOUT TIME ZONE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(f'ALTER TABLE "{SCHEMA}".saved_search_matches DROP COLUMN IF EXISTS next_email_at')
+    op.execute(f'ALTER TABLE "{SCHEMA}".saved_search_matches DROP COLUMN IF EXISTS email_attempts')
@@ -0,0 +1,69 @@
+"""One AI conversation per user and listing
+
+Concurrent first messages about a listing could each create a conversation. Existing duplicates
+are merged into the oldest one (messages moved), then a partial unique index on
+(user_id, used_car_id) backs INSERT ... ON CONFLICT DO NOTHING in routers/chat.py. Rows with
+a NULL used_car_id are left out: deleting a listing sets it to NULL on all its conversations.
+
+A duplicate created between the merge and the CONCURRENTLY build makes the build fail and leaves an
+INVALID index behind; re-running the upgrade merges again, drops that index and rebuilds it.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, Sequence[str], None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "CarPlace"
+INDEX = "ux_ai_conversations_user_id_used_car_id"  # mirrored by AIConversation.__table_args__ in models.py
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(f"""
+        CREATE TEMPORARY TABLE ai_conversation_merge ON COMMIT DROP AS
+        SELECT id, min(id) OVER (PARTITION BY user_id, used_car_id) AS keep_id
+        FROM "{SCHEMA}".ai_conversations WHERE used_car_id IS NOT NULL
+    """)
+    op.execute(f"""
+        UPDATE "{SCHEMA}".ai_messages m SET ai_conversation_id = d.keep_id
+        FROM ai_conversation_merge d WHERE m.ai_conversation_id = d.id AND d.id <> d.keep_id
+    """)
+    op.execute(f"""
+        DELETE FROM "{SCHEMA}".ai_conversations c
+        USING ai_conversation_merge d WHERE c.id = d.id AND d.id <> d.keep_id
+    """)
+    # Built CONCURRENTLY like 0003 so chat writes are not blocked while it builds
+    with op.get_context().autocommit_block():
+        # Left INVALID by a failed earlier build; IF NOT EXISTS alone would keep it (never enforced)
+        op.execute(f"""
+            DO $$ BEGIN
+                IF EXISTS (
+                    SELECT 1 FROM pg_index i
+                    JOIN pg_class c ON c.oid = i.indexrelid JOIN pg_namespace n ON n.oid = c.relnamespace
+                    WHERE n.nspname = '{SCHEMA}' AND c.relname = '{INDEX}' AND NOT i.indisvalid
+                ) THEN
+                    DROP INDEX "{SCHEMA}".{INDEX};
+                END IF;
+            END $$
+        """)
+        op.create_index(
+            INDEX, "ai_conversations", ["user_id", "used_car_id"], unique=True, schema=SCHEMA, if_not_exists=True,
+            postgresql_where="used_car_id IS NOT NULL", postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(INDEX, table_name="ai_conversations", schema=SCHEMA, if_exists=True, postgresql_concurrently=True)
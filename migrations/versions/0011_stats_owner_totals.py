@@ -0,0 +1,46 @@
+"""Drop the whole-table stats rows of cars and versions
+
+services.stats now sums the per-seller/per-dealer rows for these totals instead of upserting a
+whole-table row on every listing write (that row lock serialized all listing writes until commit).
+The rows are recreated from the base tables on downgrade.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0011"
+down_revision: Union[str, Sequence[str], None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCHEMA = "CarPlace"
+
+# (scope, table, price column, posted column) — the owner-counted scopes of services.stats
+OWNER_SCOPES = [
+    ("cars", "cars", "price", "posted_at"),
+    ("versions", "versions", "price", None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    scopes = ", ".join(f"'{scope}'" for scope, *_ in OWNER_SCOPES)
+    op.execute(f'DELETE FROM "{SCHEMA}".stats_counters WHERE owner_id = 0 AND scope IN ({scopes})')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for scope, table, price, posted in OWNER_SCOPES:
+        last_posted = f"MAX({posted})" if posted else "NULL::timestamp"
+        op.execute(
+            f'INSERT INTO "{SCHEMA}".stats_counters (scope, owner_id, row_count, price_sum, last_posted_at) '
+            f"SELECT '{scope}', 0, COUNT(*), COALESCE(SUM({price}), 0), {last_posted} FROM \"{SCHEMA}\".{table} "
+            f"ON CONFLICT (scope, owner_id) DO NOTHING"
+        )
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DECIMAL, Boolean, Date, Text, TIMESTAMP, Enum, UniqueConstraint
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, DECIMAL, Boolean, Date, Text, TIMESTAMP, Enum, UniqueConstraint, Index
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
 from datetime import datetime 
 import enum
@@ -34,6 +35,10 @@ class User(Base):
     messages_sent = relationship("Message",foreign_keys="[Message.sender_id]", back_populates="sender", cascade="all, delete-orphan")
     dealer_meta = relationship("Dealer", back_populates="user", uselist=False, cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_users_role_full_name", "role", "full_name"),  # /dealers list: WHERE role ORDER BY full_name
+    )
+
 # --- Reference Tables ---
 
 class Brand(Base):
@@ -80,12 +85,18 @@ class Version(Base):
     fuel_type = Column(String(50))
     horsepower = Column(Integer)
     price = Column(DECIMAL(10, 2), nullable=False)
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     model = relationship("Model", back_populates="versions")
     dealer = relationship("User", back_populates="dealer_versions")
     auctions = relationship("Auction", back_populates="vehicle", cascade="all, delete-orphan")
 
-    __table_args__ = (UniqueConstraint('name', 'model_id', name='_version_name_model_uc'),)
+    __table_args__ = (
+        UniqueConstraint('name', 'model_id', name='_version_name_model_uc'),
+        # /cars/new/mine, /dealers/{id}/cars and dealer stats: WHERE dealer_id ORDER BY id, avg(price)
+        Index("ix_versions_dealer_id_id", "dealer_id", "id", postgresql_include=["price"]),
+        Index("ix_versions_model_id", "model_id"),
+    )
 
 
 # --- Used Cars (Car) ---
@@ -105,6 +116,10 @@ class Car(Base):
     location = Column(String(100))
     description = Column(Text)
     posted_at = Column(TIMESTAMP, default=datetime.utcnow)
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Sorted ids mirrored from car_category_map / car_features by triggers (migration 0008); never written by the app
+    category_ids = Column(ARRAY(Integer), nullable=False, server_default="{}")
+    feature_ids = Column(ARRAY(Integer), nullable=False, server_default="{}")
 
     model = relationship("Model", back_populates="cars")
     seller = relationship("User", back_populates="used_cars")
@@ -113,6 +128,18 @@ class Car(Base):
     categories = relationship("CarCategoryMap", back_populates="car", cascade="all, delete-orphan")
     features = relationship("CarFeature", back_populates="car", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # /cars/used/mine and seller stats: WHERE seller_id ORDER BY id, count/avg(price)/max(posted_at)
+        Index("ix_cars_seller_id_id", "seller_id", "id", postgresql_include=["price", "posted_at"]),
+        Index("ix_cars_model_id_year", "model_id", "year"),
+        # /cars/used default order (posted_at desc) and order_by=price
+        Index("ix_cars_posted_at_id", "posted_at", "id"),
+        Index("ix_cars_price", "price"),
+        # /cars/used?features=&categories= (@> for all, && for any)
+        Index("ix_cars_category_ids", "category_ids", postgresql_using="gin"),
+        Index("ix_cars_feature_ids", "feature_ids", postgresql_using="gin"),
+    )
+
 
 # --- Used Cars M2M Association Tables ---
 
@@ -124,6 +151,8 @@ class CarCategoryMap(Base):
     car = relationship("Car", back_populates="categories")
     category = relationship("Category")
 
+    __table_args__ = (Index("ix_car_category_map_category_id", "category_id"),)
+
 class CarFeature(Base):
     __tablename__ = "car_features"
     car_id = Column(Integer, ForeignKey("cars.id", ondelete="CASCADE"), primary_key=True)
@@ -132,6 +161,8 @@ class CarFeature(Base):
     car = relationship("Car", back_populates="features")
     feature = relationship("Feature")
 
+    __table_args__ = (Index("ix_car_features_feature_id", "feature_id"),)
+
 
 # --- Dealers & Showrooms ---
 
@@ -158,6 +189,8 @@ class Bid(Base):
     auction = relationship("Auction", back_populates="bids")
     user = relationship("User", back_populates="bids")
 
+    __table_args__ = (Index("ix_bids_auction_id_created_at", "auction_id", "created_at"),)
+
 class AuctionStatus(enum.Enum):
     pending = "pending"
     active = "active"
@@ -181,6 +214,12 @@ class Auction(Base):
     bids = relationship("Bid", back_populates="auction")
     winner = relationship("User", back_populates="auctions_won")
 
+    __table_args__ = (
+        Index("ix_auctions_status_ends_at", "status", "ends_at"),  # active auctions by end time
+        Index("ix_auctions_vehicle_id", "vehicle_id"),
+        Index("ix_auctions_ends_at", "ends_at"),  # analytics rollup watermark range
+    )
+
 class Conversation(Base):
     __tablename__ = "conversations"
 
@@ -210,6 +249,9 @@ class Conversation(Base):
     )
     __table_args__ = (
         UniqueConstraint("used_car_id", "buyer_id", name="_conv_usedcar_buyer_uc"),
+        # /conversations: WHERE buyer_id = :u OR owner_id = :u ORDER BY last_message_at desc (BitmapOr)
+        Index("ix_conversations_buyer_id_last_message_at", "buyer_id", "last_message_at"),
+        Index("ix_conversations_owner_id_last_message_at", "owner_id", "last_message_at"),
     )
 
 class AIConversation(Base):
@@ -223,6 +265,16 @@ class AIConversation(Base):
     used_car = relationship("Car")
     messages = relationship("AIMessage", back_populates="conversation", cascade="all, delete-orphan", order_by="AIMessage.sent_at")
 
+    __table_args__ = (
+        Index("ix_ai_conversations_user_id_used_car_id", "user_id", "used_car_id"),
+        # One conversation per user and listing (migration 0010); NULL rows stay unconstrained since
+        # deleting a listing sets used_car_id to NULL on all of its conversations
+        Index(
+            "ux_ai_conversations_user_id_used_car_id", "user_id", "used_car_id",
+            unique=True, postgresql_where=used_car_id.isnot(None),
+        ),
+    )
+
 class AIMessage(Base):
     __tablename__ = "ai_messages"
     id = Column(Integer, primary_key=True, index=True)
@@ -233,6 +285,33 @@ class AIMessage(Base):
 
     conversation = relationship("AIConversation", back_populates="messages")
 
+    __table_args__ = (Index("ix_ai_messages_ai_conversation_id_sent_at", "ai_conversation_id", "sent_at"),)
+
+# --- Technical Catalogs (RAG) ---
+
+class CatalogStatus(str, enum.Enum):
+    pending = "pending"
+    processing = "processing"
+    ready = "ready"
+    failed = "failed"
+
+class CatalogDocument(Base):
+    __tablename__ = "catalog_documents"
+    id = Column(Integer, primary_key=True, index=True)
+    filename = Column(String(255), nullable=False)
+    file_path = Column(String(500), nullable=False)
+    # Scope used to filter retrieval; both NULL means a general catalog
+    brand_id = Column(Integer, ForeignKey("brands.id", ondelete="CASCADE"), nullable=True)
+    model_id = Column(Integer, ForeignKey("models.id", ondelete="CASCADE"), nullable=True)
+    status = Column(Enum(CatalogStatus), nullable=False, default=CatalogStatus.pending)
+    chunk_count = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
+    ingested_at = Column(TIMESTAMP, nullable=True)
+
+    brand = relationship("Brand")
+    model = relationship("Model")
+
 class Message(Base):
     __tablename__ = "messages"
 
@@ -248,3 +327,111 @@ class Message(Base):
     conversation = relationship("Conversation", back_populates="messages")
     sender = relationship("User", foreign_keys=[sender_id], back_populates="messages_sent")
 
+    __table_args__ = (
+        # Thread reads and the DISTINCT ON last-message lookup: WHERE conversation_id ORDER BY sent_at
+        Index("ix_messages_conversation_id_sent_at", "conversation_id", "sent_at"),
+        Index("ix_messages_sender_id", "sender_id"),
+        Index("ix_messages_sent_at", "sent_at"),  # analytics rollup watermark range
+    )
+
+
+
+# --- Reference data version (single row, bumped by every admin catalog mutation) ---
+class CatalogVersion(Base):
+    __tablename__ = "catalog_version"
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# --- Denormalized stats (maintained by services.stats in the writing transaction) ---
+class StatsCounter(Base):
+    __tablename__ = "stats_counters"
+    scope = Column(String(32), primary_key=True)      # "cars", "versions", "brands", ...
+    owner_id = Column(Integer, primary_key=True)      # seller/dealer id, 0 = whole table
+    row_count = Column(BigInteger, nullable=False, default=0)
+    price_sum = Column(DECIMAL(18, 2), nullable=False, default=0)
+    last_posted_at = Column(TIMESTAMP, nullable=True)
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# --- Analytics rollups (filled incrementally by services.analytics; no FKs so history survives deletes) ---
+class RollupWatermark(Base):
+    __tablename__ = "rollup_watermarks"
+    pipeline = Column(String(32), primary_key=True)
+    processed_until = Column(TIMESTAMP, nullable=True)   # source rows at or before this time are in the rollup
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ListingDailyRollup(Base):
+    __tablename__ = "listing_daily_rollups"
+    day = Column(Date, primary_key=True)
+    model_id = Column(Integer, primary_key=True)
+    brand_id = Column(Integer, nullable=False)
+    listings = Column(Integer, nullable=False, default=0)
+    price_sum = Column(DECIMAL(18, 2), nullable=False, default=0)
+    price_min = Column(DECIMAL(10, 2))
+    price_max = Column(DECIMAL(10, 2))
+
+    __table_args__ = (Index("ix_listing_daily_rollups_brand_id_day", "brand_id", "day"),)
+
+class AuctionDailyRollup(Base):
+    __tablename__ = "auction_daily_rollups"
+    day = Column(Date, primary_key=True)
+    ended = Column(Integer, nullable=False, default=0)
+    started = Column(Integer, nullable=False, default=0)
+    sold = Column(Integer, nullable=False, default=0)     # highest bid reached the reserve price
+    bids = Column(Integer, nullable=False, default=0)
+    sold_value = Column(DECIMAL(18, 2), nullable=False, default=0)
+
+class MessageHourlyRollup(Base):
+    __tablename__ = "message_hourly_rollups"
+    hour = Column(TIMESTAMP, primary_key=True)
+    messages = Column(Integer, nullable=False, default=0)
+
+
+# --- Deleted listing ids (written by a trigger on cars) so in-memory listing indexes can follow deletes ---
+class ListingTombstone(Base):
+    __tablename__ = "listing_tombstones"
+    car_id = Column(Integer, primary_key=True, autoincrement=False)
+    deleted_at = Column(TIMESTAMP, nullable=False, index=True)
+
+
+# --- Saved searches and their match queue (filled by services.saved_searches, read by the WebSocket push and email alerts) ---
+class SavedSearch(Base):
+    __tablename__ = "saved_searches"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String(100), nullable=False)
+    # Every set filter must hold; fuel_type / transmission are stored lower-case
+    brand_id = Column(Integer, ForeignKey("brands.id", ondelete="CASCADE"), nullable=True)
+    model_id = Column(Integer, ForeignKey("models.id", ondelete="CASCADE"), nullable=True)
+    fuel_type = Column(String(50), nullable=True)
+    transmission = Column(String(50), nullable=True)
+    min_price = Column(DECIMAL(10, 2), nullable=True)
+    max_price = Column(DECIMAL(10, 2), nullable=True)
+    min_year = Column(Integer, nullable=True)
+    max_year = Column(Integer, nullable=True)
+    notify_email = Column(Boolean, nullable=False, default=True)
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    brand = relationship("Brand")
+    model = relationship("Model")
+
+class SavedSearchMatch(Base):
+    __tablename__ = "saved_search_matches"
+    id = Column(BigInteger, primary_key=True)
+    search_id = Column(Integer, ForeignKey("saved_searches.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    car_id = Column(Integer, ForeignKey("cars.id", ondelete="CASCADE"), nullable=False)
+    matched_at = Column(TIMESTAMP, nullable=False, default=datetime.utcnow)
+    emailed_at = Column(TIMESTAMP, nullable=True)  # set once the email step handled it (also for searches without email alerts)
+    email_attempts = Column(Integer, nullable=False, server_default="0")  # failed digests; retried with backoff
+    next_email_at = Column(TIMESTAMP, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("search_id", "car_id", name="_saved_search_match_uc"),  # one alert per listing and search
+        Index("ix_saved_search_matches_user_id_id", "user_id", "id"),            # WebSocket push / GET matches
+        Index("ix_saved_search_matches_car_id", "car_id"),                       # FK cascade on listing delete
+        Index("ix_saved_search_matches_pending_email", "id", postgresql_where=emailed_at.is_(None)),
+    )
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc , func
 from database import get_db
-from models import Brand, Model, Category, User, Version, UserRole , Car 
+from models import Brand, Model, Category, User, UserRole , Car 
 from schemas import BrandBase, BrandOut, ModelBase, ModelOut, CategoryOut, AdminStatsOut , UserOut
 from .auth import role_required
+from services.reference_cache import bump_catalog_version, invalidate_reference_cache
+from services.response_cache import invalidate_tags, response_cache
+from services.stats import read_counter, read_totals, reconcile
+from services.features import ENABLED_FEATURES, disabled_features, feature_report, rss_mb
 from typing import List
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -13,23 +16,38 @@ router = APIRouter(prefix="/admin", tags=["admin"])
 
 @router.get("/stats", response_model=AdminStatsOut, dependencies=[Depends(role_required(UserRole.admin))])
 def get_stats(db: Session = Depends(get_db)) -> AdminStatsOut:
+    totals = read_totals(db, ["brands", "models", "categories", "versions", "users"])
     return AdminStatsOut(
-        total_brands=db.query(Brand).count(),
-        total_models=db.query(Model).count(),
-        total_categories=db.query(Category).count(),
-        total_new_cars=db.query(Version).count(),
-        total_users=db.query(User).count()
+        total_brands=totals["brands"],
+        total_models=totals["models"],
+        total_categories=totals["categories"],
+        total_new_cars=totals["versions"],
+        total_users=totals["users"]
     )
 
+# --- Response cache metrics (per route: hits, misses, 304s, stores) ---
+@router.get("/cache/stats", dependencies=[Depends(role_required(UserRole.admin))])
+def response_cache_stats():
+    return response_cache.stats()
+
+# --- Feature groups served by this process, with their import time and RSS cost ---
+@router.get("/features", dependencies=[Depends(role_required(UserRole.admin))])
+def served_features():
+    return {"enabled": sorted(ENABLED_FEATURES), "disabled": disabled_features(), "imports": feature_report, "rss_mb": round(rss_mb(), 1)}
+
+# --- Stats counters: compare with the base tables, repair drift (also `python manage.py reconcile-stats`) ---
+@router.post("/stats/reconcile", dependencies=[Depends(role_required(UserRole.admin))])
+def reconcile_stats(dry_run: bool = False, db: Session = Depends(get_db)):
+    return reconcile(db, fix=not dry_run)
+
 # --- Dealer Stats ---
 @router.get("/dealers/{dealer_id}/stats",dependencies=[Depends(role_required(UserRole.admin))])
 def dealer_stats(dealer_id: int, db: Session = Depends(get_db)):
     dealer = db.query(User).filter(User.id == dealer_id, User.role == UserRole.dealer).first()
     if not dealer:
         raise HTTPException(status_code=404, detail="Dealer not found")
-    total_versions = db.query(Version).filter(Version.dealer_id == dealer_id).count()
-    avg_price = db.query(func.avg(Version.price)).filter(Version.dealer_id == dealer_id).scalar()
-    return {"dealer_id": dealer.id, "dealer_name": dealer.full_name, "total_versions": total_versions, "avg_price": avg_price}
+    stats = read_counter(db, "versions", dealer_id)
+    return {"dealer_id": dealer.id, "dealer_name": dealer.full_name, "total_versions": stats.row_count, "avg_price": stats.avg_price}
 
 # --- Seller Stats ---
 @router.get("/sellers/{seller_id}/stats",dependencies=[Depends(role_required(UserRole.admin))])
@@ -37,9 +55,8 @@ def seller_stats(seller_id: int, db: Session = Depends(get_db)):
     seller = db.query(User).filter(User.id == seller_id, User.role == UserRole.seller).first()
     if not seller:
         raise HTTPException(status_code=404, detail="Seller not found")
-    total_cars = db.query(func.count()).select_from(Car).filter(Car.seller_id == seller_id).scalar()
-    avg_price = db.query(func.avg(Car.price)).filter(Car.seller_id == seller_id).scalar()
-    return {"seller_id": seller.id, "seller_name": seller.full_name, "total_cars": total_cars, "avg_price": avg_price}
+    stats = read_counter(db, "cars", seller_id)
+    return {"seller_id": seller.id, "seller_name": seller.full_name, "total_cars": stats.row_count, "avg_price": stats.avg_price}
 
 
 # --- Brands ---
@@ -52,7 +69,9 @@ def create_brand(payload: BrandBase, db: Session = Depends(get_db), user=Depends
 
     brand = Brand(**payload.dict())
     db.add(brand)
+    bump_catalog_version(db)
     db.commit()
+    invalidate_reference_cache()
     db.refresh(brand)
     return brand
 
@@ -63,7 +82,9 @@ def update_brand(brand_id: int, payload: BrandBase, db: Session = Depends(get_db
         raise HTTPException(status_code=404, detail="Brand not found")
     for key, value in payload.dict().items():
         setattr(brand, key, value)
+    bump_catalog_version(db)
     db.commit()
+    invalidate_reference_cache()
     db.refresh(brand)
     return brand
 
@@ -73,7 +94,9 @@ def delete_brand(brand_id: int, db: Session = Depends(get_db)) -> None:
     if not brand:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Brand not found")
     db.delete(brand)
+    bump_catalog_version(db)
     db.commit()
+    invalidate_reference_cache()
 
 # --- Models ---
 
@@ -84,7 +107,9 @@ def create_model_for_brand(brand_id: int, payload: ModelBase, db: Session = Depe
         raise HTTPException(status_code=404, detail="Brand not found")
     model = Model(name=payload.name, brand_id=brand_id)
     db.add(model)
+    bump_catalog_version(db)
     db.commit()
+    invalidate_reference_cache()
     db.refresh(model)
     return model
 
@@ -95,7 +120,9 @@ def update_model(model_id: int, payload: ModelBase, db: Session = Depends(get_db
         raise HTTPException(status_code=404, detail="Model not found")
     for key, value in payload.dict().items():
         setattr(model, key, value)
+    bump_catalog_version(db)
     db.commit()
+    invalidate_reference_cache()
     db.refresh(model)
     return model
 
@@ -105,7 +132,9 @@ def delete_model(model_id: int, db: Session = Depends(get_db)) -> None:
     if not model:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Model not found")
     db.delete(model)
+    bump_catalog_version(db)
     db.commit()
+    invalidate_reference_cache()
 
 # --- Categories ---
 
@@ -115,7 +144,9 @@ def create_category(name: str, db: Session = Depends(get_db), user=Depends(role_
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Category already exists")
     category = Category(name=name)
     db.add(category)
+    bump_catalog_version(db)
     db.commit()
+    invalidate_reference_cache()
     db.refresh(category)
     return category
 
@@ -125,7 +156,9 @@ def delete_category(category_id: int, db: Session = Depends(get_db)) -> None:
     if not category:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
     db.delete(category)
+    bump_catalog_version(db)
     db.commit()
+    invalidate_reference_cache()
 
 # --- Users ---
 
@@ -134,8 +167,11 @@ def delete_user(user_id: int, db: Session = Depends(get_db)) -> None:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    car_ids = [car_id for (car_id,) in db.query(Car.id).filter(Car.seller_id == user_id)]
     db.delete(user)
     db.commit()
+    # Their listings, versions and dealer profile go with them (cascade)
+    invalidate_tags("dealers", f"dealer:{user_id}", "new_cars", *(f"used_car:{car_id}" for car_id in car_ids))
 
 @router.get("/users", response_model=List[UserOut])
 def list_users(
@@ -159,5 +195,6 @@ def toggle_user_2fa(
     
     user.is_2fa_enabled = enabled
     db.commit()
+    invalidate_tags("dealers")
     db.refresh(user)
     return user
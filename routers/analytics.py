@@ -0,0 +1,59 @@
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from database import get_db
+from models import UserRole
+from schemas import ListingTrendOut, AuctionTrendOut, MessageVolumeOut, RollupStatusOut
+from .auth import role_required
+from services.analytics import listing_series, auction_series, message_series, rollup_status
+from typing import List, Optional
+
+# Trend series read from the rollup tables (filled by `python manage.py rollup`), never from the source tables
+router = APIRouter(prefix="/admin/analytics", tags=["admin analytics"])
+
+DAILY_INTERVALS = "^(day|week|month)$"
+
+
+def _default_since(days: int) -> date:
+    return date.today() - timedelta(days=days)
+
+
+# --- Listing volume and price trend, optionally per brand/model ---
+@router.get("/listings", response_model=List[ListingTrendOut], dependencies=[Depends(role_required(UserRole.admin))])
+def listing_trends(
+    db: Session = Depends(get_db),
+    since: Optional[date] = Query(None, description="First day (default: 90 days ago)"),
+    until: Optional[date] = Query(None, description="Last day (default: today)"),
+    interval: str = Query("day", regex=DAILY_INTERVALS),
+    brand_id: Optional[int] = Query(None),
+    model_id: Optional[int] = Query(None),
+):
+    return listing_series(db, since or _default_since(90), until or date.today(), interval, brand_id, model_id)
+
+
+# --- Auction outcomes by end date: conversion = sold / started ---
+@router.get("/auctions", response_model=List[AuctionTrendOut], dependencies=[Depends(role_required(UserRole.admin))])
+def auction_trends(
+    db: Session = Depends(get_db),
+    since: Optional[date] = Query(None, description="First day (default: 90 days ago)"),
+    until: Optional[date] = Query(None, description="Last day (default: today)"),
+    interval: str = Query("day", regex=DAILY_INTERVALS),
+):
+    return auction_series(db, since or _default_since(90), until or date.today(), interval)
+
+
+# --- Buyer/seller message volume ---
+@router.get("/messages", response_model=List[MessageVolumeOut], dependencies=[Depends(role_required(UserRole.admin))])
+def message_volume(
+    db: Session = Depends(get_db),
+    since: Optional[datetime] = Query(None, description="Start (UTC, default: 48 hours ago)"),
+    until: Optional[datetime] = Query(None, description="End (UTC, default: now)"),
+    interval: str = Query("hour", regex="^(hour|day|week|month)$"),
+):
+    return message_series(db, since or datetime.utcnow() - timedelta(hours=48), until or datetime.utcnow(), interval)
+
+
+# --- Pipeline watermarks (how fresh the series are) ---
+@router.get("/status", response_model=List[RollupStatusOut], dependencies=[Depends(role_required(UserRole.admin))])
+def analytics_status(db: Session = Depends(get_db)):
+    return rollup_status(db)
@@ -41,6 +41,8 @@ def start_auction(auction_id: int, db: Session = Depends(get_db),
     auction = db.query(Auction).filter(Auction.id == auction_id).first()
     if not auction:
         raise HTTPException(status_code=404, detail="Auction not found")
+    if auction.ends_at <= datetime.utcnow():
+        raise HTTPException(status_code=400, detail="Auction has already ended")
     auction.status = AuctionStatus.active
     db.commit()
     return {"message": f"Auction {auction_id} started"}
@@ -89,6 +91,11 @@ async def bid(websocket: WebSocket, auction_id: int, db: Session = Depends(get_d
             if not auction or auction.status != AuctionStatus.active:
                 await websocket.send_text("Auction not active")
                 continue
+            # Bids close at ends_at whether or not the dealer has called /end yet: the analytics
+            # rollup counts an auction's result once, on its ends_at day
+            if auction.ends_at <= datetime.utcnow():
+                await websocket.send_text("Auction has ended")
+                continue
 
             if auction.highest_bid is None or bid_amount > float(auction.highest_bid):
                 auction.highest_bid = bid_amount
@@ -9,6 +9,7 @@ from models import User, UserRole
 from schemas import UserOut, UserCreate, Token, OTPVerify, LoginResponse, LoginRequest
 from database import get_db
 from services.email_service import send_otp_email
+from services.response_cache import invalidate_tags
 import random
 
 import os
@@ -24,6 +25,7 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
 # --- Security ---
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 bearer_scheme = HTTPBearer()
+optional_bearer_scheme = HTTPBearer(auto_error=False)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # --- Auth utils ---
@@ -71,6 +73,16 @@ def get_current_user(token: Optional[str] = None, db: Session = Depends(get_db),
     return user
 
 
+def get_optional_user_id(auth: Optional[HTTPAuthorizationCredentials] = Depends(optional_bearer_scheme)) -> Optional[int]:
+    """User id from a valid bearer token, None for anonymous callers (no database lookup)."""
+    if not auth:
+        return None
+    try:
+        return int(jwt.decode(auth.credentials, SECRET_KEY, algorithms=[ALGORITHM]).get("sub"))
+    except (JWTError, TypeError, ValueError):
+        return None
+
+
 def role_required(*allowed: UserRole):
     allowed_roles: Set[UserRole] = set(allowed)
     def checker(user: User = Depends(get_current_user)) -> User:
@@ -94,6 +106,8 @@ def register(payload: UserCreate, db: Session = Depends(get_db)) -> UserOut:
     )
     db.add(user)
     db.commit()
+    if user.role == UserRole.dealer:
+        invalidate_tags("dealers")
     db.refresh(user)
     return user
 
@@ -1,16 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc
 from database import get_db
-from models import Brand, Model
 from schemas import BrandOut, ModelOut
+from services.reference_cache import get_reference_catalog, not_modified, paginate
 from typing import List
 
 router = APIRouter(prefix="/brands", tags=["brands"])
 
+# Served from the in-memory reference catalog; ETag changes with the catalog version
+
 # --- List all brands with optional filtering ---
 @router.get("/", response_model=List[BrandOut])
 def list_brands(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     name: str | None = Query(None, description="Filter by brand name (case-insensitive)"),
     limit: int = Query(20, ge=1, le=100),
@@ -18,38 +21,40 @@ def list_brands(
     order_by: str = Query("name", description="Sort by field"),
     order_dir: str = Query("asc", regex="^(asc|desc)$", description="Sort direction"),
 ) -> List[BrandOut]:
-    query = db.query(Brand)
+    catalog = get_reference_catalog(db)
+    if cached := not_modified(request, response, catalog):
+        return cached
+    brands = catalog.brands.values()
     if name:
-        query = query.filter(Brand.name.ilike(f"%{name}%"))
-    if hasattr(Brand, order_by):
-        col = getattr(Brand, order_by)
-        query = query.order_by(asc(col) if order_dir == "asc" else desc(col))
-    return query.offset(offset).limit(limit).all()
+        brands = [b for b in brands if name.lower() in b.name.lower()]
+    return paginate(brands, order_by, order_dir, offset, limit)
 
 # --- Get brand by ID ---
 @router.get("/{brand_id}", response_model=BrandOut)
-def get_brand(brand_id: int, db: Session = Depends(get_db)) -> BrandOut:
-    brand = db.query(Brand).filter(Brand.id == brand_id).first()
+def get_brand(brand_id: int, request: Request, response: Response, db: Session = Depends(get_db)) -> BrandOut:
+    catalog = get_reference_catalog(db)
+    brand = catalog.brands.get(brand_id)
     if not brand:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Brand not found")
+    if cached := not_modified(request, response, catalog):
+        return cached
     return brand
 
 # --- List models for a brand ---
 @router.get("/{brand_id}/models", response_model=List[ModelOut])
 def list_models_by_brand(
     brand_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
     order_by: str = Query("name"),
     order_dir: str = Query("asc", regex="^(asc|desc)$")
 ) -> List[ModelOut]:
-    brand = db.query(Brand).filter(Brand.id == brand_id).first()
-    if not brand:
+    catalog = get_reference_catalog(db)
+    if brand_id not in catalog.brands:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Brand not found")
-        
-    query = db.query(Model).filter(Model.brand_id == brand_id)
-    if hasattr(Model, order_by):
-        col = getattr(Model, order_by)
-        query = query.order_by(asc(col) if order_dir == "asc" else desc(col))
-    return query.offset(offset).limit(limit).all()
\ No newline at end of file
+    if cached := not_modified(request, response, catalog):
+        return cached
+    return paginate(catalog.models_by_brand.get(brand_id, []), order_by, order_dir, offset, limit)
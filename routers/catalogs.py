@@ -0,0 +1,104 @@
+import os
+import uuid
+from pathlib import Path
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
+from sqlalchemy.orm import Session
+from database import get_db
+from models import Brand, Model, CatalogDocument, CatalogStatus, UserRole
+from schemas import CatalogDocumentOut
+from .auth import role_required
+from services.catalog_store import CATALOG_DIR, register_document, submit_ingestion, delete_shard
+from typing import List
+
+router = APIRouter(prefix="/admin/catalogs", tags=["admin"], dependencies=[Depends(role_required(UserRole.admin))])
+
+CATALOG_MAX_UPLOAD_BYTES = int(os.getenv("CATALOG_MAX_UPLOAD_MB", "50")) * 2**20
+
+
+def _save_upload(file: UploadFile) -> Path:
+    """Copies an uploaded PDF to the catalog directory in 1 MB chunks, enforcing the size cap."""
+    if file.file.read(5) != b"%PDF-":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File is not a PDF.")
+    file.file.seek(0)
+
+    CATALOG_DIR.mkdir(parents=True, exist_ok=True)
+    path = CATALOG_DIR / f"{uuid.uuid4().hex}.pdf"
+    written = 0
+    with open(path, "wb") as out:
+        while chunk := file.file.read(1024 * 1024):
+            written += len(chunk)
+            if written > CATALOG_MAX_UPLOAD_BYTES:
+                out.close()
+                path.unlink(missing_ok=True)
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Catalog file too large.")
+            out.write(chunk)
+    return path
+
+
+# --- Upload a technical catalog (ingested in the background) ---
+@router.post("/", response_model=CatalogDocumentOut, status_code=status.HTTP_202_ACCEPTED)
+def upload_catalog(
+    file: UploadFile = File(...),
+    brand_id: int | None = Form(None),
+    model_id: int | None = Form(None),
+    db: Session = Depends(get_db),
+) -> CatalogDocumentOut:
+    if model_id is not None:
+        model = db.query(Model).filter(Model.id == model_id).first()
+        if not model:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Model does not exist.")
+        brand_id = model.brand_id
+    elif brand_id is not None and not db.query(Brand).filter(Brand.id == brand_id).first():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Brand does not exist.")
+
+    path = _save_upload(file)
+    doc = register_document(db, str(path), file.filename or path.name, brand_id, model_id)
+    submit_ingestion(doc.id)
+    return doc
+
+
+# --- Upload a new revision of a catalog (only changed pages are re-embedded) ---
+@router.put("/{document_id}", response_model=CatalogDocumentOut, status_code=status.HTTP_202_ACCEPTED)
+def replace_catalog(
+    document_id: int,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+) -> CatalogDocumentOut:
+    doc = db.query(CatalogDocument).filter(CatalogDocument.id == document_id).first()
+    if not doc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Catalog not found")
+    if doc.status == CatalogStatus.processing:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Catalog is being ingested")
+
+    old_path = Path(doc.file_path)
+    doc.file_path = str(_save_upload(file))
+    doc.filename = file.filename or doc.filename
+    doc.status = CatalogStatus.pending
+    db.commit()
+    db.refresh(doc)
+    if old_path.parent == CATALOG_DIR:
+        old_path.unlink(missing_ok=True)
+
+    submit_ingestion(doc.id)
+    return doc
+
+
+# --- List catalogs and their ingestion status ---
+@router.get("/", response_model=List[CatalogDocumentOut])
+def list_catalogs(db: Session = Depends(get_db)) -> List[CatalogDocumentOut]:
+    return db.query(CatalogDocument).order_by(CatalogDocument.created_at.desc()).all()
+
+
+# --- Delete a catalog ---
+@router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_catalog(document_id: int, db: Session = Depends(get_db)) -> None:
+    doc = db.query(CatalogDocument).filter(CatalogDocument.id == document_id).first()
+    if not doc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Catalog not found")
+    file_path = Path(doc.file_path)
+    db.delete(doc)
+    db.commit()
+    delete_shard(document_id)
+    # Only remove uploads; catalogs registered from elsewhere on disk are left alone
+    if file_path.parent == CATALOG_DIR:
+        file_path.unlink(missing_ok=True)
@@ -2,20 +2,27 @@
 import os
 import httpx
 from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
 from pydantic import BaseModel
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from typing import List
 
 from database import get_db
 from routers.auth import get_current_user
-from models import User, Car, AIConversation, AIMessage
+from models import User, AIConversation, AIMessage
 from schemas import AIConversationOut
+from services.listing_context import get_listing_context
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
+# Without a key the router still loads (conversation history stays readable); chat replies 503
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
-    raise RuntimeError("GEMINI_API_KEY is not set")
+    print("[chat] GEMINI_API_KEY is not set; POST /chat will return 503")
+
+GENERAL_CONVERSATION_LOCK_CLASS = 0x43415402  # pg advisory xact lock (class, user id) for the no-listing conversation
 
 class ChatIn(BaseModel):
     used_car_id: int | None = None
@@ -25,30 +32,49 @@ class ChatOut(BaseModel):
     ai_conversation_id: int
     reply: str
 
+def _upsert_ai_conversation(db: Session, user_id: int, used_car_id: int | None) -> int:
+    """
+    Returns the id of the user's AI conversation for a listing, creating it if needed.
+    Listing conversations rely on the unique index from migration 0010 (INSERT ... ON CONFLICT DO
+    NOTHING); the general conversation (no listing) is serialized per user with an advisory lock.
+    """
+    existing = select(AIConversation.id).where(AIConversation.user_id == user_id)
+    if used_car_id is None:
+        db.execute(select(func.pg_advisory_xact_lock(GENERAL_CONVERSATION_LOCK_CLASS, user_id)))
+        conv_id = db.execute(existing.where(AIConversation.used_car_id.is_(None)).order_by(AIConversation.id).limit(1)).scalar()
+        if conv_id is None:
+            conv_id = db.execute(
+                pg_insert(AIConversation).values(user_id=user_id, created_at=datetime.utcnow()).returning(AIConversation.id)
+            ).scalar_one()
+    else:
+        conv_id = db.execute(
+            pg_insert(AIConversation)
+            .values(user_id=user_id, used_car_id=used_car_id, created_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=["user_id", "used_car_id"], index_where=AIConversation.used_car_id.isnot(None))
+            .returning(AIConversation.id)
+        ).scalar()
+        if conv_id is None:  # already exists: ON CONFLICT DO NOTHING returns no row
+            conv_id = db.execute(existing.where(AIConversation.used_car_id == used_car_id)).scalar_one()
+    db.commit()
+    return conv_id
+
 @router.post("", response_model=ChatOut)
 async def chat(
     payload: ChatIn, 
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    if not GEMINI_API_KEY:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="AI assistant is not configured")
     user_text = payload.message.strip()
     if not user_text:
         raise HTTPException(status_code=400, detail="Empty message")
 
-    # 1. Get or create AI Conversation automatically
-    conv = db.query(AIConversation).filter(
-        AIConversation.user_id == current_user.id,
-        AIConversation.used_car_id == payload.used_car_id
-    ).first()
-
-    if not conv:
-        conv = AIConversation(user_id=current_user.id, used_car_id=payload.used_car_id)
-        db.add(conv)
-        db.commit()
-        db.refresh(conv)
+    # 1. Get or create AI Conversation automatically (single statement)
+    conv_id = _upsert_ai_conversation(db, current_user.id, payload.used_car_id)
 
     # 2. Build history and context
-    history = db.query(AIMessage).filter(AIMessage.ai_conversation_id == conv.id).order_by(AIMessage.sent_at.asc()).all()
+    history = db.query(AIMessage).filter(AIMessage.ai_conversation_id == conv_id).order_by(AIMessage.sent_at.asc()).all()
     
     system_prompt = (
         "You are 'Antigravity Car Assistant', a helpful AI for the CarPlace marketplace. "
@@ -57,17 +83,10 @@ async def chat(
         "Keep responses concise and suitable for text-to-speech."
     )
 
-    if conv.used_car_id:
-        car = db.query(Car).get(conv.used_car_id)
-        if car:
-            system_prompt += (
-                f"\n\nCONTEXT - CURRENT LISTING:\n"
-                f"- Car: {car.year} {car.model.brand.name} {car.model.name}\n"
-                f"- Price: ${car.price}\n"
-                f"- Mileage: {car.mileage}km\n"
-                f"- Fuel: {car.fuel_type}, Trans: {car.transmission}\n"
-                f"- Description: {car.description}"
-            )
+    if payload.used_car_id:
+        listing_context = get_listing_context(db, payload.used_car_id)
+        if listing_context:
+            system_prompt += listing_context
 
     # 3. Prepare Gemini request
     # Convert history for Gemini (limited to last 10 messages for token efficiency)
@@ -99,12 +118,12 @@ async def chat(
         raise HTTPException(status_code=502, detail="Unexpected Gemini response format")
 
     # 5. Save to database
-    user_msg = AIMessage(ai_conversation_id=conv.id, role="user", content=user_text)
-    assistant_msg = AIMessage(ai_conversation_id=conv.id, role="assistant", content=reply_text)
+    user_msg = AIMessage(ai_conversation_id=conv_id, role="user", content=user_text)
+    assistant_msg = AIMessage(ai_conversation_id=conv_id, role="assistant", content=reply_text)
     db.add_all([user_msg, assistant_msg])
     db.commit()
 
-    return ChatOut(ai_conversation_id=conv.id, reply=reply_text)
+    return ChatOut(ai_conversation_id=conv_id, reply=reply_text)
 
 @router.get("/conversations", response_model=List[AIConversationOut])
 def list_ai_conversations(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
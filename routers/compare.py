@@ -1,24 +1,33 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import get_db
-from routers.used_cars import get_car_with_relations, format_used_car_output
-from services.AIComparision import generate_comparison_with_pdf  # keep this import as in your project
+import os
+from routers.used_cars import get_car_with_relations, get_cars_with_relations, format_used_car_output
+from schemas import CompareBatchRequest, CompareMode
+from services.AIComparision import (  # keep this import as in your project
+    generate_comparison_with_pdf,
+    generate_matrix_comparison,
+    generate_pairwise_comparisons,
+    retrieve_model_contexts,
+)
+from services.catalog_store import catalog_store
 
 router = APIRouter(prefix="/compare", tags=["AI Comparison"])
 
+COMPARE_MAX_CONCURRENCY = int(os.getenv("COMPARE_MAX_CONCURRENCY", "4"))
+
 
 @router.get("/")
 async def compare_cars(
     car1_id: int,
     car2_id: int,
-    pdf_path: str | None = None,  # now optional
     db: Session = Depends(get_db),
 ):
     """
-    Compare two used cars by ID using an AI summary based on a PDF catalog.
+    Compare two used cars by ID using an AI summary grounded in the ingested technical catalogs.
 
     - car1_id, car2_id: IDs from the used cars table
-    - pdf_path: optional override; if omitted, the service uses its DEFAULT_PDF_PATH
+    - Catalog context is retrieved from the catalogs of the two cars' brands/models plus general catalogs
     """
     # Fetch cars with all relations (brand, model, categories, features)
     car1 = get_car_with_relations(db, car1_id)
@@ -31,12 +40,55 @@ async def compare_cars(
     car1_dict = format_used_car_output(car1).dict()
     car2_dict = format_used_car_output(car2).dict()
 
-    # Generate AI summary (RAG over catalog PDF)
-    ai_summary = await generate_comparison_with_pdf(car1_dict, car2_dict, pdf_path)
+    # Generate AI summary (RAG over the catalog store; requests only query it)
+    catalog_store.refresh(db)
+    ai_summary = await generate_comparison_with_pdf(
+        car1_dict,
+        car2_dict,
+        brand_ids=[car1.model.brand_id, car2.model.brand_id],
+        model_ids=[car1.model_id, car2.model_id],
+    )
 
     return {
         "car1_id": car1_id,
         "car2_id": car2_id,
-        "pdf_used": pdf_path,  # will be None if default was used—optional, but handy
         "ai_summary": ai_summary,
     }
+
+
+@router.post("/batch")
+async def compare_cars_batch(
+    payload: CompareBatchRequest,
+    db: Session = Depends(get_db),
+):
+    """
+    Compare a shortlist of 2-5 used cars in one request.
+
+    - mode=matrix: a single side-by-side comparison of all cars (one LLM call)
+    - mode=pairwise: every pair compared separately, LLM calls run concurrently (bounded fan-out)
+    """
+    car_ids = list(dict.fromkeys(payload.car_ids))
+    if len(car_ids) < 2:
+        raise HTTPException(status_code=400, detail="Provide at least two distinct cars")
+
+    # All listings in one query, kept in request order
+    by_id = {car.id: car for car in get_cars_with_relations(db, car_ids)}
+    missing = [car_id for car_id in car_ids if car_id not in by_id]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Car not found: {missing}")
+
+    cars = [
+        {**format_used_car_output(by_id[car_id]).dict(), "brand_id": by_id[car_id].model.brand_id, "model_id": by_id[car_id].model_id}
+        for car_id in car_ids
+    ]
+
+    # Catalog context once per distinct model
+    catalog_store.refresh(db)
+    contexts = await retrieve_model_contexts(cars)
+
+    if payload.mode == CompareMode.pairwise:
+        comparisons = await generate_pairwise_comparisons(cars, contexts, max_concurrency=COMPARE_MAX_CONCURRENCY)
+        return {"car_ids": car_ids, "mode": payload.mode, "comparisons": comparisons}
+
+    ai_summary = await generate_matrix_comparison(cars, contexts)
+    return {"car_ids": car_ids, "mode": payload.mode, "ai_summary": ai_summary}
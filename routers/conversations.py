@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
 from sqlalchemy.orm import Session, joinedload
 from datetime import datetime
+import orjson
 from typing import Dict, List, Tuple
 
 from database import get_db
 from models import Conversation, Car, Message, User
 from routers.auth import get_current_user
+from services.serialization import compile_serializer, json_response
 from schemas import (
     ConversationCreate,
     ConversationOut,
@@ -17,33 +19,40 @@ from schemas import (
 router = APIRouter(prefix="/conversations", tags=["conversations"])
 
 
-def _format_message(message: Message) -> MessageOut:
-    # MessageOut is configured with from_attributes=True, so from_orm will nest sender
-    return MessageOut.from_orm(message)
+# Fast path: ORM rows straight to JSON (see services/serialization.py)
+message_serializer = compile_serializer(MessageOut)
+conversation_serializer = compile_serializer(ConversationOut, {"last_message": lambda conv: None})
 
 
-def _format_conversation(conv: Conversation, db: Session, include_messages: bool = False):
-    # Load last message
-    last_msg = db.query(Message).filter(Message.conversation_id == conv.id).order_by(Message.sent_at.desc()).first()
-    last_message_out = _format_message(last_msg) if last_msg else None
+def _last_messages(db: Session, conversation_ids: List[int]) -> Dict[int, Message]:
+    """Latest message of each conversation in one query (DISTINCT ON), senders included."""
+    if not conversation_ids:
+        return {}
+    messages = db.query(Message).options(joinedload(Message.sender)).filter(
+        Message.conversation_id.in_(conversation_ids)
+    ).distinct(Message.conversation_id).order_by(Message.conversation_id, Message.sent_at.desc()).all()
+    return {m.conversation_id: m for m in messages}
 
-    base = ConversationOut.construct(
-        id=conv.id,
-        used_car_id=conv.used_car_id,
-        buyer=conv.buyer,
-        owner=conv.owner,
-        created_at=conv.created_at,
-        last_message_at=conv.last_message_at,
-        last_message=last_message_out,
-    )
 
+def _serialize_conversations(db: Session, convs: List[Conversation]) -> List[dict]:
+    last = _last_messages(db, [c.id for c in convs])
+    out = []
+    for conv in convs:
+        data = conversation_serializer(conv)
+        data["last_message"] = message_serializer(last.get(conv.id))
+        out.append(data)
+    return out
+
+
+def _format_conversation(conv: Conversation, db: Session, include_messages: bool = False) -> dict:
+    data = _serialize_conversations(db, [conv])[0]
     if include_messages:
         # ensure messages and senders are loaded in order
-        conv_messages = db.query(Message).filter(Message.conversation_id == conv.id).order_by(Message.sent_at).all()
-        msgs = [_format_message(m) for m in conv_messages]
-        return ConversationWithMessagesOut(**base.__dict__, messages=msgs)
-
-    return base
+        conv_messages = db.query(Message).options(joinedload(Message.sender)).filter(
+            Message.conversation_id == conv.id
+        ).order_by(Message.sent_at).all()
+        data["messages"] = [message_serializer(m) for m in conv_messages]
+    return data
 
 
 @router.post("/", response_model=ConversationOut, status_code=status.HTTP_201_CREATED)
@@ -65,7 +74,7 @@ def create_conversation(
     existing = db.query(Conversation).filter(Conversation.used_car_id == payload.used_car_id, Conversation.buyer_id == current_user.id).first()
     if existing:
         # return existing conversation
-        return _format_conversation(existing, db)
+        return json_response(_format_conversation(existing, db), ConversationOut, status_code=status.HTTP_201_CREATED)
 
     conv = Conversation(used_car_id=payload.used_car_id, buyer_id=current_user.id, owner_id=car.seller_id)
     db.add(conv)
@@ -79,7 +88,7 @@ def create_conversation(
 
     db.commit()
     db.refresh(conv)
-    return _format_conversation(conv, db)
+    return json_response(_format_conversation(conv, db), ConversationOut, status_code=status.HTTP_201_CREATED)
 
 
 @router.get("/", response_model=list[ConversationOut])
@@ -91,7 +100,7 @@ def list_conversations(
         (Conversation.buyer_id == current_user.id) | (Conversation.owner_id == current_user.id)
     ).order_by(Conversation.last_message_at.desc()).all()
 
-    return [_format_conversation(c, db) for c in convs]
+    return json_response(_serialize_conversations(db, convs), List[ConversationOut])
 
 
 @router.get("/{conversation_id}", response_model=ConversationWithMessagesOut)
@@ -103,7 +112,7 @@ def get_conversation(conversation_id: int, db: Session = Depends(get_db), curren
     if current_user.id not in (conv.buyer_id, conv.owner_id):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not a participant")
 
-    return _format_conversation(conv, db, include_messages=True)
+    return json_response(_format_conversation(conv, db, include_messages=True), ConversationWithMessagesOut)
 
 @router.patch("/messages/{message_id}/read", response_model=MessageOut)
 def mark_read(message_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> MessageOut:
@@ -118,7 +127,7 @@ def mark_read(message_id: int, db: Session = Depends(get_db), current_user: User
     msg.read_at = datetime.utcnow()
     db.commit()
     db.refresh(msg)
-    return _format_message(msg)
+    return json_response(message_serializer(msg), MessageOut)
 
 
 # --- WebSocket chat for real-time messaging ---
@@ -194,7 +203,7 @@ async def chat_ws(websocket: WebSocket, conversation_id: int, db: Session = Depe
             db.commit()
             db.refresh(msg)
 
-            payload = MessageOut.from_orm(msg).json()
+            payload = orjson.dumps(message_serializer(msg)).decode()
 
             # Broadcast to other participant(s)
             await manager.broadcast_except(conversation_id, payload, current_user.id)
@@ -5,10 +5,25 @@ from database import get_db
 from models import User, UserRole, Version , Dealer
 from schemas import UserOut, VersionOut , DealerMetaOut, DealerMetaUpdate, DealerWithMetaOut
 from .auth import get_current_user, role_required
+from services.response_cache import invalidate_tags
+from services.serialization import compile_serializer, json_response, schema_columns
+from types import SimpleNamespace
 from typing import List, Union
 
 router = APIRouter(prefix="/dealers", tags=["dealers"])
 
+# List views: only the UserOut / DealerMetaOut / VersionOut columns (never hashed_password or OTP fields)
+DEALER_COLUMNS = schema_columns(UserOut, User)
+DEALER_META_COLUMNS = [c.label(f"meta_{c.key}") for c in schema_columns(DealerMetaOut, Dealer)]
+VERSION_COLUMNS = schema_columns(VersionOut, Version)
+dealer_serializer = compile_serializer(UserOut)
+dealer_with_meta_serializer = compile_serializer(DealerWithMetaOut, {
+    "dealer_meta": lambda row: None if row.meta_id is None else SimpleNamespace(
+        **{f: getattr(row, f"meta_{f}") for f in DealerMetaOut.model_fields}
+    ),
+})
+version_serializer = compile_serializer(VersionOut)
+
 # --- List all dealers ---
 @router.get("/", response_model=List[Union[DealerWithMetaOut, UserOut]])
 def list_dealers(
@@ -19,16 +34,17 @@ def list_dealers(
     order_by: str = Query("full_name", description="Sort by field"),
     order_dir: str = Query("asc", regex="^(asc|desc)$", description="Sort direction"),
 ) -> List[Union[DealerWithMetaOut, UserOut]]:
-    query = db.query(User).filter(User.role == UserRole.dealer, User.is_active == True)
+    columns = DEALER_COLUMNS + DEALER_META_COLUMNS if include_meta else DEALER_COLUMNS
+    query = db.query(*columns).select_from(User).filter(User.role == UserRole.dealer, User.is_active == True)
+    if include_meta:
+        query = query.outerjoin(Dealer, Dealer.user_id == User.id)
     if hasattr(User, order_by):
         col = getattr(User, order_by)
         query = query.order_by(asc(col) if order_dir == "asc" else desc(col))
     
-    dealers = query.offset(offset).limit(limit).all()
-    
-    if include_meta:
-        return [DealerWithMetaOut.from_orm(d) for d in dealers]
-    return dealers
+    rows = query.offset(offset).limit(limit).all()
+    serializer = dealer_with_meta_serializer if include_meta else dealer_serializer
+    return json_response([serializer(row) for row in rows], List[Union[DealerWithMetaOut, UserOut]])
 
 # --- Get dealer by ID ---
 @router.get("/{dealer_id}", response_model=UserOut)
@@ -46,11 +62,11 @@ def list_cars_by_dealer(
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
 ) -> List[VersionOut]:
-    dealer = db.query(User).filter(User.id == dealer_id, User.role == UserRole.dealer).first()
-    if not dealer:
+    if not db.query(User.id).filter(User.id == dealer_id, User.role == UserRole.dealer).first():
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dealer not found")
     
-    return db.query(Version).filter(Version.dealer_id == dealer_id).offset(offset).limit(limit).all()
+    rows = db.query(*VERSION_COLUMNS).filter(Version.dealer_id == dealer_id).order_by(Version.id).offset(offset).limit(limit).all()
+    return json_response([version_serializer(row) for row in rows], List[VersionOut])
 
 # --- Search dealers by name/email ---
 @router.get("/search/", response_model=List[UserOut])
@@ -60,14 +76,14 @@ def search_dealers(
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
 ) -> List[UserOut]:
-    dealers_list = db.query(User).filter(
+    dealers_list = db.query(*DEALER_COLUMNS).filter(
         User.role == UserRole.dealer,
         # Use .ilike for case-insensitive search
         (User.full_name.ilike(f"%{q}%")) | (User.email.ilike(f"%{q}%"))
     ).offset(offset).limit(limit).all()
     if not dealers_list:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No dealers found matching the search criteria")
-    return dealers_list
+    return json_response([dealer_serializer(row) for row in dealers_list], List[UserOut])
 
 # --- Get dealer metadata ---
 @router.get("/{dealer_id}/meta", response_model=DealerMetaOut)
@@ -94,5 +110,6 @@ def update_my_meta(
         for key, value in payload.dict(exclude_unset=True).items():
             setattr(dealer_meta, key, value)
     db.commit()
+    invalidate_tags("dealers", f"dealer:{current_user.id}")
     db.refresh(dealer_meta)
     return dealer_meta
@@ -1,14 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import asc, desc, func
 from database import get_db
 from models import Brand, Model, Version, User, UserRole
 from schemas import VersionCreate, VersionUpdate, VersionOut
 from .auth import role_required
+from services.export import changed_after, export_response, whole_seconds
+from services.response_cache import invalidate_tags
+from services.serialization import compile_serializer, json_response, schema_columns
+from services.stats import read_counter
 from typing import List
 
 router = APIRouter(prefix="/cars/new", tags=["new cars (Dealer Only)"])
 
+# List view: VersionOut columns as plain rows (no ORM entities for read-only lists)
+VERSION_LIST_COLUMNS = schema_columns(VersionOut, Version)
+version_serializer = compile_serializer(VersionOut)
+
 # --- Create a new car version (Dealer Only) ---
 @router.post("/", response_model=VersionOut, status_code=status.HTTP_201_CREATED)
 def add_new_car(
@@ -36,6 +44,7 @@ def add_new_car(
     version = Version(**payload.dict(), dealer_id=current_dealer.id)
     db.add(version)
     db.commit()
+    invalidate_tags("new_cars")
     db.refresh(version)
     return version
 
@@ -52,7 +61,7 @@ def list_new_cars(
     order_by: str | None = Query("name"),
     order_dir: str = Query("asc", regex="^(asc|desc)$")
 ) -> List[VersionOut]:
-    query = db.query(Version).join(Model).join(Brand)
+    query = db.query(*VERSION_LIST_COLUMNS).select_from(Version).join(Model, Version.model_id == Model.id).join(Brand, Model.brand_id == Brand.id)
     if brand:
         query = query.filter(Brand.name.ilike(f"%{brand}%"))
     if model:
@@ -66,7 +75,58 @@ def list_new_cars(
         col = getattr(Version, order_by)
         query = query.order_by(asc(col) if order_dir == "asc" else desc(col))
     
-    return query.offset(offset).limit(limit).all()
+    rows = query.offset(offset).limit(limit).all()
+    return json_response([version_serializer(row) for row in rows], List[VersionOut])
+
+# --- Export new cars catalog (NDJSON / CSV stream) ---
+NEW_CAR_EXPORT_COLUMNS = [
+    "id", "dealer_id", "brand_name", "model_name", "name", "year", "transmission", "fuel_type",
+    "horsepower", "price", "updated_at",
+]
+
+@router.get("/export")
+def export_new_cars(
+    request: Request,
+    db: Session = Depends(get_db),
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    brand: str | None = Query(None),
+    model: str | None = Query(None),
+    fuel_type: str | None = Query(None),
+    transmission: str | None = Query(None),
+):
+    """
+    Full filtered catalog in one streamed response (server-side cursor, constant memory).
+    Send the previous Last-Modified back as If-Modified-Since to get only rows changed since then
+    (plus a short overlap, so dedupe by id). Incremental exports are upsert-only: deleted versions
+    are not reported, so consumers need a periodic full export to drop them.
+    """
+    def filtered(query):
+        query = query.join(Model, Version.model_id == Model.id).join(Brand, Model.brand_id == Brand.id)
+        if brand:
+            query = query.filter(Brand.name.ilike(f"%{brand}%"))
+        if model:
+            query = query.filter(Model.name.ilike(f"%{model}%"))
+        if fuel_type:
+            query = query.filter(Version.fuel_type.ilike(f"%{fuel_type}%"))
+        if transmission:
+            query = query.filter(Version.transmission.ilike(f"%{transmission}%"))
+        return query
+
+    since = changed_after(request.headers.get("if-modified-since"))
+    last_modified = whole_seconds(filtered(db.query(func.max(Version.updated_at)).select_from(Version)).scalar())
+    if since and (last_modified is None or last_modified <= since):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED)
+
+    def build_query(session: Session):
+        query = filtered(session.query(
+            Version.id, Version.dealer_id, Brand.name, Model.name, Version.name, Version.year,
+            Version.transmission, Version.fuel_type, Version.horsepower, Version.price, Version.updated_at,
+        ).select_from(Version))
+        if since:
+            query = query.filter(Version.updated_at > since)
+        return query.order_by(Version.id)
+
+    return export_response(build_query, NEW_CAR_EXPORT_COLUMNS, format, "new_cars", last_modified)
 
 # --- List my new cars (Dealer Only) ---
 @router.get("/mine", response_model=List[VersionOut])
@@ -76,7 +136,8 @@ def list_my_new_cars(
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
 ) -> List[VersionOut]:
-    return db.query(Version).filter(Version.dealer_id == current_dealer.id).offset(offset).limit(limit).all()
+    rows = db.query(*VERSION_LIST_COLUMNS).filter(Version.dealer_id == current_dealer.id).order_by(Version.id).offset(offset).limit(limit).all()
+    return json_response([version_serializer(row) for row in rows], List[VersionOut])
 
 # --- Dealer Stats for current dealer ---
 @router.get("/stats/mine")
@@ -84,9 +145,8 @@ def dealer_stats(
     db: Session = Depends(get_db),
     current_dealer: User = Depends(role_required(UserRole.dealer))
 ):
-    total_versions = db.query(Version).filter(Version.dealer_id == current_dealer.id).count()
-    avg_price = db.query(func.avg(Version.price)).filter(Version.dealer_id == current_dealer.id).scalar()
-    return {"dealer_id": current_dealer.id, "total_versions": total_versions, "avg_price": avg_price}
+    stats = read_counter(db, "versions", current_dealer.id)
+    return {"dealer_id": current_dealer.id, "total_versions": stats.row_count, "avg_price": stats.avg_price}
 
 # --- Get a new car version by ID ---
 @router.get("/{version_id}", response_model=VersionOut)
@@ -112,6 +172,7 @@ def update_new_car(
         setattr(version, k, v)
         
     db.commit()
+    invalidate_tags("new_cars")
     db.refresh(version)
     return version
 
@@ -126,4 +187,5 @@ def delete_new_car(
     if not version:
         return  HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized or version not found")
     db.delete(version)
-    db.commit()
\ No newline at end of file
+    db.commit()
+    invalidate_tags("new_cars")
\ No newline at end of file
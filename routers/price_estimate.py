@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from database import get_db
+from schemas import PriceEstimateRequest, PriceEstimateBatchRequest, PriceEstimateOut
+from services.price_estimator import EstimateQuery, get_price_estimator
+from services.reference_cache import get_reference_catalog
+from typing import List, Optional
+
+# Registered before used_cars: /cars/used/estimate vs /cars/used/{car_id}
+router = APIRouter(prefix="/cars/used", tags=["used cars (Seller Only)"])
+
+
+def _estimate(db: Session, listings: List[PriceEstimateRequest]) -> List[PriceEstimateOut]:
+    catalog = get_reference_catalog(db)
+    results: List[Optional[PriceEstimateOut]] = [None] * len(listings)
+    queries, positions = [], []
+    for i, listing in enumerate(listings):
+        brand = catalog.find_brand(listing.brand_name)
+        model = catalog.find_model(brand.id, listing.model_name) if brand else None
+        if not model:
+            error = f"Brand '{listing.brand_name}' does not exist." if not brand else \
+                f"Model '{listing.model_name}' does not exist for brand '{listing.brand_name}'."
+            results[i] = PriceEstimateOut(brand_name=listing.brand_name, model_name=listing.model_name, error=error)
+            continue
+        queries.append(EstimateQuery(model.id, listing.year, listing.mileage, listing.horsepower, listing.fuel_type, listing.transmission))
+        positions.append(i)
+
+    if queries:
+        for i, estimate in zip(positions, get_price_estimator(db).estimate(queries)):
+            listing = listings[i]
+            results[i] = PriceEstimateOut(brand_name=listing.brand_name, model_name=listing.model_name, **estimate)
+    return results
+
+
+# --- Fair price range for a listing (public: sellers call it before posting) ---
+@router.get("/estimate", response_model=PriceEstimateOut)
+def estimate_price(
+    brand_name: str,
+    model_name: str,
+    year: int,
+    mileage: int = Query(..., ge=0),
+    fuel_type: Optional[str] = None,
+    transmission: Optional[str] = None,
+    horsepower: Optional[int] = Query(None, gt=0),
+    db: Session = Depends(get_db),
+):
+    listing = PriceEstimateRequest(
+        brand_name=brand_name, model_name=model_name, year=year, mileage=mileage,
+        fuel_type=fuel_type, transmission=transmission, horsepower=horsepower,
+    )
+    result = _estimate(db, [listing])[0]
+    if result.error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=result.error)
+    return result
+
+
+# --- Batch: one result per listing, in order (unknown brand/model reported per item) ---
+@router.post("/estimate/batch", response_model=List[PriceEstimateOut])
+def estimate_prices(payload: PriceEstimateBatchRequest, db: Session = Depends(get_db)):
+    return _estimate(db, payload.listings)
@@ -1,16 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc
 from database import get_db
-from models import Model, Brand
 from schemas import ModelOut
+from services.reference_cache import get_reference_catalog, not_modified, paginate
 from typing import List
 
 router = APIRouter(prefix="/models", tags=["models"])
 
+# Served from the in-memory reference catalog; ETag changes with the catalog version
+
 # --- List all models ---
 @router.get("/", response_model=List[ModelOut])
 def list_models(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     brand: str | None = Query(None, description="Filter by brand name (case-insensitive)"),
     name: str | None = Query(None, description="Filter by model name (case-insensitive)"),
@@ -19,52 +22,62 @@ def list_models(
     order_by: str = Query("name", description="Sort by field"),
     order_dir: str = Query("asc", regex="^(asc|desc)$", description="Sort direction"),
 ) -> List[ModelOut]:
-    query = db.query(Model).join(Brand)
+    catalog = get_reference_catalog(db)
+    if cached := not_modified(request, response, catalog):
+        return cached
+    models_list = catalog.models.values()
     if brand:
-        query = query.filter(Brand.name.ilike(f"%{brand}%"))
+        models_list = [m for m in models_list if brand.lower() in m.brand.name.lower()]
     if name:
-        query = query.filter(Model.name.ilike(f"%{name}%"))
-    
-    if hasattr(Model, order_by):
-        col = getattr(Model, order_by)
-        query = query.order_by(asc(col) if order_dir == "asc" else desc(col))
-    
-    return query.offset(offset).limit(limit).all()
+        models_list = [m for m in models_list if name.lower() in m.name.lower()]
+    return paginate(models_list, order_by, order_dir, offset, limit)
 
 # --- Get model by ID ---
 @router.get("/{model_id}", response_model=ModelOut)
-def get_model(model_id: int, db: Session = Depends(get_db)) -> ModelOut:
-    model = db.query(Model).filter(Model.id == model_id).first()
+def get_model(model_id: int, request: Request, response: Response, db: Session = Depends(get_db)) -> ModelOut:
+    catalog = get_reference_catalog(db)
+    model = catalog.models.get(model_id)
     if not model:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Model not found")
+    if cached := not_modified(request, response, catalog):
+        return cached
     return model
 
 # --- Get models by brand ID ---
 @router.get("/by-brand/{brand_id}", response_model=List[ModelOut])
 def get_models_by_brand(
     brand_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
 ) -> List[ModelOut]:
-    models_list = db.query(Model).filter(Model.brand_id == brand_id).offset(offset).limit(limit).all()
+    catalog = get_reference_catalog(db)
+    models_list = catalog.models_by_brand.get(brand_id, [])[offset:offset + limit]
     if not models_list:
         # Check if the brand exists before saying no models were found
-        if not db.query(Brand).filter(Brand.id == brand_id).first():
+        if brand_id not in catalog.brands:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Brand not found")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No models found for this brand")
-        
+    if cached := not_modified(request, response, catalog):
+        return cached
     return models_list
 
 # --- Search models by name ---
 @router.get("/search/", response_model=List[ModelOut])
 def search_models(
     q: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
 ) -> List[ModelOut]:
-    models_list = db.query(Model).filter(Model.name.ilike(f"%{q}%")).offset(offset).limit(limit).all()
+    catalog = get_reference_catalog(db)
+    models_list = [m for m in catalog.models.values() if q.lower() in m.name.lower()][offset:offset + limit]
     if not models_list:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No models found matching the search criteria")
-    return models_list
\ No newline at end of file
+    if cached := not_modified(request, response, catalog):
+        return cached
+    return models_list
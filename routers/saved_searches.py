@@ -0,0 +1,207 @@
+import asyncio
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, status, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+
+from database import SessionLocal, get_db
+from models import Car, SavedSearch, SavedSearchMatch, User
+from routers.auth import get_current_user
+from routers.used_cars import used_car_list_query, render_used_car_rows
+from schemas import SavedSearchCreate, SavedSearchOut, SavedSearchMatchOut
+from services.reference_cache import get_reference_catalog
+from services.saved_searches import SAVED_SEARCH_MAX_PER_USER
+from services.serialization import json_response
+
+# Searches are matched against new/updated listings by `python manage.py saved-search-alerts`;
+# this router stores them and delivers the queued matches
+router = APIRouter(prefix="/saved-searches", tags=["saved searches"])
+
+SAVED_SEARCH_PUSH_SECONDS = float(os.getenv("SAVED_SEARCH_PUSH_SECONDS", "5"))
+MATCH_COLUMNS = [
+    SavedSearchMatch.id, SavedSearchMatch.user_id, SavedSearchMatch.search_id, SavedSearch.name.label("search_name"),
+    SavedSearchMatch.car_id, SavedSearchMatch.matched_at,
+]
+
+
+def _float(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _search_out(search: SavedSearch, db: Session) -> dict:
+    catalog = get_reference_catalog(db)
+    brand = catalog.brands.get(search.brand_id)
+    model = catalog.models.get(search.model_id)
+    return {
+        "id": search.id, "name": search.name,
+        "brand_name": brand.name if brand else None, "model_name": model.name if model else None,
+        "fuel_type": search.fuel_type, "transmission": search.transmission,
+        "min_price": _float(search.min_price), "max_price": _float(search.max_price), "min_year": search.min_year, "max_year": search.max_year,
+        "notify_email": search.notify_email, "created_at": search.created_at,
+    }
+
+
+def _matches_out(db: Session, rows) -> List[dict]:
+    """Match rows (MATCH_COLUMNS) with their listings rendered as UsedCarOut; matches of deleted listings are gone already."""
+    cars = {car["id"]: car for car in render_used_car_rows(db, used_car_list_query(db).filter(Car.id.in_([r.car_id for r in rows])).all())} if rows else {}
+    return [
+        {"id": r.id, "search_id": r.search_id, "search_name": r.search_name, "matched_at": r.matched_at, "car": cars[r.car_id]}
+        for r in rows if r.car_id in cars
+    ]
+
+
+# --- Create a saved search ---
+@router.post("/", response_model=SavedSearchOut, status_code=status.HTTP_201_CREATED)
+def create_saved_search(payload: SavedSearchCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    if db.query(func.count(SavedSearch.id)).filter(SavedSearch.user_id == current_user.id).scalar() >= SAVED_SEARCH_MAX_PER_USER:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {SAVED_SEARCH_MAX_PER_USER} saved searches per user.")
+    for low, high in (("min_price", "max_price"), ("min_year", "max_year")):
+        if getattr(payload, low) is not None and getattr(payload, high) is not None and getattr(payload, low) > getattr(payload, high):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{low} is greater than {high}.")
+
+    catalog = get_reference_catalog(db)
+    brand = model = None
+    if payload.brand_name:
+        brand = catalog.find_brand(payload.brand_name)
+        if not brand:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Brand '{payload.brand_name}' does not exist.")
+    if payload.model_name:
+        model = catalog.find_model(brand.id, payload.model_name) if brand else None
+        if not model:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Model '{payload.model_name}' does not exist for brand '{payload.brand_name}'.")
+
+    search = SavedSearch(
+        user_id=current_user.id,
+        brand_id=brand.id if brand else None,
+        model_id=model.id if model else None,
+        fuel_type=payload.fuel_type.strip().lower() if payload.fuel_type else None,
+        transmission=payload.transmission.strip().lower() if payload.transmission else None,
+        **payload.dict(include={"name", "min_price", "max_price", "min_year", "max_year", "notify_email"}),
+    )
+    db.add(search)
+    db.commit()
+    db.refresh(search)
+    return json_response(_search_out(search, db), SavedSearchOut, status_code=status.HTTP_201_CREATED)
+
+
+# --- List my saved searches ---
+@router.get("/", response_model=List[SavedSearchOut])
+def list_saved_searches(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    searches = db.query(SavedSearch).filter(SavedSearch.user_id == current_user.id).order_by(SavedSearch.id).all()
+    return json_response([_search_out(search, db) for search in searches], List[SavedSearchOut])
+
+
+# --- Matches queued for my searches, oldest first (resume with after_id = last id seen) ---
+@router.get("/matches", response_model=List[SavedSearchMatchOut])
+def list_matches(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    after_id: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+):
+    rows = db.query(*MATCH_COLUMNS).join(SavedSearch, SavedSearch.id == SavedSearchMatch.search_id).filter(
+        SavedSearchMatch.user_id == current_user.id, SavedSearchMatch.id > after_id
+    ).order_by(SavedSearchMatch.id).limit(limit).all()
+    return json_response(_matches_out(db, rows), List[SavedSearchMatchOut])
+
+
+# --- Delete a saved search (its queued matches go with it) ---
+@router.delete("/{search_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_saved_search(search_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> None:
+    deleted = db.query(SavedSearch).filter(SavedSearch.id == search_id, SavedSearch.user_id == current_user.id).delete(synchronize_session=False)
+    if not deleted:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Saved search not found")
+    db.commit()
+
+
+# --- WebSocket push of new matches ---
+class AlertConnectionManager:
+    """
+    Sockets of this process by user id. While any are open, one task reads the match rows queued
+    since the last read for the connected users (one indexed query per tick, however many users)
+    and pushes each to its user's sockets.
+    """
+
+    def __init__(self):
+        self.connections: Dict[int, List[WebSocket]] = {}
+        self.last_id: Optional[int] = None
+        self.poller: Optional[asyncio.Task] = None
+
+    async def connect(self, user_id: int, websocket: WebSocket):
+        await websocket.accept()
+        self.connections.setdefault(user_id, []).append(websocket)
+        if self.poller is None or self.poller.done():
+            self.poller = asyncio.create_task(self._poll())
+
+    def disconnect(self, user_id: int, websocket: WebSocket):
+        sockets = [ws for ws in self.connections.get(user_id, []) if ws is not websocket]
+        if sockets:
+            self.connections[user_id] = sockets
+        else:
+            self.connections.pop(user_id, None)
+
+    def _read(self) -> List[Tuple[int, str]]:
+        with SessionLocal() as db:
+            if self.last_id is None:  # pushes start now; earlier matches are served by GET /saved-searches/matches
+                self.last_id = db.query(func.max(SavedSearchMatch.id)).scalar() or 0
+                return []
+            rows = db.query(*MATCH_COLUMNS).join(SavedSearch, SavedSearch.id == SavedSearchMatch.search_id).filter(
+                SavedSearchMatch.user_id.in_(list(self.connections)), SavedSearchMatch.id > self.last_id
+            ).order_by(SavedSearchMatch.id).limit(1000).all()
+            if not rows:
+                return []
+            self.last_id = rows[-1].id
+            users = {r.id: r.user_id for r in rows}
+            return [(users[match["id"]], SavedSearchMatchOut(**match).model_dump_json()) for match in _matches_out(db, rows)]
+
+    async def _poll(self):
+        while self.connections:
+            try:
+                for user_id, payload in await run_in_threadpool(self._read):
+                    for ws in list(self.connections.get(user_id, [])):
+                        try:
+                            await ws.send_text(payload)
+                        except Exception:
+                            # ignore failures; they will be cleaned up on disconnect
+                            pass
+            except Exception as e:
+                print(f"[saved_searches] Push failed: {e}")
+            await asyncio.sleep(SAVED_SEARCH_PUSH_SECONDS)
+        self.last_id = None
+
+manager = AlertConnectionManager()
+
+
+def _authenticate(token: str) -> Optional[int]:
+    # Own short-lived session: a Depends(get_db) one would hold a pooled connection for the socket's lifetime
+    with SessionLocal() as db:
+        try:
+            return get_current_user(db=db, token=token).id
+        except Exception:
+            return None
+
+
+@router.websocket("/ws")
+async def saved_search_alerts_ws(websocket: WebSocket):
+    token = websocket.query_params.get("token")
+    user_id = await run_in_threadpool(_authenticate, token) if token else None
+    if user_id is None:
+        await websocket.accept()
+        await websocket.send_text("Missing token" if not token else "Invalid token")
+        await websocket.close()
+        return
+
+    await manager.connect(user_id, websocket)
+    try:
+        while True:
+            await websocket.receive_text()  # nothing to receive; keeps the connection open until the client leaves
+    except WebSocketDisconnect:
+        manager.disconnect(user_id, websocket)
+    except Exception:
+        manager.disconnect(user_id, websocket)
+        try:
+            await websocket.close()
+        except Exception:
+            pass
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from database import get_db
+from models import Car
+from schemas import UsedCarOut
+from routers.used_cars import used_car_list_query, render_used_car_rows
+from services.serialization import json_response
+from services.similar_listings import SIMILAR_NEIGHBOURS, get_similar_listings
+from typing import List
+
+router = APIRouter(prefix="/cars/used", tags=["used cars (Seller Only)"])
+
+
+# --- Similar listings (precomputed neighbours, nearest first) ---
+@router.get("/{car_id}/similar", response_model=List[UsedCarOut])
+def similar_used_cars(car_id: int, limit: int = Query(6, ge=1, le=SIMILAR_NEIGHBOURS), db: Session = Depends(get_db)):
+    ids = get_similar_listings(db).similar(car_id, limit)
+    if ids is None:
+        # not indexed: gone, or posted since the last refresh (SIMILAR_REFRESH_SECONDS)
+        if db.query(Car.id).filter(Car.id == car_id).first() is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Used car not found")
+        ids = []
+    rank = {id: i for i, id in enumerate(ids)}
+    # listings deleted since the last refresh are simply missing here
+    rows = sorted(used_car_list_query(db).filter(Car.id.in_(ids)).all(), key=lambda row: rank[row.id]) if ids else []
+    return json_response(render_used_car_rows(db, rows), List[UsedCarOut])
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from database import get_db
+from models import Car
+from schemas import UsedCarOut
+from routers.used_cars import used_car_list_query, render_used_car_rows
+from services.listing_search import search_listings
+from services.serialization import json_response
+from typing import List
+
+# Part of the "ai" feature (faiss + sentence-transformers); registered before routers.used_cars
+# so /cars/used/search is not captured by /cars/used/{car_id}
+router = APIRouter(prefix="/cars/used", tags=["used cars (Seller Only)"])
+
+
+# --- Semantic search over used cars ---
+@router.get("/search", response_model=List[UsedCarOut])
+def search_used_cars(
+    q: str = Query(..., min_length=2, description="Free-text query, e.g. 'family suv cheap diesel'"),
+    db: Session = Depends(get_db),
+    min_price: float | None = Query(None, ge=0),
+    max_price: float | None = Query(None, ge=0),
+    min_year: int | None = Query(None),
+    max_year: int | None = Query(None),
+    fuel_type: str | None = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+) -> List[UsedCarOut]:
+    hits = search_listings(
+        q, k=limit,
+        min_price=min_price, max_price=max_price, min_year=min_year, max_year=max_year, fuel_type=fuel_type,
+    )
+    if not hits:
+        return []
+
+    rows = used_car_list_query(db).filter(Car.id.in_([car_id for car_id, _ in hits])).all()
+
+    # Keep the similarity ranking; skip ids deleted since they were indexed
+    by_id = {row.id: row for row in rows}
+    return json_response(render_used_car_rows(db, [by_id[car_id] for car_id, _ in hits if car_id in by_id]), List[UsedCarOut])
@@ -1,13 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import io
+import os
+import tempfile
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session, joinedload 
-from sqlalchemy import asc, desc, func
+from sqlalchemy import asc, desc, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from database import get_db
-from models import Brand, Model, User, UserRole, Car, CarCategoryMap, CarFeature, Category, Feature 
-from schemas import UsedCarCreate, UsedCarUpdate, UsedCarOut, CategoryOut, FeatureOut
+from models import Brand, Model, User, UserRole, Car, CarCategoryMap, CarFeature, Category, Feature, ListingTombstone
+from schemas import UsedCarCreate, UsedCarUpdate, UsedCarOut, CategoryOut, FeatureOut, BulkImportOut
 from .auth import role_required
+from services.listing_context import invalidate_listing_context
+from services.features import feature_enabled
+from services.bulk_import import import_used_cars, iter_csv, iter_ndjson
+from services.export import changed_after, export_response, whole_seconds
+from services.listing_changes import LISTING_TOMBSTONE_RETENTION
+from services.reference_cache import get_reference_catalog
+from services.response_cache import invalidate_tags
+from services.serialization import compile_serializer, json_response, schema_columns
+from services.stats import read_counter
+from datetime import datetime
 from typing import List, Optional
 router = APIRouter(prefix="/cars/used", tags=["used cars (Seller Only)"])
 
+BULK_IMPORT_MAX_BYTES = int(os.getenv("BULK_IMPORT_MAX_MB", "100")) * 2**20
+BULK_IMPORT_PARSERS = {
+    "application/x-ndjson": iter_ndjson,
+    "application/ndjson": iter_ndjson,
+    "application/jsonl": iter_ndjson,
+    "text/csv": iter_csv,
+}
+
+
+# Semantic search index (faiss + embeddings) only exists in processes serving the "ai" feature
+def listing_index():
+    if not feature_enabled("ai"):
+        return None
+    from services import listing_search
+    return listing_search
 
 # Helper function for consistent data fetching
 def get_car_with_relations(db: Session, car_id: int) -> Optional[Car]:
@@ -18,6 +48,57 @@ def get_car_with_relations(db: Session, car_id: int) -> Optional[Car]:
         joinedload(Car.features).joinedload(CarFeature.feature)
     ).filter(Car.id == car_id).first()
 
+def get_cars_with_relations(db: Session, car_ids: List[int]) -> List[Car]:
+    """Loads several listings with the same relations in a single query."""
+    return db.query(Car).options(
+        joinedload(Car.model).joinedload(Model.brand),
+        joinedload(Car.categories).joinedload(CarCategoryMap.category),
+        joinedload(Car.features).joinedload(CarFeature.feature)
+    ).filter(Car.id.in_(car_ids)).all()
+
+# Fast path for read endpoints: ORM rows straight to JSON, no pydantic model construction
+used_car_serializer = compile_serializer(UsedCarOut, {
+    "brand_name": lambda car: car.model.brand.name,
+    "model_name": lambda car: car.model.name,
+    "categories": lambda car: [m.category for m in car.categories],
+    "features": lambda car: [f.feature for f in car.features],
+})
+
+# List view: only the columns UsedCarOut needs, as plain rows instead of ORM entities
+USED_CAR_LIST_COLUMNS = schema_columns(UsedCarOut, Car, brand_name=Brand.name, model_name=Model.name) + [Car.category_ids, Car.feature_ids]
+used_car_row_serializer = compile_serializer(UsedCarOut, {"categories": lambda row: (), "features": lambda row: ()})
+
+def used_car_list_query(db: Session):
+    return db.query(*USED_CAR_LIST_COLUMNS).select_from(Car).join(Model, Car.model_id == Model.id).join(Brand, Model.brand_id == Brand.id)
+
+def render_used_car_rows(db: Session, rows) -> List[dict]:
+    """Rows from `used_car_list_query` → UsedCarOut dicts; category/feature names come from the reference catalog."""
+    if not rows:
+        return []
+    catalog = get_reference_catalog(db)
+    out = []
+    for row in rows:
+        data = used_car_row_serializer(row)
+        data["categories"] = [{"id": i, "name": catalog.categories[i].name} for i in row.category_ids if i in catalog.categories]
+        data["features"] = [{"id": i, "name": catalog.features[i].name} for i in row.feature_ids if i in catalog.features]
+        out.append(data)
+    return out
+
+def _tag_ids(values: List[str], known: dict, ids_by_name: dict, label: str) -> List[int]:
+    """`categories=` / `features=` values (names or ids, repeated or comma-separated) → ids."""
+    ids, unknown = set(), []
+    for value in (v.strip() for item in values for v in item.split(",")):
+        if not value:
+            continue
+        tag_id = int(value) if value.isdigit() else ids_by_name.get(value.lower())
+        if tag_id in known:
+            ids.add(tag_id)
+        else:
+            unknown.append(value)
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown {label}: {', '.join(unknown)}")
+    return sorted(ids)
+
 # Helper function for formatting the output
 def format_used_car_output(car: Car) -> UsedCarOut:
 
@@ -50,12 +131,13 @@ def add_used_car(
     db: Session = Depends(get_db),
     current_seller: User = Depends(role_required(UserRole.seller))
 ) -> UsedCarOut:
-    # 1. Validation and ID lookups
-    brand = db.query(Brand).filter(Brand.name.ilike(payload.brand_name)).first()
+    # 1. Validation and ID lookups (in-memory reference catalog)
+    catalog = get_reference_catalog(db)
+    brand = catalog.find_brand(payload.brand_name)
     if not brand:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Brand '{payload.brand_name}' does not exist.")
 
-    model = db.query(Model).filter(Model.name.ilike(payload.model_name), Model.brand_id == brand.id).first()
+    model = catalog.find_model(brand.id, payload.model_name)
     if not model:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Model '{payload.model_name}' does not exist for brand '{payload.brand_name}'.")
 
@@ -71,29 +153,64 @@ def add_used_car(
 
     # 3. Handle Categories (M2M Link)
     if payload.category_ids:
-        categories = db.query(Category).filter(Category.id.in_(payload.category_ids)).all()
-        if len(categories) != len(set(payload.category_ids)):
+        if not set(payload.category_ids) <= catalog.categories.keys():
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="One or more category IDs are invalid.")
-        for cat in categories:
-            # Append to the ORM relationship list
-            car.categories.append(CarCategoryMap(category=cat))
+        for category_id in set(payload.category_ids):
+            car.categories.append(CarCategoryMap(category_id=category_id))
 
     # 4. Handle Features (M2M Link)
     if payload.feature_ids:
-        features = db.query(Feature).filter(Feature.id.in_(payload.feature_ids)).all()
-        if len(features) != len(set(payload.feature_ids)):
+        if not set(payload.feature_ids) <= catalog.features.keys():
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="One or more feature IDs are invalid.")
-        for feat in features:
-            # Append to the ORM relationship list
-            car.features.append(CarFeature(feature=feat))
+        for feature_id in set(payload.feature_ids):
+            car.features.append(CarFeature(feature_id=feature_id))
 
     db.commit()
     
     # Reload the car with relations and format the output
     car_with_relations = get_car_with_relations(db, car.id)
+    if (search := listing_index()) is not None:
+        search.index_listings([car_with_relations])
     return format_used_car_output(car_with_relations)
 
 
+# --- Bulk import used cars from an NDJSON or CSV body (Seller Only) ---
+@router.post("/bulk", response_model=BulkImportOut)
+async def bulk_import_used_cars(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_seller: User = Depends(role_required(UserRole.seller))
+) -> BulkImportOut:
+    """
+    Body is streamed as NDJSON (one listing per line) or CSV with a header row; list columns
+    in CSV use "|" as separator. Valid rows are inserted, invalid ones are reported by row number.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    parser = BULK_IMPORT_PARSERS.get(content_type)
+    if not parser:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Send application/x-ndjson or text/csv.")
+
+    # Spool the body (memory up to 8 MB, then disk) instead of buffering it whole
+    spool = tempfile.SpooledTemporaryFile(max_size=8 * 2**20)
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > BULK_IMPORT_MAX_BYTES:
+            spool.close()
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Import body too large.")
+        spool.write(chunk)
+    spool.seek(0)
+
+    with io.TextIOWrapper(spool, encoding="utf-8-sig", newline="") as text:
+        result = await run_in_threadpool(import_used_cars, db, current_seller.id, parser(text))
+
+    # Embedding thousands of listings is slow; the search index catches up after the response
+    if (search := listing_index()) is not None:
+        background_tasks.add_task(search.index_listing_ids, result.inserted_ids)
+    return BulkImportOut(inserted=len(result.inserted_ids), failed=result.failed, inserted_ids=result.inserted_ids, errors=result.errors)
+
+
 # --- List all used cars ---
 @router.get("/", response_model=List[UsedCarOut])
 def list_used_cars(
@@ -102,18 +219,16 @@ def list_used_cars(
     model: str | None = Query(None),
     fuel_type: str | None = Query(None),
     transmission: str | None = Query(None),
+    categories: List[str] | None = Query(None, description="Category names or ids"),
+    categories_match: str = Query("all", regex="^(all|any)$"),
+    features: List[str] | None = Query(None, description="Feature names or ids, e.g. features=sunroof&features=4x4"),
+    features_match: str = Query("all", regex="^(all|any)$"),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
     order_by: str | None = Query("posted_at"),
     order_dir: str = Query("desc", regex="^(asc|desc)$")
 ) -> List[UsedCarOut]:
-    
-    # Use the helper function's joinedload logic
-    query = db.query(Car).join(Model).join(Brand).options(
-        joinedload(Car.model).joinedload(Model.brand),
-        joinedload(Car.categories).joinedload(CarCategoryMap.category),
-        joinedload(Car.features).joinedload(CarFeature.feature)
-    )
+    query = used_car_list_query(db)
     
     # Filtering (using ilike)
     if brand:
@@ -124,16 +239,110 @@ def list_used_cars(
         query = query.filter(Car.fuel_type.ilike(f"%{fuel_type}%"))
     if transmission:
         query = query.filter(Car.transmission.ilike(f"%{transmission}%"))
+
+    # Category/feature filters on the GIN-indexed id arrays: @> (has all) or && (has any)
+    if categories or features:
+        catalog = get_reference_catalog(db)
+        for values, match, column, known, ids_by_name, label in (
+            (categories, categories_match, Car.category_ids, catalog.categories, catalog.category_ids_by_name, "categories"),
+            (features, features_match, Car.feature_ids, catalog.features, catalog.feature_ids_by_name, "features"),
+        ):
+            ids = _tag_ids(values, known, ids_by_name, label) if values else []
+            if ids:
+                query = query.filter(column.contains(ids) if match == "all" else column.overlap(ids))
     
     # Sorting
     if order_by and hasattr(Car, order_by):
         col = getattr(Car, order_by)
         query = query.order_by(asc(col) if order_dir == "asc" else desc(col))
     
-    cars = query.offset(offset).limit(limit).all()
-    
-    # Format and return using the helper
-    return [format_used_car_output(car) for car in cars]
+    rows = query.offset(offset).limit(limit).all()
+    return json_response(render_used_car_rows(db, rows), List[UsedCarOut])
+
+
+# --- Export used cars (NDJSON / CSV stream) ---
+USED_CAR_EXPORT_COLUMNS = [
+    "id", "seller_id", "brand_name", "model_name", "year", "mileage", "transmission", "fuel_type",
+    "horsepower", "price", "location", "description", "posted_at", "updated_at", "categories", "features",
+]
+
+def _listing_names(association, target, key):
+    return (
+        select(func.array_agg(aggregate_order_by(target.name, target.name)))
+        .join(association, getattr(association, key) == target.id)
+        .where(association.car_id == Car.id)
+        .scalar_subquery()
+    )
+
+@router.get("/export")
+def export_used_cars(
+    request: Request,
+    db: Session = Depends(get_db),
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    brand: str | None = Query(None),
+    model: str | None = Query(None),
+    fuel_type: str | None = Query(None),
+    transmission: str | None = Query(None),
+):
+    """
+    Full filtered result set in one streamed response (server-side cursor, constant memory).
+    Send the previous Last-Modified back as If-Modified-Since to get only rows changed since then
+    (plus a short overlap, so dedupe by id); deleted listings come from /cars/used/export/deleted.
+    """
+    def filtered(query):
+        query = query.join(Model, Car.model_id == Model.id).join(Brand, Model.brand_id == Brand.id)
+        if brand:
+            query = query.filter(Brand.name.ilike(f"%{brand}%"))
+        if model:
+            query = query.filter(Model.name.ilike(f"%{model}%"))
+        if fuel_type:
+            query = query.filter(Car.fuel_type.ilike(f"%{fuel_type}%"))
+        if transmission:
+            query = query.filter(Car.transmission.ilike(f"%{transmission}%"))
+        return query
+
+    since = changed_after(request.headers.get("if-modified-since"))
+    last_modified = whole_seconds(filtered(db.query(func.max(Car.updated_at)).select_from(Car)).scalar())
+    if since and (last_modified is None or last_modified <= since):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED)
+
+    def build_query(session: Session):
+        query = filtered(session.query(
+            Car.id, Car.seller_id, Brand.name, Model.name, Car.year, Car.mileage, Car.transmission, Car.fuel_type,
+            Car.horsepower, Car.price, Car.location, Car.description, Car.posted_at, Car.updated_at,
+            _listing_names(CarCategoryMap, Category, "category_id"),
+            _listing_names(CarFeature, Feature, "feature_id"),
+        ).select_from(Car))
+        if since:
+            query = query.filter(Car.updated_at > since)
+        return query.order_by(Car.id)
+
+    return export_response(build_query, USED_CAR_EXPORT_COLUMNS, format, "used_cars", last_modified)
+
+@router.get("/export/deleted")
+def export_deleted_used_cars(
+    request: Request,
+    db: Session = Depends(get_db),
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+):
+    """
+    Ids of listings deleted since If-Modified-Since (the Last-Modified of the previous call), to apply
+    alongside incremental exports. Deletes are kept for a day: older cursors get 410 and need a full export.
+    """
+    since = changed_after(request.headers.get("if-modified-since"))
+    if since and since < datetime.utcnow() - LISTING_TOMBSTONE_RETENTION:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Deletes this old are no longer retained; run a full export")
+    last_modified = whole_seconds(db.query(func.max(ListingTombstone.deleted_at)).scalar())
+    if since and (last_modified is None or last_modified <= since):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED)
+
+    def build_query(session: Session):
+        query = session.query(ListingTombstone.car_id, ListingTombstone.deleted_at)
+        if since:
+            query = query.filter(ListingTombstone.deleted_at > since)
+        return query.order_by(ListingTombstone.car_id)
+
+    return export_response(build_query, ["id", "deleted_at"], format, "used_cars_deleted", last_modified)
 
 
 # --- List my used cars (Seller Only) ---
@@ -144,8 +353,8 @@ def list_my_used_cars(
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
 ) -> List[UsedCarOut]:
-    cars = db.query(Car).filter(Car.seller_id == current_seller.id).offset(offset).limit(limit).all()
-    return [format_used_car_output(car) for car in cars]
+    rows = used_car_list_query(db).filter(Car.seller_id == current_seller.id).order_by(Car.id).offset(offset).limit(limit).all()
+    return json_response(render_used_car_rows(db, rows), List[UsedCarOut])
 
 # --- Seller Stats for current seller ---
 @router.get("/stats/mine")
@@ -153,19 +362,17 @@ def seller_stats(
     db: Session = Depends(get_db),
     current_seller: User = Depends(role_required(UserRole.seller))
 ):
-    total_listings = db.query(Car).filter(Car.seller_id == current_seller.id).count()
-    avg_price = db.query(func.avg(Car.price)).filter(Car.seller_id == current_seller.id).scalar()
-    newest_listing_date = db.query(func.max(Car.posted_at)).filter(Car.seller_id == current_seller.id).scalar()
-    return {"seller_id": current_seller.id, "total_listings": total_listings, "avg_price": avg_price, "newest_listing_date": newest_listing_date}
+    stats = read_counter(db, "cars", current_seller.id)
+    return {"seller_id": current_seller.id, "total_listings": stats.row_count, "avg_price": stats.avg_price, "newest_listing_date": stats.last_posted_at}
 
 
 # --- Get a used car by ID ---
 @router.get("/{car_id}", response_model=UsedCarOut)
 def get_used_car(car_id: int, db: Session = Depends(get_db)) -> UsedCarOut:
-    car = get_car_with_relations(db, car_id)
-    if not car:
+    row = used_car_list_query(db).filter(Car.id == car_id).first()
+    if not row:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Used car not found")
-    return format_used_car_output(car)
+    return json_response(render_used_car_rows(db, [row])[0], UsedCarOut)
 
 
 # --- Update a used car (Seller Only, must own) ---
@@ -186,9 +393,13 @@ def update_used_car(
         
     db.commit()
     db.refresh(car) # Refresh needed to get the updated fields
+    invalidate_listing_context(car.id)
+    invalidate_tags(f"used_car:{car.id}")
     
     # Reload with relations and format
     car_with_relations = get_car_with_relations(db, car.id)
+    if (search := listing_index()) is not None:
+        search.index_listings([car_with_relations])
     return format_used_car_output(car_with_relations)
 
 
@@ -203,4 +414,8 @@ def delete_used_car(
     if not car:
         return  HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized or car not found")
     db.delete(car)
-    db.commit()
\ No newline at end of file
+    db.commit()
+    invalidate_listing_context(car_id)
+    invalidate_tags(f"used_car:{car_id}")
+    if (search := listing_index()) is not None:
+        search.remove_listings([car_id])
\ No newline at end of file
@@ -0,0 +1,102 @@
+import os
+import asyncio
+import hashlib
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from starlette.datastructures import UploadFile as StarletteUploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+from sqlalchemy.orm import Session
+from database import get_db
+from routers.auth import get_optional_user_id
+from routers.vin_decoder import decode_vin
+from services.vin_ocr import run_ocr, OcrBusy
+from services.vin_scan_cache import vin_scan_cache, perceptual_hash
+from PIL import UnidentifiedImageError
+
+# VIN photo scanning (tesseract + Pillow) is the "ocr" feature; plain decoding stays in routers.vin_decoder
+router = APIRouter(prefix="/vin", tags=["VIN Decoder"])
+
+VIN_SCAN_MAX_UPLOAD_BYTES = int(os.getenv("VIN_SCAN_MAX_UPLOAD_MB", "10")) * 2**20
+VIN_SCAN_MAX_BODY_BYTES = VIN_SCAN_MAX_UPLOAD_BYTES + 64 * 1024  # image + multipart framing
+
+# The body is parsed by hand (see _read_upload); describe it for /docs as the former `file: UploadFile`
+SCAN_REQUEST_BODY = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object", "required": ["file"], "properties": {"file": {"type": "string", "format": "binary"}},
+}}}}}
+
+
+async def _capped_body(request: Request):
+    """The request body stream, aborted with 413 once it exceeds the cap (whatever Content-Length claims)."""
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > VIN_SCAN_MAX_BODY_BYTES:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Image too large.")
+        yield chunk
+
+
+async def _read_upload(request: Request) -> tuple[bytes, str]:
+    """
+    The `file` part of the multipart body and its SHA-256. The size cap is enforced on the raw
+    stream before parsing, so an oversized upload is never spooled by the form parser.
+    """
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > VIN_SCAN_MAX_BODY_BYTES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Image too large.")
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Send the image as multipart/form-data.")
+    try:
+        form = await MultiPartParser(request.headers, _capped_body(request), max_files=1, max_fields=8).parse()
+    except MultiPartException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+    try:
+        file = form.get("file")
+        if not isinstance(file, StarletteUploadFile):
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Missing 'file' part.")
+        data = await file.read()
+    finally:
+        await form.close()
+    return data, hashlib.sha256(data).hexdigest()
+
+@router.post("/scan", openapi_extra=SCAN_REQUEST_BODY)
+async def scan_vin(request: Request, db: Session = Depends(get_db), user_id: Optional[int] = Depends(get_optional_user_id)):
+    """
+    Upload an image containing a VIN → OCR → Decode VIN
+    """
+    image_bytes, sha = await _read_upload(request)
+
+    # Identical upload → cached result without decoding the image at all
+    vin_text = vin_scan_cache.get(sha)
+    phash = None
+    if vin_text is None and user_id is not None:
+        # Signed-in user retrying with a near-identical photo (re-encoded, resized) → their own earlier scan
+        try:
+            phash = await asyncio.to_thread(perceptual_hash, image_bytes)
+        except UnidentifiedImageError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported image format")
+        vin_text = vin_scan_cache.get_similar(user_id, phash)
+    if vin_text is None:
+        # OCR runs in a bounded process pool (preprocessing + tesseract), off the event loop
+        try:
+            vin_text = await run_ocr(image_bytes)
+        except OcrBusy:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="VIN scanner is busy, please retry shortly",
+                headers={"Retry-After": "2"},
+            )
+        except UnidentifiedImageError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported image format")
+        except BrokenProcessPool:
+            # The OCR worker died on this image twice (already retried on a fresh pool)
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Image could not be processed")
+        # Only successful reads are cached, so a failed photo is retried on the next upload
+        if len(vin_text) >= 10:
+            vin_scan_cache.put(sha, vin_text, user_id, phash)
+
+    if len(vin_text) < 10:
+        return {"error": "Could not detect a valid VIN in the image", "raw_text": vin_text}
+
+    # Reuse your existing decode function
+    return decode_vin(vin_text, db)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
@@ -104,6 +104,29 @@ class FeatureOut(BaseModel):
     name: str
     class Config: from_attributes=True
 
+# --- Technical Catalogs ---
+class CatalogStatus(str, Enum):
+    pending = "pending"
+    processing = "processing"
+    ready = "ready"
+    failed = "failed"
+
+class CatalogDocumentOut(BaseModel):
+    id: int
+    filename: str
+    brand_id: Optional[int] = None
+    model_id: Optional[int] = None
+    status: CatalogStatus
+    chunk_count: Optional[int] = 0
+    error: Optional[str] = None
+    created_at: datetime
+    ingested_at: Optional[datetime] = None
+    class Config: from_attributes = True
+
+# --- VIN ---
+class VinBatchRequest(BaseModel):
+    vins: List[str] = Field(min_length=1, max_length=5000)
+
 # --- Admin ---
 class AdminStatsOut(BaseModel):
     total_brands: int
@@ -112,6 +135,32 @@ class AdminStatsOut(BaseModel):
     total_new_cars: int
     total_users: int
 
+# --- Admin analytics (trend series from the rollup tables) ---
+class ListingTrendOut(BaseModel):
+    bucket: datetime
+    listings: int
+    avg_price: Optional[float] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+
+class AuctionTrendOut(BaseModel):
+    bucket: datetime
+    ended: int
+    started: int
+    sold: int
+    conversion_rate: Optional[float] = None
+    bids: int
+    sold_value: float
+
+class MessageVolumeOut(BaseModel):
+    bucket: datetime
+    messages: int
+
+class RollupStatusOut(BaseModel):
+    pipeline: str
+    processed_until: Optional[datetime] = None
+    behind_seconds: Optional[int] = None
+
 # --- New Cars (Version) ---
 
 class VersionBase(BaseModel):
@@ -157,6 +206,23 @@ class UsedCarCreate(BaseModel):
     category_ids: List[int] = [] 
     feature_ids: List[int] = []
 
+class UsedCarImportRow(UsedCarCreate):
+    """One row of a bulk import; categories/features may be given by name as well as by ID."""
+    location: Optional[str] = None
+    description: Optional[str] = None
+    categories: List[str] = []
+    features: List[str] = []
+
+class BulkImportError(BaseModel):
+    row: int
+    error: str
+
+class BulkImportOut(BaseModel):
+    inserted: int
+    failed: int
+    inserted_ids: List[int]
+    errors: List[BulkImportError]
+
 class UsedCarUpdate(BaseModel):
     year: Optional[int]
     mileage: Optional[int]
@@ -187,6 +253,69 @@ class UsedCarOut(BaseModel):
     class Config: 
         from_attributes = True
 
+class PriceEstimateRequest(BaseModel):
+    brand_name: str
+    model_name: str
+    year: int
+    mileage: int = Field(..., ge=0)
+    fuel_type: Optional[str] = None
+    transmission: Optional[str] = None
+    horsepower: Optional[int] = Field(None, gt=0)
+
+class PriceEstimateBatchRequest(BaseModel):
+    listings: List[PriceEstimateRequest] = Field(min_length=1, max_length=1000)
+
+class PriceEstimateOut(BaseModel):
+    brand_name: str
+    model_name: str
+    estimate: Optional[float] = None
+    low: Optional[float] = None
+    high: Optional[float] = None
+    comparables: int = 0
+    error: Optional[str] = None
+
+# --- Saved searches (alerts for new matching listings) ---
+class SavedSearchCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    brand_name: Optional[str] = None
+    model_name: Optional[str] = None  # needs brand_name
+    fuel_type: Optional[str] = None
+    transmission: Optional[str] = None
+    min_price: Optional[float] = Field(None, ge=0)
+    max_price: Optional[float] = Field(None, ge=0)
+    min_year: Optional[int] = None
+    max_year: Optional[int] = None
+    notify_email: bool = True
+
+class SavedSearchOut(BaseModel):
+    id: int
+    name: str
+    brand_name: Optional[str] = None
+    model_name: Optional[str] = None
+    fuel_type: Optional[str] = None
+    transmission: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_year: Optional[int] = None
+    max_year: Optional[int] = None
+    notify_email: bool
+    created_at: datetime
+
+class SavedSearchMatchOut(BaseModel):
+    id: int
+    search_id: int
+    search_name: str
+    matched_at: datetime
+    car: UsedCarOut
+
+class CompareMode(str, Enum):
+    matrix = "matrix"
+    pairwise = "pairwise"
+
+class CompareBatchRequest(BaseModel):
+    car_ids: List[int] = Field(..., min_length=2, max_length=5)
+    mode: CompareMode = CompareMode.matrix
+
 class AuctionCreateRequest(BaseModel):
     version_id: int
     starting_bid: float
@@ -1,56 +1,73 @@
 import os
+import asyncio
 import httpx
-import pdfplumber
-from sentence_transformers import SentenceTransformer
-import faiss
-from typing import Optional, Tuple, List
-from pathlib import Path
-from functools import lru_cache
+from itertools import combinations
+from typing import Dict, List, Sequence
+from services.catalog_store import catalog_store
+from services.query_batching import MicroBatcher, query_embeddings
 
 # --- Config ---
-BASE_DIR = Path(__file__).resolve().parent 
-DEFAULT_PDF_PATH = str(BASE_DIR / "carplace_full_technical_catalog.pdf")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-# Load embedding model once on import
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
+# --- Catalog Retrieval ---
+# Concurrent comparisons within a few ms share one encode and one search per shard.
+_catalog_search = MicroBatcher(catalog_store.search_batch)
 
-# --- PDF Indexing ---
-def build_pdf_index(pdf_path: str, chunk_size: int = 300) -> Tuple[faiss.IndexFlatL2, List[str]]:
-    """Reads PDF and builds FAISS index."""
-    chunks: List[str] = []
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if not text: continue
-                words = text.split()
-                for i in range(0, len(words), chunk_size):
-                    chunk = " ".join(words[i : i + chunk_size])
-                    chunks.append(chunk)
-    except Exception as e:
-        print(f"[AIComparision] PDF Error: {e}")
-        return None, []
+async def retrieve_catalog_context(query: str, brand_ids: Sequence[int] = (), model_ids: Sequence[int] = (), k: int = 3) -> str:
+    """Queries the catalog store (ingested PDFs); never parses or embeds a PDF."""
+    query_vector = await query_embeddings.encode(query)
+    hits = await _catalog_search.submit((query_vector, k, tuple(brand_ids), tuple(model_ids)))
+    if not hits:
+        return "No specific technical catalog matches found."
+    return "\n\n".join(hit.text for hit in hits)
 
-    if not chunks: return None, []
+# --- Prompt Building ---
+# Hallucination Prevention Prompt
+SYSTEM_INSTRUCTION = (
+    "You are a precision car comparison engine. Your goal is to provide a factual, objective comparison.\n"
+    "STRICT RULES:\n"
+    "1. GROUNDING: Use ONLY the provided 'Catalog Context' and 'Car Listing Data'.\n"
+    "2. NO HALLUCINATION: If the information is not present in the context or listing data, do not invent it. "
+    "Admit if a specific detail (like exact 0-60 time) is unavailable.\n"
+)
+PAIR_TONE = "3. TONE: Professional and concise. Limit response to 3-4 impactful sentences.\n"
+MATRIX_TONE = (
+    "3. FORMAT: A markdown table with one column per car and one row per attribute "
+    "(price, year, mileage, power, fuel, transmission, notable equipment), "
+    "followed by at most 3 sentences naming the best fit for different buyer priorities.\n"
+)
 
-    embeddings = embedder.encode(chunks)
-    index = faiss.IndexFlatL2(embeddings.shape[1])
-    index.add(embeddings)
-    return index, chunks
+def _car_data(label: str, car: dict) -> str:
+    return (
+        f"{label}: {car.get('year')} {car.get('brand_name')} {car.get('model_name')} "
+        f"({car.get('horsepower')} HP, {car.get('transmission')}, {car.get('fuel_type')}, ${car.get('price')}, "
+        f"{car.get('mileage')} km)\n"
+        f"Description: {car.get('description')}"
+    )
 
-@lru_cache(maxsize=10)
-def get_pdf_index(pdf_path: str) -> Tuple[faiss.IndexFlatL2, List[str]]:
-    if not Path(pdf_path).exists():
-        print(f"[AIComparision] PDF not found: {pdf_path}")
-        return None, []
-    return build_pdf_index(pdf_path)
+# --- Gemini REST API ---
+GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-flash-latest:generateContent"
+
+async def _call_gemini(prompt: str, client: httpx.AsyncClient) -> str:
+    body = {
+        "contents": [{"parts": [{"text": prompt}]}]
+    }
+    try:
+        resp = await client.post(GEMINI_URL, headers={"Content-Type": "application/json"}, params={"key": GEMINI_API_KEY}, json=body)
+        if resp.status_code == 200:
+            data = resp.json()
+            return data["candidates"][0]["content"]["parts"][0]["text"].strip()
+        else:
+            return f"AI Service Error: {resp.text}"
+    except Exception as e:
+        return f"Comparison failed due to connection error: {str(e)}"
 
 # --- Gemini Comparison Logic ---
 async def generate_comparison_with_pdf(
     car1: dict,
     car2: dict,
-    pdf_path: Optional[str] = None,
+    brand_ids: Sequence[int] = (),
+    model_ids: Sequence[int] = (),
     k: int = 3,
 ) -> str:
     """
@@ -60,57 +77,72 @@ async def generate_comparison_with_pdf(
     if not GEMINI_API_KEY:
         return "Comparison service unavailable (API Key missing)."
 
-    path = pdf_path or DEFAULT_PDF_PATH
-    index, chunks = get_pdf_index(path)
-    
-    context = "No specific technical catalog matches found."
-    if index and chunks:
-        # Search for context relevant to these cars
-        query = f"{car1.get('brand_name')} {car1.get('model_name')} vs {car2.get('brand_name')} {car2.get('model_name')}"
-        q_emb = embedder.encode([query])
-        _, I = index.search(q_emb, k=k)
-        context = "\n\n".join(chunks[i] for i in I[0] if i < len(chunks))
-
-    # --- Hallucination Prevention Prompt ---
-    system_instruction = (
-        "You are a precision car comparison engine. Your goal is to provide a factual, objective comparison.\n"
-        "STRICT RULES:\n"
-        "1. GROUNDING: Use ONLY the provided 'Catalog Context' and 'Car Listing Data'.\n"
-        "2. NO HALLUCINATION: If the information is not present in the context or listing data, do not invent it. "
-        "Admit if a specific detail (like exact 0-60 time) is unavailable.\n"
-        "3. TONE: Professional and concise. Limit response to 3-4 impactful sentences.\n"
-    )
-
-    car_data = (
-        f"CAR 1: {car1.get('year')} {car1.get('brand_name')} {car1.get('model_name')} "
-        f"({car1.get('horsepower')} HP, {car1.get('transmission')}, {car1.get('fuel_type')}, ${car1.get('price')})\n"
-        f"Description: {car1.get('description')}\n\n"
-        f"CAR 2: {car2.get('year')} {car2.get('brand_name')} {car2.get('model_name')} "
-        f"({car2.get('horsepower')} HP, {car2.get('transmission')}, {car2.get('fuel_type')}, ${car2.get('price')})\n"
-        f"Description: {car2.get('description')}"
-    )
+    # Search for context relevant to these cars, restricted to their brand/model catalogs
+    query = f"{car1.get('brand_name')} {car1.get('model_name')} vs {car2.get('brand_name')} {car2.get('model_name')}"
+    context = await retrieve_catalog_context(query, brand_ids, model_ids, k)
 
     gemini_prompt = (
-        f"{system_instruction}\n"
+        f"{SYSTEM_INSTRUCTION}{PAIR_TONE}\n"
         f"CATALOG CONTEXT (Technical data):\n{context}\n\n"
-        f"LISTING DATA:\n{car_data}\n\n"
+        f"LISTING DATA:\n{_car_data('CAR 1', car1)}\n\n{_car_data('CAR 2', car2)}\n\n"
         "COMPARE THESE TWO VEHICLES:"
     )
 
-    # Call Gemini REST API
-    url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-flash-latest:generateContent"
-    headers = {"Content-Type": "application/json"}
-    body = {
-        "contents": [{"parts": [{"text": gemini_prompt}]}]
-    }
-    
-    try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.post(url, headers=headers, params={"key": GEMINI_API_KEY}, json=body)
-            if resp.status_code == 200:
-                data = resp.json()
-                return data["candidates"][0]["content"]["parts"][0]["text"].strip()
-            else:
-                return f"AI Service Error: {resp.text}"
-    except Exception as e:
-        return f"Comparison failed due to connection error: {str(e)}"
+    async with httpx.AsyncClient(timeout=30) as client:
+        return await _call_gemini(gemini_prompt, client)
+
+# --- Batch Comparison (3-5 shortlisted cars) ---
+async def retrieve_model_contexts(cars: List[dict], k: int = 3) -> Dict[int, str]:
+    """Catalog context once per distinct model (lookups are micro-batched together)."""
+    models = {car["model_id"]: car for car in cars}
+    contexts = await asyncio.gather(*(
+        retrieve_catalog_context(f"{car['brand_name']} {car['model_name']}", [car["brand_id"]], [model_id], k)
+        for model_id, car in models.items()
+    ))
+    return dict(zip(models, contexts))
+
+def _contexts_block(cars: List[dict], contexts: Dict[int, str]) -> str:
+    seen, blocks = set(), []
+    for car in cars:
+        if car["model_id"] in seen:
+            continue
+        seen.add(car["model_id"])
+        blocks.append(f"[{car['brand_name']} {car['model_name']}]\n{contexts[car['model_id']]}")
+    return "\n\n".join(blocks)
+
+async def generate_matrix_comparison(cars: List[dict], contexts: Dict[int, str]) -> str:
+    """One Gemini request comparing all cars side by side."""
+    if not GEMINI_API_KEY:
+        return "Comparison service unavailable (API Key missing)."
+
+    listing_data = "\n\n".join(_car_data(f"CAR {n}", car) for n, car in enumerate(cars, start=1))
+    gemini_prompt = (
+        f"{SYSTEM_INSTRUCTION}{MATRIX_TONE}\n"
+        f"CATALOG CONTEXT (Technical data):\n{_contexts_block(cars, contexts)}\n\n"
+        f"LISTING DATA:\n{listing_data}\n\n"
+        f"COMPARE THESE {len(cars)} VEHICLES:"
+    )
+    async with httpx.AsyncClient(timeout=60) as client:
+        return await _call_gemini(gemini_prompt, client)
+
+async def generate_pairwise_comparisons(cars: List[dict], contexts: Dict[int, str], max_concurrency: int = 4) -> List[dict]:
+    """Every pair compared in its own Gemini request, at most `max_concurrency` in flight."""
+    if not GEMINI_API_KEY:
+        return [{"car1_id": a["id"], "car2_id": b["id"], "ai_summary": "Comparison service unavailable (API Key missing)."}
+                for a, b in combinations(cars, 2)]
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def compare(car1: dict, car2: dict, client: httpx.AsyncClient) -> dict:
+        gemini_prompt = (
+            f"{SYSTEM_INSTRUCTION}{PAIR_TONE}\n"
+            f"CATALOG CONTEXT (Technical data):\n{_contexts_block([car1, car2], contexts)}\n\n"
+            f"LISTING DATA:\n{_car_data('CAR 1', car1)}\n\n{_car_data('CAR 2', car2)}\n\n"
+            "COMPARE THESE TWO VEHICLES:"
+        )
+        async with semaphore:
+            summary = await _call_gemini(gemini_prompt, client)
+        return {"car1_id": car1["id"], "car2_id": car2["id"], "ai_summary": summary}
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        return await asyncio.gather(*(compare(a, b, client) for a, b in combinations(cars, 2)))
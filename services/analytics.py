@@ -0,0 +1,250 @@
+"""
+Marketplace analytics rollups: listings per day and model (volume and prices), auctions per day
+(conversion) and messages per hour. Each pipeline aggregates only source rows newer than its
+watermark into bucket tables, so admin trend endpoints read a few hundred rollup rows instead of
+scanning cars, auctions, bids and messages.
+
+    python manage.py rollup                                  # incremental, all pipelines (cron)
+    python manage.py rollup --backfill --since 2025-01-01    # recompute buckets from the source
+"""
+import os
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import TIMESTAMP, Date, and_, cast, delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from models import (
+    Auction, AuctionStatus, AuctionDailyRollup, Bid, Car, ListingDailyRollup, Message, MessageHourlyRollup, Model, RollupWatermark,
+)
+
+# --- Config ---
+# Rows are only rolled up once they are this old, so transactions that commit late (posted_at/sent_at
+# is set before commit) are not skipped by the watermark
+ANALYTICS_ROLLUP_LAG = timedelta(seconds=float(os.getenv("ANALYTICS_ROLLUP_LAG_SECONDS", "120")))
+# Source time range aggregated per transaction (first run and backfills walk history in these steps)
+ANALYTICS_ROLLUP_WINDOW = timedelta(days=float(os.getenv("ANALYTICS_ROLLUP_WINDOW_DAYS", "7")))
+
+
+@dataclass(frozen=True)
+class Pipeline:
+    name: str
+    target: type                       # rollup model
+    bucket: str                        # "day" | "hour"
+    time_column: object                # source timestamp the watermark follows
+    aggregate: Callable                # time condition -> SELECT of target rows (bucket first)
+    merge: Dict[str, str]              # target column -> "add" | "min" | "max" | "replace" on conflict
+
+
+def _bucket(column, bucket: str):
+    truncated = func.date_trunc(bucket, column)
+    return cast(truncated, Date) if bucket == "day" else truncated
+
+
+def _listings(condition):
+    day = _bucket(Car.posted_at, "day")
+    return (
+        select(day, Car.model_id, Model.brand_id, func.count(), func.sum(Car.price), func.min(Car.price), func.max(Car.price))
+        .join(Model, Car.model_id == Model.id)
+        .where(condition)
+        .group_by(day, Car.model_id, Model.brand_id)
+    )
+
+
+def _auctions(condition):
+    bids = select(func.count()).where(Bid.auction_id == Auction.id).scalar_subquery()  # ix_bids_auction_id_created_at
+    ended = select(
+        Auction.ends_at,
+        (Auction.status != AuctionStatus.pending).label("started"),
+        (Auction.highest_bid >= Auction.reserve_price).label("sold"),
+        Auction.highest_bid,
+        bids.label("bids"),
+    ).where(condition).subquery()
+    day = _bucket(ended.c.ends_at, "day")
+    return select(
+        day,
+        func.count(),
+        func.count().filter(ended.c.started),
+        func.count().filter(ended.c.sold),
+        func.coalesce(func.sum(ended.c.bids), 0),
+        func.coalesce(func.sum(ended.c.highest_bid).filter(ended.c.sold), 0),
+    ).group_by(day)
+
+
+def _messages(condition):
+    hour = _bucket(Message.sent_at, "hour")
+    return select(hour, func.count()).where(condition).group_by(hour)
+
+
+PIPELINES = {
+    pipeline.name: pipeline for pipeline in [
+        Pipeline(
+            "listings", ListingDailyRollup, "day", Car.posted_at, _listings,
+            {"day": "key", "model_id": "key", "brand_id": "replace", "listings": "add", "price_sum": "add", "price_min": "min", "price_max": "max"},
+        ),
+        # auctions count on the day they end: conversion = sold / started
+        Pipeline(
+            "auctions", AuctionDailyRollup, "day", Auction.ends_at, _auctions,
+            {"day": "key", "ended": "add", "started": "add", "sold": "add", "bids": "add", "sold_value": "add"},
+        ),
+        Pipeline("messages", MessageHourlyRollup, "hour", Message.sent_at, _messages, {"hour": "key", "messages": "add"}),
+    ]
+}
+
+
+# --- Bucket arithmetic ---
+def _step(pipeline: Pipeline) -> timedelta:
+    return timedelta(days=1) if pipeline.bucket == "day" else timedelta(hours=1)
+
+
+def _floor(pipeline: Pipeline, moment: datetime) -> datetime:
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0) if pipeline.bucket == "day" else moment
+
+
+def _ceil(pipeline: Pipeline, moment: datetime) -> datetime:
+    floor = _floor(pipeline, moment)
+    return floor if floor == moment else floor + _step(pipeline)
+
+
+def _bucket_value(pipeline: Pipeline, moment: datetime):
+    return moment.date() if pipeline.bucket == "day" else moment
+
+
+# --- Writes ---
+def _merge_into(db: Session, pipeline: Pipeline, condition) -> None:
+    """INSERT ... SELECT the aggregated rows, adding them to existing buckets."""
+    table = pipeline.target.__table__
+    stmt = pg_insert(table).from_select(list(pipeline.merge), pipeline.aggregate(condition))
+    merge = {
+        "add": lambda column: table.c[column] + stmt.excluded[column],
+        "min": lambda column: func.least(table.c[column], stmt.excluded[column]),
+        "max": lambda column: func.greatest(table.c[column], stmt.excluded[column]),
+        "replace": lambda column: stmt.excluded[column],
+    }
+    keys = [column for column, how in pipeline.merge.items() if how == "key"]
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={column: merge[how](column) for column, how in pipeline.merge.items() if how != "key"},
+    ))
+
+
+def lock_watermark(db: Session, name: str) -> Optional[datetime]:
+    """Row lock on a pipeline's watermark: concurrent runs and backfills of one pipeline take turns."""
+    db.execute(pg_insert(RollupWatermark.__table__).values(pipeline=name).on_conflict_do_nothing())
+    return db.execute(
+        select(RollupWatermark.processed_until).where(RollupWatermark.pipeline == name).with_for_update()
+    ).scalar()
+
+
+def run_pipeline(db: Session, pipeline: Pipeline, now: Optional[datetime] = None) -> int:
+    """
+    Rolls up source rows in (watermark, now - lag], one ANALYTICS_ROLLUP_WINDOW per transaction;
+    the buckets and the watermark move together, so a crashed run never double counts.
+    Returns the number of windows processed.
+    """
+    horizon = (now or datetime.utcnow()) - ANALYTICS_ROLLUP_LAG
+    windows = 0
+    while True:
+        processed_until = lock_watermark(db, pipeline.name)
+        if processed_until is None:
+            # first run: start at the oldest source row
+            oldest = db.execute(select(func.min(pipeline.time_column))).scalar()
+            start, lower = (oldest, pipeline.time_column >= oldest) if oldest else (horizon, None)
+        else:
+            start, lower = processed_until, pipeline.time_column > processed_until
+        if start >= horizon:
+            if processed_until is None:
+                db.query(RollupWatermark).filter(RollupWatermark.pipeline == pipeline.name).update({"processed_until": horizon})
+            db.commit()
+            return windows
+        end = min(start + ANALYTICS_ROLLUP_WINDOW, horizon)
+        upper = pipeline.time_column <= end
+        _merge_into(db, pipeline, and_(lower, upper) if lower is not None else upper)
+        db.query(RollupWatermark).filter(RollupWatermark.pipeline == pipeline.name).update({"processed_until": end})
+        db.commit()
+        windows += 1
+
+
+def backfill_pipeline(db: Session, pipeline: Pipeline, since: datetime, until: Optional[datetime] = None) -> int:
+    """
+    Recomputes the buckets covering [since, until) from the source, e.g. after a bulk import with
+    historical posted_at values or a change to the aggregation. Only rows up to the watermark are
+    aggregated; newer ones are left to the incremental run. Returns the number of windows rewritten.
+    """
+    lo = _floor(pipeline, since)
+    windows = 0
+    while True:
+        processed_until = lock_watermark(db, pipeline.name)
+        if processed_until is None:  # nothing rolled up yet: the incremental run covers all history
+            db.commit()
+            return windows
+        hi = _ceil(pipeline, min(until, processed_until) if until else processed_until)
+        if lo >= hi:
+            db.commit()
+            return windows
+        end = min(_ceil(pipeline, lo + ANALYTICS_ROLLUP_WINDOW), hi)
+        target = pipeline.target.__table__
+        bucket = target.c[pipeline.bucket]
+        db.execute(delete(target).where(bucket >= _bucket_value(pipeline, lo), bucket < _bucket_value(pipeline, end)))
+        time = pipeline.time_column
+        _merge_into(db, pipeline, and_(time >= lo, time < end, time <= processed_until))
+        db.commit()
+        windows += 1
+        lo = end
+
+
+def run_all(db: Session) -> Dict[str, int]:
+    return {name: run_pipeline(db, pipeline) for name, pipeline in PIPELINES.items()}
+
+
+# --- Reads (trend series for the admin dashboard) ---
+def _series_bucket(column, interval: str):
+    return func.date_trunc(interval, cast(column, TIMESTAMP)).label("bucket")
+
+
+def listing_series(db: Session, since: date, until: date, interval: str = "day", brand_id: Optional[int] = None, model_id: Optional[int] = None) -> List[dict]:
+    r = ListingDailyRollup
+    bucket = _series_bucket(r.day, interval)
+    query = db.query(bucket, func.sum(r.listings), func.sum(r.price_sum), func.min(r.price_min), func.max(r.price_max)).filter(
+        r.day >= since, r.day <= until
+    )
+    if brand_id is not None:
+        query = query.filter(r.brand_id == brand_id)
+    if model_id is not None:
+        query = query.filter(r.model_id == model_id)
+    return [
+        {"bucket": bucket, "listings": listings, "avg_price": round(price_sum / listings, 2) if listings else None, "min_price": low, "max_price": high}
+        for bucket, listings, price_sum, low, high in query.group_by(bucket).order_by(bucket)
+    ]
+
+
+def auction_series(db: Session, since: date, until: date, interval: str = "day") -> List[dict]:
+    r = AuctionDailyRollup
+    bucket = _series_bucket(r.day, interval)
+    query = db.query(bucket, func.sum(r.ended), func.sum(r.started), func.sum(r.sold), func.sum(r.bids), func.sum(r.sold_value)).filter(
+        r.day >= since, r.day <= until
+    )
+    return [
+        {"bucket": bucket, "ended": ended, "started": started, "sold": sold, "conversion_rate": round(sold / started, 4) if started else None,
+         "bids": bids, "sold_value": sold_value}
+        for bucket, ended, started, sold, bids, sold_value in query.group_by(bucket).order_by(bucket)
+    ]
+
+
+def message_series(db: Session, since: datetime, until: datetime, interval: str = "hour") -> List[dict]:
+    r = MessageHourlyRollup
+    bucket = _series_bucket(r.hour, interval)
+    query = db.query(bucket, func.sum(r.messages)).filter(r.hour >= since, r.hour <= until)
+    return [{"bucket": bucket, "messages": messages} for bucket, messages in query.group_by(bucket).order_by(bucket)]
+
+
+def rollup_status(db: Session) -> List[dict]:
+    """Watermark per pipeline and how far behind real time it is (lag included)."""
+    now = datetime.utcnow()
+    watermarks = dict(db.query(RollupWatermark.pipeline, RollupWatermark.processed_until).all())
+    return [
+        {"pipeline": name, "processed_until": watermarks.get(name),
+         "behind_seconds": round((now - watermarks[name]).total_seconds()) if watermarks.get(name) else None}
+        for name in PIPELINES
+    ]
@@ -0,0 +1,145 @@
+import os
+import csv
+import json
+from dataclasses import dataclass, field
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from models import Car, CarCategoryMap, CarFeature
+from schemas import UsedCarImportRow
+from services.reference_cache import ReferenceCatalog, get_reference_catalog
+from services.stats import count_inserted
+
+# --- Config ---
+BULK_IMPORT_CHUNK_SIZE = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "1000"))   # rows per INSERT ... RETURNING
+BULK_IMPORT_MAX_ERRORS = int(os.getenv("BULK_IMPORT_MAX_ERRORS", "1000"))   # per-row errors reported back
+
+# CSV list columns hold several values separated by "|", e.g. "SUV|Family"
+_LIST_FIELDS = ("category_ids", "feature_ids", "categories", "features")
+
+
+@dataclass
+class ImportResult:
+    inserted_ids: List[int] = field(default_factory=list)
+    failed: int = 0
+    errors: List[dict] = field(default_factory=list)
+
+    def error(self, row: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < BULK_IMPORT_MAX_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+
+# --- Parsing (row numbers are 1-based data rows) ---
+def iter_ndjson(stream: IO[str]) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    row = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield row, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield row, None, "Each line must be a JSON object"
+            continue
+        yield row, data, None
+
+
+def iter_csv(stream: IO[str]) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    for row, data in enumerate(csv.DictReader(stream), start=1):
+        cleaned = {k.strip(): v for k, v in data.items() if k and v not in (None, "")}
+        for name in _LIST_FIELDS:
+            if name in cleaned:
+                cleaned[name] = [part.strip() for part in cleaned[name].split("|") if part.strip()]
+        yield row, cleaned, None
+
+
+# --- Name/ID resolution against the in-memory reference catalog ---
+def _resolve_ids(ids: List[int], names: List[str], by_name: Dict[str, int], valid, label: str) -> List[int]:
+    resolved = set()
+    for id in ids:
+        if id not in valid:
+            raise ValueError(f"{label} ID {id} is invalid.")
+        resolved.add(id)
+    for name in names:
+        id = by_name.get(name.lower())
+        if id is None:
+            raise ValueError(f"{label} '{name}' does not exist.")
+        resolved.add(id)
+    return sorted(resolved)
+
+
+def resolve_row(catalog: ReferenceCatalog, payload: UsedCarImportRow) -> Tuple[int, List[int], List[int]]:
+    brand = catalog.find_brand(payload.brand_name)
+    if not brand:
+        raise ValueError(f"Brand '{payload.brand_name}' does not exist.")
+    model = catalog.find_model(brand.id, payload.model_name)
+    if not model:
+        raise ValueError(f"Model '{payload.model_name}' does not exist for brand '{payload.brand_name}'.")
+    category_ids = _resolve_ids(payload.category_ids, payload.categories, catalog.category_ids_by_name, catalog.categories, "Category")
+    feature_ids = _resolve_ids(payload.feature_ids, payload.features, catalog.feature_ids_by_name, catalog.features, "Feature")
+    return model.id, category_ids, feature_ids
+
+
+# --- Insertion ---
+def _insert_chunk(db: Session, chunk: List[Tuple[int, dict, List[int], List[int]]], result: ImportResult) -> None:
+    """
+    One multi-row INSERT ... RETURNING for the cars, then one batched insert per association table.
+    Core inserts bypass the ORM flush, so the stats counters are updated here in the same transaction.
+    """
+    try:
+        inserted = db.execute(
+            insert(Car).returning(Car.id, Car.seller_id, Car.price, Car.posted_at, sort_by_parameter_order=True),
+            [values for _, values, _, _ in chunk],
+        ).all()
+        ids = [row.id for row in inserted]
+        category_rows = [{"car_id": id, "category_id": c} for id, (_, _, cats, _) in zip(ids, chunk) for c in cats]
+        feature_rows = [{"car_id": id, "feature_id": f} for id, (_, _, _, feats) in zip(ids, chunk) for f in feats]
+        if category_rows:
+            db.execute(insert(CarCategoryMap), category_rows)
+        if feature_rows:
+            db.execute(insert(CarFeature), feature_rows)
+        count_inserted(db, Car, [(row.seller_id, row.price, row.posted_at) for row in inserted])
+        db.commit()
+        result.inserted_ids.extend(ids)
+    except SQLAlchemyError as e:
+        db.rollback()
+        message = f"Database error: {e.__class__.__name__}"
+        for row, _, _, _ in chunk:
+            result.error(row, message)
+
+
+def import_used_cars(db: Session, seller_id: int, rows: Iterator[Tuple[int, Optional[dict], Optional[str]]], chunk_size: int = BULK_IMPORT_CHUNK_SIZE) -> ImportResult:
+    """
+    Validates each row, resolves names through the reference catalog and inserts valid rows in chunks.
+    Invalid rows are reported and skipped; each chunk commits on its own.
+    """
+    catalog = get_reference_catalog(db)
+    result = ImportResult()
+    chunk: List[Tuple[int, dict, List[int], List[int]]] = []
+    for row, data, parse_error in rows:
+        if parse_error:
+            result.error(row, parse_error)
+            continue
+        try:
+            payload = UsedCarImportRow.model_validate(data)
+            model_id, category_ids, feature_ids = resolve_row(catalog, payload)
+        except ValidationError as e:
+            result.error(row, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+            continue
+        except ValueError as e:
+            result.error(row, str(e))
+            continue
+        values = payload.model_dump(exclude={"brand_name", "model_name", "category_ids", "feature_ids", "categories", "features"})
+        chunk.append((row, {**values, "model_id": model_id, "seller_id": seller_id}, category_ids, feature_ids))
+        if len(chunk) >= chunk_size:
+            _insert_chunk(db, chunk, result)
+            chunk = []
+    if chunk:
+        _insert_chunk(db, chunk, result)
+    return result
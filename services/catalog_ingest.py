@@ -0,0 +1,258 @@
+import os
+import re
+import json
+import hashlib
+import multiprocessing
+import numpy as np
+import faiss
+import pdfplumber
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from services.vector_index import IndexConfig, build_index
+
+# --- Config ---
+CATALOG_CHUNK_WORDS = int(os.getenv("CATALOG_CHUNK_WORDS", "200"))
+CATALOG_CHUNK_OVERLAP = int(os.getenv("CATALOG_CHUNK_OVERLAP", "40"))
+CATALOG_EMBED_BATCH_SIZE = int(os.getenv("CATALOG_EMBED_BATCH_SIZE", "64"))
+CATALOG_EXTRACT_WORKERS = int(os.getenv("CATALOG_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+CATALOG_PAGES_PER_TASK = int(os.getenv("CATALOG_PAGES_PER_TASK", "8"))
+
+# Headings: numbered ("3.2 Engine") or all-caps ("ENGINE & TRANSMISSION") short lines
+_NUMBERED_HEADING = re.compile(r"^\d+(\.\d+)*\.?\s+\S")
+
+
+@dataclass
+class Chunk:
+    page: int
+    section: Optional[str]
+    text: str
+
+
+@dataclass
+class IngestStats:
+    chunk_count: int = 0
+    page_count: int = 0
+    pages_embedded: int = 0
+    pages_reused: int = 0
+
+
+# --- Page extraction (runs in worker processes) ---
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    with pdfplumber.open(pdf_path) as pdf:
+        return [(n, pdf.pages[n].extract_text() or "") for n in range(start, min(stop, len(pdf.pages)))]
+
+
+def iter_pages(pdf_path: str, workers: int = CATALOG_EXTRACT_WORKERS, pages_per_task: int = CATALOG_PAGES_PER_TASK) -> Iterator[Tuple[int, str]]:
+    """
+    Yields (page_number, text) in page order while later pages are extracted in parallel. At most
+    two page ranges per worker are in flight, so extracted text waiting on a slow consumer is bounded.
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        page_count = len(pdf.pages)
+    ranges = [(start, start + pages_per_task) for start in range(0, page_count, pages_per_task)]
+    if workers <= 1 or len(ranges) <= 1:
+        for start, stop in ranges:
+            yield from _extract_page_range(pdf_path, start, stop)
+        return
+    # spawn: the parent may hold torch/DB threads that are unsafe to fork
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        pending_ranges = iter(ranges)
+        in_flight = deque(pool.submit(_extract_page_range, pdf_path, start, stop) for start, stop in islice(pending_ranges, workers * 2))
+        try:
+            while in_flight:
+                pages = in_flight.popleft().result()
+                for start, stop in islice(pending_ranges, 1):
+                    in_flight.append(pool.submit(_extract_page_range, pdf_path, start, stop))
+                yield from pages
+        finally:
+            for future in in_flight:  # consumer stopped early or a range failed
+                future.cancel()
+
+
+# --- Chunking ---
+def _is_heading(line: str) -> bool:
+    line = line.strip()
+    if not line or len(line) > 80 or line.endswith((".", ",", ";", ":")):
+        return False
+    words = line.split()
+    if len(words) > 8:
+        return False
+    if _NUMBERED_HEADING.match(line):
+        return True
+    letters = [c for c in line if c.isalpha()]
+    return len(letters) >= 3 and all(c.isupper() for c in letters)
+
+
+def chunk_page(page: int, text: str, section: Optional[str], chunk_words: int = CATALOG_CHUNK_WORDS, overlap: int = CATALOG_CHUNK_OVERLAP) -> Tuple[List[Chunk], Optional[str]]:
+    """
+    Splits a page into overlapping word windows that never cross a section heading.
+    Each chunk is prefixed with its section title. Returns the chunks and the section
+    still open at the end of the page (it carries over to the next page).
+    """
+    sections: List[Tuple[Optional[str], List[str]]] = [(section, [])]
+    for line in text.splitlines():
+        if _is_heading(line):
+            section = line.strip()
+            sections.append((section, []))
+        else:
+            sections[-1][1].extend(line.split())
+
+    step = max(1, chunk_words - overlap)
+    chunks: List[Chunk] = []
+    for title, words in sections:
+        if not words:
+            continue
+        for start in range(0, len(words), step):
+            window = words[start : start + chunk_words]
+            body = " ".join(window)
+            chunks.append(Chunk(page, title, f"{title}: {body}" if title else body))
+            if start + chunk_words >= len(words):
+                break
+    return chunks, section
+
+
+def page_hash(text: str) -> str:
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+# --- Shard files ---
+def shard_paths(index_dir: Path, document_id: int) -> Dict[str, Path]:
+    return {
+        "index": index_dir / f"{document_id}.faiss",
+        "chunks": index_dir / f"{document_id}.chunks.json",
+        "vectors": index_dir / f"{document_id}.vectors.f32",
+    }
+
+
+def _load_previous(paths: Dict[str, Path], dim: int):
+    """Old page manifest and memory-mapped vectors, used to skip unchanged pages."""
+    if not paths["chunks"].exists() or not paths["vectors"].exists():
+        return {}, [], None
+    manifest = json.loads(paths["chunks"].read_text(encoding="utf-8"))
+    if "pages" not in manifest:
+        return {}, [], None
+    vectors = np.memmap(paths["vectors"], dtype="float32", mode="r").reshape(-1, dim)
+    return {p["hash"]: p for p in manifest["pages"]}, manifest["chunks"], vectors
+
+
+class _ShardWriter:
+    """Streams embedded chunks into the FAISS index and the raw vector file."""
+
+    def __init__(self, paths: Dict[str, Path], config: IndexConfig, dim: int):
+        self.config, self.dim = config, dim
+        self.index: Optional[faiss.Index] = None
+        self.vectors_out = open(str(paths["vectors"]) + ".tmp", "wb")
+        self.pending: List[np.ndarray] = []   # only used until IVF-PQ has its training sample
+        self.count = 0
+
+    def add(self, vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        self.vectors_out.write(vectors.tobytes())
+        if self.index is None:
+            self.pending.append(vectors)
+            if sum(len(v) for v in self.pending) < self.config.min_train_size:
+                self.count += len(vectors)
+                return
+            self._create_index()
+        else:
+            self.index.add_with_ids(vectors, np.arange(self.count, self.count + len(vectors), dtype="int64"))
+        self.count += len(vectors)
+
+    def _create_index(self):
+        sample = np.concatenate(self.pending) if self.pending else np.empty((0, self.dim), dtype="float32")
+        self.index = build_index(self.dim, self.config, train_vectors=sample)
+        if len(sample):
+            self.index.add_with_ids(sample, np.arange(len(sample), dtype="int64"))
+        self.pending = []
+
+    def close(self) -> faiss.Index:
+        self.vectors_out.close()
+        if self.index is None:
+            self._create_index()
+        return self.index
+
+
+def ingest_pdf(pdf_path: str, document_id: int, index_dir: Path, config: IndexConfig, batch_size: int = CATALOG_EMBED_BATCH_SIZE) -> IngestStats:
+    """
+    Streaming, incremental ingestion of one PDF into its shard:
+    pages are extracted in a process pool, chunked with overlap per section, embedded in
+    batches and appended to the index as they go. Pages whose text hash matches the
+    previous ingestion reuse their stored vectors instead of being re-embedded.
+    """
+    from services.embeddings import embed_texts, embedder
+
+    dim = embedder.get_sentence_embedding_dimension()
+    index_dir.mkdir(parents=True, exist_ok=True)
+    paths = shard_paths(index_dir, document_id)
+    previous_pages, previous_chunks, previous_vectors = _load_previous(paths, dim)
+
+    writer = _ShardWriter(paths, config, dim)
+    try:
+        stats = IngestStats()
+        chunk_texts: List[str] = []
+        chunk_meta: List[dict] = []
+        pages: List[dict] = []
+        batch: List[Chunk] = []
+        section: Optional[str] = None
+
+        def flush():
+            if batch:
+                writer.add(embed_texts([c.text for c in batch], batch_size=batch_size))
+                batch.clear()
+
+        for page_no, text in iter_pages(pdf_path):
+            stats.page_count += 1
+            h = page_hash(text)
+            start = len(chunk_texts)
+            old = previous_pages.get(h)
+            if old is not None and old.get("section_in") == section:
+                # Unchanged page: copy its chunks and vectors, no embedding
+                flush()
+                rows = slice(old["start"], old["start"] + old["count"])
+                chunk_texts.extend(previous_chunks[rows])
+                chunk_meta.extend({"page": page_no, "section": s} for s in old["sections"])
+                if old["count"]:
+                    writer.add(np.asarray(previous_vectors[rows]))
+                section_in, section = section, old["section_out"]
+                stats.pages_reused += 1
+            else:
+                section_in = section
+                chunks, section = chunk_page(page_no, text, section)
+                for chunk in chunks:
+                    chunk_texts.append(chunk.text)
+                    chunk_meta.append({"page": chunk.page, "section": chunk.section})
+                    batch.append(chunk)
+                    if len(batch) >= batch_size:
+                        flush()
+                stats.pages_embedded += 1
+            pages.append({
+                "page": page_no, "hash": h, "start": start, "count": len(chunk_texts) - start,
+                "sections": [m["section"] for m in chunk_meta[start:]],
+                "section_in": section_in, "section_out": section,
+            })
+        flush()
+        index = writer.close()
+
+        if not chunk_texts:
+            raise ValueError("No extractable text in PDF")
+
+        faiss.write_index(index, str(paths["index"]) + ".tmp")
+        Path(str(paths["chunks"]) + ".tmp").write_text(
+            json.dumps({"chunks": chunk_texts, "meta": chunk_meta, "pages": pages}), encoding="utf-8"
+        )
+        del previous_vectors  # release the memmap before replacing the file
+        for key in ("index", "chunks", "vectors"):
+            os.replace(str(paths[key]) + ".tmp", paths[key])
+    finally:
+        # Failed or interrupted ingestions must not leave partial .tmp files behind
+        writer.vectors_out.close()
+        for key in ("index", "chunks", "vectors"):
+            Path(str(paths[key]) + ".tmp").unlink(missing_ok=True)
+
+    stats.chunk_count = len(chunk_texts)
+    return stats
@@ -0,0 +1,283 @@
+import os
+import sys
+import json
+import time
+import threading
+import numpy as np
+import faiss
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from database import SessionLocal, engine
+from models import CatalogDocument, CatalogStatus
+from services.catalog_ingest import ingest_pdf, shard_paths
+from services.vector_index import index_config_from_env, search_params, index_memory_bytes
+
+# --- Config ---
+BASE_DIR = Path(__file__).resolve().parent
+CATALOG_DIR = Path(os.getenv("CATALOG_DIR", str(BASE_DIR / "catalogs")))               # uploaded PDFs
+CATALOG_INDEX_DIR = Path(os.getenv("CATALOG_INDEX_DIR", str(BASE_DIR / "indexes" / "catalogs")))  # one shard per PDF
+CATALOG_STORE_MAX_BYTES = int(os.getenv("CATALOG_STORE_MAX_MB", "512")) * 2**20          # loaded shards budget
+CATALOG_REFRESH_SECONDS = float(os.getenv("CATALOG_REFRESH_SECONDS", "30"))
+CATALOG_INGEST_WORKERS = int(os.getenv("CATALOG_INGEST_WORKERS", "1"))
+CATALOG_INDEX_CONFIG = index_config_from_env("VECTOR_INDEX_")  # VECTOR_INDEX_TYPE=flat|ivfpq|hnsw, ...
+
+INGEST_LOCK_CLASS = 0x43415401  # pg advisory lock (class, document id) held while a document is ingested
+
+
+@dataclass
+class ShardMeta:
+    document_id: int
+    brand_id: Optional[int]
+    model_id: Optional[int]
+    ingested_at: Optional[datetime]  # changes with every re-ingestion (new shard files)
+
+
+@dataclass
+class Shard:
+    meta: ShardMeta
+    index: faiss.Index
+    chunks: List[str]
+    size_bytes: int
+
+
+@dataclass
+class CatalogHit:
+    document_id: int
+    score: float
+    text: str
+
+
+def _shard_paths(document_id: int):
+    paths = shard_paths(CATALOG_INDEX_DIR, document_id)
+    return paths["index"], paths["chunks"]
+
+
+# --- Ingestion (never runs inside a request) ---
+@contextmanager
+def _ingest_lock(document_id: int) -> Iterator[bool]:
+    """
+    Session-level advisory lock on its own connection for the whole ingestion, so any process can
+    tell a live ingestion from one a restart interrupted. Yields False if another process holds it.
+    """
+    with engine.connect() as connection:
+        locked = connection.execute(select(func.pg_try_advisory_lock(INGEST_LOCK_CLASS, document_id))).scalar()
+        connection.commit()
+        try:
+            yield locked
+        finally:
+            if locked:
+                connection.execute(select(func.pg_advisory_unlock(INGEST_LOCK_CLASS, document_id)))
+                connection.commit()
+
+
+def ingest_document(document_id: int) -> None:
+    """Builds the shard for a registered catalog document and records the outcome."""
+    with _ingest_lock(document_id) as locked:
+        if not locked:
+            print(f"[catalog_store] Document {document_id} is being ingested by another process")
+            return
+        _ingest_locked(document_id)
+
+
+def _ingest_locked(document_id: int) -> None:
+    with SessionLocal() as db:
+        doc = db.query(CatalogDocument).filter(CatalogDocument.id == document_id).first()
+        # Already handled by another process (queued twice, e.g. by resume_interrupted_ingestions)
+        if not doc or doc.status not in (CatalogStatus.pending, CatalogStatus.processing):
+            return
+        file_path = doc.file_path
+        doc.status = CatalogStatus.processing
+        db.commit()
+        try:
+            stats = ingest_pdf(file_path, document_id, CATALOG_INDEX_DIR, CATALOG_INDEX_CONFIG)
+            print(f"[catalog_store] Document {document_id}: {stats.page_count} pages, "
+                  f"{stats.pages_embedded} embedded, {stats.pages_reused} unchanged, {stats.chunk_count} chunks")
+            outcome = {"chunk_count": stats.chunk_count, "status": CatalogStatus.ready, "error": None, "ingested_at": datetime.utcnow()}
+        except Exception as e:
+            print(f"[catalog_store] Ingestion of document {document_id} failed: {e}")
+            outcome = {"status": CatalogStatus.failed, "error": str(e)}
+        # A plain UPDATE rather than the loaded entity: the document may have been deleted meanwhile
+        updated = db.query(CatalogDocument).filter(CatalogDocument.id == document_id).update(outcome, synchronize_session=False)
+        db.commit()
+    if not updated:
+        # Deleted during ingestion: its delete_shard ran before this shard was written
+        print(f"[catalog_store] Document {document_id} was deleted during ingestion, removing its shard")
+        delete_shard(document_id)
+        return
+    catalog_store.invalidate(document_id)
+
+
+_ingest_pool = ThreadPoolExecutor(max_workers=CATALOG_INGEST_WORKERS, thread_name_prefix="catalog-ingest")
+
+
+def submit_ingestion(document_id: int):
+    """Queues a document for background ingestion."""
+    return _ingest_pool.submit(ingest_document, document_id)
+
+
+def resume_interrupted_ingestions() -> int:
+    """
+    Re-queues documents a restart left pending or processing; called at startup by processes
+    serving "ai". Documents another process is ingesting are skipped by their ingestion lock.
+    """
+    with SessionLocal() as db:
+        ids = [id for (id,) in db.query(CatalogDocument.id).filter(
+            CatalogDocument.status.in_([CatalogStatus.pending, CatalogStatus.processing])
+        ).order_by(CatalogDocument.id)]
+    for document_id in ids:
+        submit_ingestion(document_id)
+    return len(ids)
+
+
+def delete_shard(document_id: int) -> None:
+    catalog_store.invalidate(document_id)
+    for path in shard_paths(CATALOG_INDEX_DIR, document_id).values():
+        path.unlink(missing_ok=True)
+
+
+# --- Query side ---
+class CatalogStore:
+    """
+    Sharded vector store over ingested catalogs: one FAISS shard per document,
+    loaded from disk on demand and evicted LRU once loaded shards exceed the memory budget.
+    The shard registry is refreshed from `catalog_documents` so all workers see new uploads and
+    drop shards that were deleted or re-ingested elsewhere.
+    """
+
+    def __init__(self, max_bytes: int = CATALOG_STORE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.loaded_bytes = 0
+        self._registry: Dict[int, ShardMeta] = {}
+        self._loaded: "OrderedDict[int, Shard]" = OrderedDict()
+        self._refreshed_at = 0.0
+        self._lock = threading.RLock()
+
+    def refresh(self, db: Session, force: bool = False) -> None:
+        if not force and time.monotonic() - self._refreshed_at < CATALOG_REFRESH_SECONDS:
+            return
+        rows = db.query(CatalogDocument.id, CatalogDocument.brand_id, CatalogDocument.model_id, CatalogDocument.ingested_at).filter(
+            CatalogDocument.status == CatalogStatus.ready
+        ).all()
+        with self._lock:
+            self._registry = {r.id: ShardMeta(r.id, r.brand_id, r.model_id, r.ingested_at) for r in rows}
+            # Gone, or re-ingested (possibly by another process) since the shard was loaded
+            for document_id in [d for d, shard in self._loaded.items() if shard.meta != self._registry.get(d)]:
+                self._evict(document_id)
+            self._refreshed_at = time.monotonic()
+
+    def invalidate(self, document_id: int) -> None:
+        with self._lock:
+            self._evict(document_id)
+            self._refreshed_at = 0.0
+
+    def _evict(self, document_id: int) -> None:
+        shard = self._loaded.pop(document_id, None)
+        if shard:
+            self.loaded_bytes -= shard.size_bytes
+
+    def _get_shard(self, meta: ShardMeta) -> Optional[Shard]:
+        with self._lock:
+            shard = self._loaded.get(meta.document_id)
+            if shard:
+                self._loaded.move_to_end(meta.document_id)
+                return shard
+
+        index_path, chunks_path = _shard_paths(meta.document_id)
+        if not index_path.exists() or not chunks_path.exists():
+            return None
+        index = faiss.read_index(str(index_path))
+        chunks = json.loads(chunks_path.read_text(encoding="utf-8"))["chunks"]
+        size = index_memory_bytes(index) + sum(len(c) for c in chunks)
+        shard = Shard(meta, index, chunks, size)
+
+        with self._lock:
+            self._evict(meta.document_id)
+            self._loaded[meta.document_id] = shard
+            self.loaded_bytes += size
+            # Keep at least the shard just loaded, even if it alone exceeds the budget
+            while self.loaded_bytes > self.max_bytes and len(self._loaded) > 1:
+                self._evict(next(iter(self._loaded)))
+        return shard
+
+    def select_shards(self, brand_ids: Sequence[int] = (), model_ids: Sequence[int] = ()) -> List[ShardMeta]:
+        """Model catalogs for the given models, brand catalogs for the brands, plus general catalogs."""
+        brand_ids, model_ids = set(brand_ids), set(model_ids)
+        with self._lock:
+            registry = list(self._registry.values())
+        selected = []
+        for meta in registry:
+            if meta.model_id is not None:
+                if meta.model_id in model_ids:
+                    selected.append(meta)
+            elif meta.brand_id is not None:
+                if meta.brand_id in brand_ids:
+                    selected.append(meta)
+            else:
+                selected.append(meta)
+        return selected
+
+    def search(self, query_vector: np.ndarray, k: int = 3, brand_ids: Sequence[int] = (), model_ids: Sequence[int] = ()) -> List[CatalogHit]:
+        return self.search_batch([(query_vector, k, brand_ids, model_ids)])[0]
+
+    def search_batch(self, requests: Sequence[Tuple[np.ndarray, int, Sequence[int], Sequence[int]]]) -> List[List[CatalogHit]]:
+        """
+        Answers several (query_vector, k, brand_ids, model_ids) requests at once:
+        queries hitting the same shard are stacked into a single index.search call.
+        """
+        positions: Dict[int, List[int]] = {}
+        metas: Dict[int, ShardMeta] = {}
+        for pos, (_, _, brand_ids, model_ids) in enumerate(requests):
+            for meta in self.select_shards(brand_ids, model_ids):
+                positions.setdefault(meta.document_id, []).append(pos)
+                metas[meta.document_id] = meta
+
+        results: List[List[CatalogHit]] = [[] for _ in requests]
+        for document_id, rows in positions.items():
+            shard = self._get_shard(metas[document_id])
+            if not shard:
+                continue
+            queries = np.ascontiguousarray(np.stack([requests[p][0] for p in rows]), dtype="float32")
+            k = min(max(requests[p][1] for p in rows), len(shard.chunks))
+            scores, ids = shard.index.search(queries, k, params=search_params(shard.index, CATALOG_INDEX_CONFIG))
+            for row, p in enumerate(rows):
+                results[p].extend(
+                    CatalogHit(document_id, float(s), shard.chunks[i])
+                    for s, i in zip(scores[row], ids[row]) if 0 <= i < len(shard.chunks)
+                )
+
+        for p, hits in enumerate(results):
+            hits.sort(key=lambda h: h.score, reverse=True)
+            del hits[requests[p][1]:]
+        return results
+
+
+catalog_store = CatalogStore()
+
+
+def register_document(db: Session, file_path: str, filename: str, brand_id: Optional[int] = None, model_id: Optional[int] = None) -> CatalogDocument:
+    doc = CatalogDocument(filename=filename, file_path=file_path, brand_id=brand_id, model_id=model_id, status=CatalogStatus.pending)
+    db.add(doc)
+    db.commit()
+    db.refresh(doc)
+    return doc
+
+
+if __name__ == "__main__":
+    # python -m services.catalog_store ingest services/carplace_full_technical_catalog.pdf [brand_id] [model_id]
+    if len(sys.argv) >= 3 and sys.argv[1] == "ingest":
+        path = str(Path(sys.argv[2]).resolve())
+        brand = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        model = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        with SessionLocal() as session:
+            document = register_document(session, path, Path(path).name, brand, model)
+        ingest_document(document.id)
+        print(f"Ingested {path} as catalog document {document.id}")
+    else:
+        print("usage: python -m services.catalog_store ingest <pdf_path> [brand_id] [model_id]")
@@ -1,5 +1,6 @@
 import smtplib
 import os
+from typing import List
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
@@ -12,18 +13,18 @@ SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASS = os.getenv("SMTP_PASS")
 SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USER)
 
-def send_otp_email(email_to: str, otp_code: str):
-    if not all([SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS]):
+def smtp_configured() -> bool:
+    return all([SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS])
+
+def send_email(email_to: str, subject: str, body: str) -> bool:
+    if not smtp_configured():
         print("Warning: SMTP settings not fully configured. Email not sent.")
-        print(f"OTP for {email_to} is: {otp_code}")
-        return
+        return False
 
     msg = MIMEMultipart()
     msg['From'] = SMTP_FROM
     msg['To'] = email_to
-    msg['Subject'] = "Your CarPlace 2FA Code"
-
-    body = f"Your one-time password (OTP) for login is: {otp_code}. It expires in 5 minutes."
+    msg['Subject'] = subject
     msg.attach(MIMEText(body, 'plain'))
 
     try:
@@ -32,6 +33,20 @@ def send_otp_email(email_to: str, otp_code: str):
         server.login(SMTP_USER, SMTP_PASS)
         server.send_message(msg)
         server.quit()
-        print(f"OTP sent successfully to {email_to}")
+        return True
     except Exception as e:
         print(f"Error sending email: {e}")
+        return False
+
+def send_otp_email(email_to: str, otp_code: str):
+    body = f"Your one-time password (OTP) for login is: {otp_code}. It expires in 5 minutes."
+    if send_email(email_to, "Your CarPlace 2FA Code", body):
+        print(f"OTP sent successfully to {email_to}")
+    elif not all([SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS]):
+        print(f"OTP for {email_to} is: {otp_code}")
+
+def send_saved_search_alert(email_to: str, lines: List[str]) -> bool:
+    """One digest per user and run: a line per new listing matching one of their saved searches."""
+    body = "New listings match your saved searches:\n\n" + "\n".join(lines)
+    subject = f"{len(lines)} new listing{'s' if len(lines) != 1 else ''} for your saved searches"
+    return send_email(email_to, subject, body)
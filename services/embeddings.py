@@ -0,0 +1,16 @@
+import os
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from typing import Sequence
+
+# --- Config ---
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+# Load embedding model once on import (shared by catalog RAG and listing search)
+embedder = SentenceTransformer(EMBEDDING_MODEL)
+
+
+def embed_texts(texts: Sequence[str], batch_size: int = 32) -> np.ndarray:
+    """L2-normalized float32 embeddings, ready for inner-product FAISS indexes."""
+    vectors = embedder.encode(list(texts), batch_size=batch_size, normalize_embeddings=True)
+    return np.ascontiguousarray(vectors, dtype="float32")
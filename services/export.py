@@ -0,0 +1,89 @@
+import io
+import os
+import csv
+import json
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi.responses import StreamingResponse
+from typing import Callable, Iterator, List, Optional
+from sqlalchemy.orm import Query, Session
+from database import SessionLocal
+
+# --- Config ---
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))  # rows fetched per server-side cursor round trip
+
+# updated_at is set before commit, so a row can commit after an export already reported a later
+# Last-Modified; incremental exports re-send this window before If-Modified-Since (consumers upsert by id)
+EXPORT_COMMIT_OVERLAP = timedelta(seconds=float(os.getenv("EXPORT_COMMIT_OVERLAP_SECONDS", "60")))
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def parse_if_modified_since(value: Optional[str]) -> Optional[datetime]:
+    """HTTP date → naive UTC datetime (the database stores naive UTC); invalid dates are ignored."""
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def changed_after(if_modified_since: Optional[str]) -> Optional[datetime]:
+    """Lower bound (exclusive) of an incremental export: If-Modified-Since minus EXPORT_COMMIT_OVERLAP."""
+    since = parse_if_modified_since(if_modified_since)
+    return since - EXPORT_COMMIT_OVERLAP if since else None
+
+
+def whole_seconds(value: Optional[datetime]) -> Optional[datetime]:
+    """HTTP dates have no fraction: Last-Modified and its If-Modified-Since comparison use whole seconds."""
+    return value.replace(microsecond=0) if value else None
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def stream_export(build_query: Callable[[Session], Query], columns: List[str], fmt: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Streams the rows of `build_query(session)` through a server-side cursor, one encoded batch
+    at a time, so memory stays flat whatever the row count. The session is owned by the generator
+    because the response body is produced after the request's own session is closed.
+    """
+    with SessionLocal() as db:
+        rows = build_query(db).execution_options(yield_per=batch_size)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if fmt == "csv" else None
+        if writer:
+            writer.writerow(columns)
+        count = 0
+        for row in rows:
+            if writer:
+                writer.writerow(["" if v is None else "|".join(v) if isinstance(v, list) else v for v in row])
+            else:
+                buffer.write(json.dumps(dict(zip(columns, row)), default=_json_value))
+                buffer.write("\n")
+            count += 1
+            if count % batch_size == 0:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+
+def export_response(build_query: Callable[[Session], Query], columns: List[str], fmt: str, filename: str, last_modified: Optional[datetime]) -> StreamingResponse:
+    """Streaming download; Last-Modified is what the client sends back as If-Modified-Since next time."""
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    return StreamingResponse(stream_export(build_query, columns, fmt), media_type=EXPORT_MEDIA_TYPES[fmt], headers=headers)
@@ -0,0 +1,62 @@
+import os
+import time
+import sys
+import importlib
+from typing import Dict, List, Sequence, Tuple
+
+# --- Config ---
+# Feature groups this process serves, e.g. lean API pods: CARPLACE_FEATURES=core,auction
+# and separate AI/OCR pods: CARPLACE_FEATURES=core,ai,ocr. Defaults to everything.
+# "insights" (price estimates, similar listings) keeps in-memory NumPy listing pools, so lean pods can leave it out.
+KNOWN_FEATURES = ("core", "auction", "ai", "ocr", "insights")
+_requested = {f.strip().lower() for f in os.getenv("CARPLACE_FEATURES", ",".join(KNOWN_FEATURES)).split(",") if f.strip()}
+for _unknown in sorted(_requested - set(KNOWN_FEATURES)):
+    print(f"[features] Ignoring unknown feature '{_unknown}' (known: {', '.join(KNOWN_FEATURES)})")
+# core (auth, listings, catalog, messaging) is always served
+ENABLED_FEATURES = frozenset(_requested & set(KNOWN_FEATURES)) | {"core"}
+
+# Per-feature import cost measured while registering routers: {feature: {"routers", "import_ms", "rss_mb"}}
+feature_report: Dict[str, dict] = {}
+
+
+def feature_enabled(name: str) -> bool:
+    return name in ENABLED_FEATURES
+
+
+def rss_mb() -> float:
+    """Current resident set size (falls back to the peak where /proc is unavailable, 0 on Windows)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource  # POSIX only
+    except ImportError:
+        return 0.0  # Windows: RSS is not reported
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def include_routers(app, routers: Sequence[Tuple[str, str]]) -> None:
+    """
+    Imports `routers.<module>` only for enabled features and includes its `router`, in the given
+    order (route order matters for overlapping paths). Heavy dependencies (torch, faiss,
+    pytesseract, ...) are therefore never imported by processes that do not serve them.
+    """
+    for feature, module in routers:
+        if not feature_enabled(feature):
+            continue
+        entry = feature_report.setdefault(feature, {"routers": [], "import_ms": 0.0, "rss_mb": 0.0})
+        start, rss_before = time.perf_counter(), rss_mb()
+        app.include_router(importlib.import_module(f"routers.{module}").router)
+        entry["routers"].append(module)
+        entry["import_ms"] = round(entry["import_ms"] + (time.perf_counter() - start) * 1000, 1)
+        entry["rss_mb"] = round(entry["rss_mb"] + rss_mb() - rss_before, 1)
+
+    for feature, entry in feature_report.items():
+        print(f"[features] {feature}: {len(entry['routers'])} routers, {entry['import_ms']:.0f} ms, +{entry['rss_mb']:.0f} MB RSS")
+
+
+def disabled_features() -> List[str]:
+    return [f for f in KNOWN_FEATURES if f not in ENABLED_FEATURES]
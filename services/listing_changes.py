@@ -0,0 +1,60 @@
+import os
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models import Car, ListingTombstone
+from services.stats import read_counter
+
+# --- Config ---
+# updated_at / deleted_at are set before commit, so each poll re-reads this window to catch late
+# commits (re-applying a row or a delete is idempotent)
+LISTING_CHANGES_OVERLAP = timedelta(seconds=float(os.getenv("LISTING_CHANGES_OVERLAP_SECONDS", "60")))
+LISTING_TOMBSTONE_RETENTION = timedelta(days=1)  # pruned by the cars delete trigger (migration 0006)
+LISTING_CHANGES_LOAD_CHUNK = int(os.getenv("LISTING_CHANGES_LOAD_CHUNK", "20000"))
+
+
+class ListingChangeFeed:
+    """
+    Incremental view of `cars` for process-local listing indexes (price estimator, similar listings):
+    a full load, then only rows whose updated_at moved and ids tombstoned (trigger on cars, kept
+    for a day) since the last poll.
+    """
+
+    def __init__(self, columns: Sequence):
+        self.columns = list(columns)
+        self.since: Optional[datetime] = None
+        self.loaded_at = 0.0    # time.monotonic() of the last full load
+        self.counter_drift = 0  # rows the stats counter was missing at load time (raw SQL inserts before a reconcile)
+
+    def load_all(self, db: Session) -> List:
+        # Watermark before the rows: anything changed while loading is read again by the next poll
+        self.since = db.query(func.max(Car.updated_at)).scalar() or datetime(1970, 1, 1)
+        self.loaded_at = time.monotonic()
+        rows = db.query(*self.columns).select_from(Car).yield_per(LISTING_CHANGES_LOAD_CHUNK).all()
+        self.counter_drift = max(0, len(rows) - read_counter(db, "cars").row_count)
+        return rows
+
+    def poll(self, db: Session) -> Tuple[List, List[int]]:
+        """(rows updated or inserted, ids deleted) since the previous poll; apply the rows first."""
+        since = self.since - LISTING_CHANGES_OVERLAP
+        rows = db.query(*self.columns, Car.updated_at.label("changed_at")).select_from(Car).filter(
+            Car.updated_at > since
+        ).order_by(Car.updated_at).all()
+        deleted = db.query(ListingTombstone.car_id, ListingTombstone.deleted_at).filter(ListingTombstone.deleted_at > since).all()
+        newest = [rows[-1].changed_at] if rows else []
+        newest += [max(deleted_at for _, deleted_at in deleted)] if deleted else []
+        self.since = max([self.since] + newest)
+        return rows, [car_id for car_id, _ in deleted]
+
+    def out_of_sync(self, db: Session, indexed: int) -> bool:
+        """
+        Call after applying `poll`. Rows that committed after the poll only make the live "cars"
+        stats counter larger, so an index holding more listings than it has missed deletes
+        (e.g. a poll gap longer than the tombstone retention) and needs a full load.
+        """
+        return indexed > read_counter(db, "cars").row_count + self.counter_drift
+
+    def age(self) -> float:
+        return time.monotonic() - self.loaded_at
@@ -0,0 +1,62 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+from sqlalchemy.orm import Session
+from models import Car, Model, Brand
+
+# --- Config ---
+# Invalidation is per-process, so the TTL bounds staleness on other workers
+LISTING_CONTEXT_TTL = int(os.getenv("LISTING_CONTEXT_TTL", "300"))  # seconds
+LISTING_CONTEXT_MAX_ENTRIES = int(os.getenv("LISTING_CONTEXT_MAX_ENTRIES", "5000"))
+
+# car_id -> (expires_at, prompt block)
+_cache: "OrderedDict[int, Tuple[float, str]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _build_listing_context(db: Session, car_id: int) -> Optional[str]:
+    """Builds the listing prompt block with a single joined query."""
+    row = db.query(
+        Car.year, Car.price, Car.mileage, Car.fuel_type, Car.transmission, Car.description,
+        Brand.name.label("brand_name"), Model.name.label("model_name"),
+    ).join(Model, Car.model_id == Model.id).join(Brand, Model.brand_id == Brand.id).filter(Car.id == car_id).first()
+    if not row:
+        return None
+
+    return (
+        f"\n\nCONTEXT - CURRENT LISTING:\n"
+        f"- Car: {row.year} {row.brand_name} {row.model_name}\n"
+        f"- Price: ${row.price}\n"
+        f"- Mileage: {row.mileage}km\n"
+        f"- Fuel: {row.fuel_type}, Trans: {row.transmission}\n"
+        f"- Description: {row.description}"
+    )
+
+
+def get_listing_context(db: Session, car_id: int) -> Optional[str]:
+    """Returns the cached prompt block for a listing, building it on a miss."""
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(car_id)
+        if entry and entry[0] > now:
+            _cache.move_to_end(car_id)
+            return entry[1]
+
+    context = _build_listing_context(db, car_id)
+    if context is None:
+        return None
+
+    with _lock:
+        _cache[car_id] = (now + LISTING_CONTEXT_TTL, context)
+        _cache.move_to_end(car_id)
+        while len(_cache) > LISTING_CONTEXT_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return context
+
+
+def invalidate_listing_context(car_id: int) -> None:
+    """Drops a listing from the cache (call on listing update/delete)."""
+    with _lock:
+        _cache.pop(car_id, None)
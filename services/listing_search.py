@@ -0,0 +1,384 @@
+import os
+import sys
+import threading
+import time
+import numpy as np
+import faiss
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from sqlalchemy.orm import Session, joinedload
+from models import Car, Model, CarCategoryMap, CarFeature
+from services.listing_changes import ListingChangeFeed
+from services.query_batching import query_embeddings
+from services.vector_index import IndexConfig, index_config_from_env, build_index, supports_remove, search_params
+
+# --- Config ---
+BASE_DIR = Path(__file__).resolve().parent
+LISTING_SEARCH_ENABLED = os.getenv("LISTING_SEARCH_ENABLED", "true").lower() in ("1", "true", "yes")
+LISTING_INDEX_DIR = Path(os.getenv("LISTING_INDEX_DIR", str(BASE_DIR / "indexes" / "listings")))
+LISTING_INDEX_SAVE_DELAY = float(os.getenv("LISTING_INDEX_SAVE_DELAY", "30"))  # seconds
+# Listings written by any process (e.g. API pods without the "ai" feature) are picked up by polling
+LISTING_INDEX_SYNC_SECONDS = float(os.getenv("LISTING_INDEX_SYNC_SECONDS", "30"))
+LISTING_INDEX_RECONCILE_SECONDS = float(os.getenv("LISTING_INDEX_RECONCILE_SECONDS", "3600"))  # id diff against cars
+LISTING_INDEX_CONFIG = index_config_from_env("LISTING_INDEX_")  # LISTING_INDEX_TYPE=flat|ivfpq|hnsw, ...
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2
+
+def embed_texts(texts: Sequence[str]) -> np.ndarray:
+    # Imported lazily so the model only loads in processes that index or search listings
+    from services.embeddings import embed_texts as encode
+    return encode(texts)
+
+
+def listing_document(car: Car) -> str:
+    """Text embedded for a listing: brand, model, description, categories and features."""
+    categories = ", ".join(m.category.name for m in car.categories if m.category)
+    features = ", ".join(f.feature.name for f in car.features if f.feature)
+    return (
+        f"{car.year} {car.model.brand.name} {car.model.name}, {car.fuel_type}, {car.transmission}. "
+        f"{car.description or ''} "
+        f"Categories: {categories}. Features: {features}."
+    )
+
+
+class ListingIndex:
+    """
+    Vector index over used car listings (inner product on normalized vectors)
+    with price/year/fuel metadata kept in parallel NumPy arrays for hybrid filtering.
+
+    FAISS labels are internal slot numbers, not car ids, so a replaced listing never
+    collides with its previous vector in indexes that can't delete (HNSW).
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, config: Optional[IndexConfig] = None):
+        self.dim = dim
+        self.config = config or LISTING_INDEX_CONFIG
+        self.index: Optional[faiss.Index] = None  # created on first add (IVF-PQ trains on it)
+        self.slots = np.empty(0, dtype="int64")
+        self.ids = np.empty(0, dtype="int64")
+        self.price = np.empty(0, dtype="float64")
+        self.year = np.empty(0, dtype="int32")
+        self.fuel = np.empty(0, dtype="int16")
+        self.alive = np.empty(0, dtype=bool)
+        self.fuel_codes: Dict[str, int] = {}
+        self.next_slot = 0
+        self._pos: Dict[int, int] = {}        # car_id -> row
+        self._slot_car: Dict[int, int] = {}   # live slot -> car_id
+        self._stale_vectors = False           # dead vectors still inside a non-removable index
+        self.synced_until: Optional[datetime] = None  # ListingChangeFeed watermark the index is current to
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._pos)
+
+    def car_ids(self) -> Set[int]:
+        with self.lock:
+            return set(self._pos)
+
+    def _fuel_code(self, fuel_type: Optional[str]) -> int:
+        key = (fuel_type or "").strip().lower()
+        if key not in self.fuel_codes:
+            self.fuel_codes[key] = len(self.fuel_codes)
+        return self.fuel_codes[key]
+
+    def add(self, ids: Sequence[int], vectors: np.ndarray, prices: Sequence[float], years: Sequence[int], fuels: Sequence[Optional[str]]):
+        """Inserts (or replaces) listings."""
+        with self.lock:
+            self.remove(ids)
+            vectors = np.ascontiguousarray(vectors, dtype="float32")
+            if self.index is None:
+                self.index = build_index(self.dim, self.config, train_vectors=vectors)
+            ids_arr = np.asarray(ids, dtype="int64")
+            slots = np.arange(self.next_slot, self.next_slot + len(ids_arr), dtype="int64")
+            self.next_slot += len(ids_arr)
+            self.index.add_with_ids(vectors, slots)
+
+            start = len(self.ids)
+            self.slots = np.concatenate([self.slots, slots])
+            self.ids = np.concatenate([self.ids, ids_arr])
+            self.price = np.concatenate([self.price, np.asarray(prices, dtype="float64")])
+            self.year = np.concatenate([self.year, np.asarray(years, dtype="int32")])
+            self.fuel = np.concatenate([self.fuel, np.asarray([self._fuel_code(f) for f in fuels], dtype="int16")])
+            self.alive = np.concatenate([self.alive, np.ones(len(ids_arr), dtype=bool)])
+            for offset, (car_id, slot) in enumerate(zip(ids_arr.tolist(), slots.tolist())):
+                self._pos[car_id] = start + offset
+                self._slot_car[slot] = car_id
+
+    def remove(self, ids: Sequence[int]):
+        with self.lock:
+            rows = [self._pos.pop(i) for i in ids if i in self._pos]
+            if not rows:
+                return
+            dead_slots = self.slots[rows]
+            if supports_remove(self.index):
+                self.index.remove_ids(dead_slots)
+            else:
+                self._stale_vectors = True
+            for slot in dead_slots.tolist():
+                self._slot_car.pop(slot, None)
+            # Metadata rows are tombstoned and compacted once they make up a quarter of the arrays
+            self.alive[rows] = False
+            if (~self.alive).sum() * 4 > len(self.alive):
+                self._compact()
+
+    def _compact(self):
+        keep = self.alive
+        self.slots, self.ids = self.slots[keep], self.ids[keep]
+        self.price, self.year, self.fuel = self.price[keep], self.year[keep], self.fuel[keep]
+        self.alive = np.ones(len(self.ids), dtype=bool)
+        self._pos = {car_id: pos for pos, car_id in enumerate(self.ids.tolist())}
+
+    def _filter_mask(self, min_price=None, max_price=None, min_year=None, max_year=None, fuel_type=None) -> Optional[np.ndarray]:
+        mask = self.alive.copy() if self._stale_vectors else None
+        def both(m, cond):
+            return (cond & self.alive) if m is None else (m & cond)
+        if min_price is not None:
+            mask = both(mask, self.price >= min_price)
+        if max_price is not None:
+            mask = both(mask, self.price <= max_price)
+        if min_year is not None:
+            mask = both(mask, self.year >= min_year)
+        if max_year is not None:
+            mask = both(mask, self.year <= max_year)
+        if fuel_type:
+            code = self.fuel_codes.get(fuel_type.strip().lower())
+            mask = both(mask, self.fuel == (code if code is not None else -1))
+        return mask
+
+    def search(self, query_vector: np.ndarray, k: int = 20, **filters) -> List[Tuple[int, float]]:
+        """Returns [(car_id, score)] best first, restricted to listings matching the filters."""
+        with self.lock:
+            if not len(self._pos):
+                return []
+            sel = None
+            mask = self._filter_mask(**filters)
+            if mask is not None:
+                allowed = self.slots[mask]
+                if not len(allowed):
+                    return []
+                sel = faiss.IDSelectorBatch(allowed)
+            q = np.ascontiguousarray(query_vector, dtype="float32").reshape(1, -1)
+            params = search_params(self.index, self.config, sel)
+            scores, slots = self.index.search(q, min(k, len(self._pos)), params=params)
+            return [(self._slot_car[int(slot)], float(score)) for score, slot in zip(scores[0], slots[0]) if int(slot) in self._slot_car]
+
+    # --- Persistence ---
+    def save(self, directory: Path = LISTING_INDEX_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            if self.index is None:
+                return
+            self._compact()
+            faiss.write_index(self.index, str(directory / "listings.faiss.tmp"))
+            np.savez(
+                directory / "listings_meta.tmp.npz",
+                slots=self.slots, ids=self.ids, price=self.price, year=self.year, fuel=self.fuel,
+                next_slot=np.asarray(self.next_slot), stale=np.asarray(self._stale_vectors),
+                synced_until=np.asarray(self.synced_until.isoformat() if self.synced_until else ""),
+                fuel_names=np.asarray(sorted(self.fuel_codes, key=self.fuel_codes.get), dtype=object),
+            )
+        os.replace(directory / "listings.faiss.tmp", directory / "listings.faiss")
+        os.replace(directory / "listings_meta.tmp.npz", directory / "listings_meta.npz")
+
+    @classmethod
+    def load(cls, directory: Path = LISTING_INDEX_DIR) -> "ListingIndex":
+        self = cls()
+        index_path, meta_path = directory / "listings.faiss", directory / "listings_meta.npz"
+        if not index_path.exists() or not meta_path.exists():
+            return self
+        self.index = faiss.read_index(str(index_path))
+        meta = np.load(meta_path, allow_pickle=True)
+        self.slots, self.ids = meta["slots"], meta["ids"]
+        self.price, self.year, self.fuel = meta["price"], meta["year"], meta["fuel"]
+        self.next_slot, self._stale_vectors = int(meta["next_slot"]), bool(meta["stale"])
+        self.alive = np.ones(len(self.ids), dtype=bool)
+        self.fuel_codes = {name: code for code, name in enumerate(meta["fuel_names"].tolist())}
+        self._pos = {car_id: pos for pos, car_id in enumerate(self.ids.tolist())}
+        self._slot_car = dict(zip(self.slots.tolist(), self.ids.tolist()))
+        self.dim = self.index.d
+        # Indexes saved before the watermark was stored resume from the file's age
+        synced = str(meta["synced_until"]) if "synced_until" in meta.files else ""
+        self.synced_until = datetime.fromisoformat(synced) if synced else datetime.utcfromtimestamp(index_path.stat().st_mtime)
+        return self
+
+
+# --- Process-wide index ---
+_index: Optional[ListingIndex] = None
+_index_lock = threading.Lock()
+_save_timer: Optional[threading.Timer] = None
+
+
+def get_listing_index() -> ListingIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ListingIndex.load()
+    return _index
+
+
+def _schedule_save():
+    """Debounces disk writes so a burst of listing changes costs one save."""
+    global _save_timer
+    with _index_lock:
+        if _save_timer is not None:
+            return
+        def run():
+            global _save_timer
+            with _index_lock:
+                _save_timer = None
+            try:
+                get_listing_index().save()
+            except Exception as e:
+                print(f"[listing_search] Save failed: {e}")
+        _save_timer = threading.Timer(LISTING_INDEX_SAVE_DELAY, run)
+        _save_timer.daemon = True
+        _save_timer.start()
+
+
+def index_listings(cars: Sequence[Car]):
+    """Embeds and upserts listings (cars must have model/brand/categories/features loaded)."""
+    if not LISTING_SEARCH_ENABLED or not cars:
+        return
+    try:
+        vectors = embed_texts([listing_document(c) for c in cars])
+        get_listing_index().add(
+            [c.id for c in cars], vectors,
+            [float(c.price) for c in cars], [c.year for c in cars], [c.fuel_type for c in cars],
+        )
+        _schedule_save()
+    except Exception as e:
+        # Search indexing must never fail the listing write itself.
+        print(f"[listing_search] Indexing failed: {e}")
+
+
+def index_listing_ids(car_ids: Sequence[int], batch_size: int = 512):
+    """Background indexing for bulk writes: loads and embeds the listings in batches."""
+    if not LISTING_SEARCH_ENABLED or not car_ids:
+        return
+    from database import SessionLocal
+    with SessionLocal() as db:
+        for start in range(0, len(car_ids), batch_size):
+            cars = db.query(Car).options(
+                joinedload(Car.model).joinedload(Model.brand),
+                joinedload(Car.categories).joinedload(CarCategoryMap.category),
+                joinedload(Car.features).joinedload(CarFeature.feature),
+            ).filter(Car.id.in_(car_ids[start:start + batch_size])).all()
+            index_listings(cars)
+            db.expunge_all()
+
+
+def remove_listings(car_ids: Sequence[int]):
+    if not LISTING_SEARCH_ENABLED:
+        return
+    try:
+        get_listing_index().remove(car_ids)
+        _schedule_save()
+    except Exception as e:
+        print(f"[listing_search] Removal failed: {e}")
+
+
+def search_listings(query: str, k: int = 20, **filters) -> List[Tuple[int, float]]:
+    if not LISTING_SEARCH_ENABLED:
+        return []
+    return get_listing_index().search(query_embeddings.encode_sync(query), k=k, **filters)
+
+
+def rebuild_listing_index(db: Session, batch_size: int = 512) -> int:
+    """Rebuilds the index from the database and writes it to disk."""
+    global _index
+    fresh = ListingIndex()
+    query = db.query(Car).options(
+        joinedload(Car.model).joinedload(Model.brand),
+        joinedload(Car.categories).joinedload(CarCategoryMap.category),
+        joinedload(Car.features).joinedload(CarFeature.feature),
+    ).order_by(Car.id)
+    last_id, total = 0, 0
+    # The first batch doubles as the IVF-PQ training sample
+    limit = max(batch_size, fresh.config.min_train_size)
+    while True:
+        cars = query.filter(Car.id > last_id).limit(limit).all()
+        limit = batch_size
+        if not cars:
+            break
+        fresh.add(
+            [c.id for c in cars], embed_texts([listing_document(c) for c in cars]),
+            [float(c.price) for c in cars], [c.year for c in cars], [c.fuel_type for c in cars],
+        )
+        last_id, total = cars[-1].id, total + len(cars)
+        db.expunge_all()
+    fresh.save()
+    with _index_lock:
+        _index = fresh
+    return total
+
+
+# --- Catch-up with listing writes from other processes ---
+def sync_listing_index(db: Session, feed: ListingChangeFeed) -> Tuple[int, int]:
+    """
+    Applies listings changed (updated_at) or tombstoned since the index's watermark, and every
+    LISTING_INDEX_RECONCILE_SECONDS (first call included) diffs the indexed ids against `cars` for
+    anything older than the tombstones. An empty index is rebuilt. Returns (indexed, removed).
+    """
+    index = get_listing_index()
+    if feed.since is None:
+        feed.since = index.synced_until
+    changed: List[int] = []
+    removed: List[int] = []
+    if feed.since is not None:
+        rows, removed = feed.poll(db)
+        changed = [r.id for r in rows]
+    if feed.age() >= LISTING_INDEX_RECONCILE_SECONDS:
+        indexed = index.car_ids()  # before reading cars: listings indexed meanwhile are not taken for deleted
+        live = {r.id for r in feed.load_all(db)}
+        if not indexed and live:
+            total = rebuild_listing_index(db)
+            get_listing_index().synced_until = feed.since
+            _schedule_save()
+            return total, 0
+        changed = sorted(set(changed) | (live - indexed))
+        removed = sorted(set(removed) | (indexed - live))
+    if changed:
+        index_listing_ids(changed)
+    if removed:
+        remove_listings(removed)
+    index.synced_until = feed.since
+    if changed or removed:
+        _schedule_save()
+    return len(changed), len(removed)
+
+
+def _sync_loop():
+    from database import SessionLocal
+    feed = ListingChangeFeed([Car.id])
+    while True:
+        try:
+            with SessionLocal() as db:
+                indexed, removed = sync_listing_index(db, feed)
+            if indexed or removed:
+                print(f"[listing_search] Synced {indexed} changed and {removed} deleted listings")
+        except Exception as e:
+            print(f"[listing_search] Sync failed: {e}")
+        time.sleep(LISTING_INDEX_SYNC_SECONDS)
+
+
+_sync_thread: Optional[threading.Thread] = None
+
+
+def start_index_sync() -> None:
+    """Starts the catch-up thread once per process; called at startup by processes serving "ai"."""
+    global _sync_thread
+    if not LISTING_SEARCH_ENABLED or _sync_thread is not None:
+        return
+    _sync_thread = threading.Thread(target=_sync_loop, name="listing-index-sync", daemon=True)
+    _sync_thread.start()
+
+
+if __name__ == "__main__":
+    # python -m services.listing_search rebuild
+    if sys.argv[1:] == ["rebuild"]:
+        from database import SessionLocal
+        with SessionLocal() as session:
+            print(f"Indexed {rebuild_listing_index(session)} listings into {LISTING_INDEX_DIR}")
+    else:
+        print("usage: python -m services.listing_search rebuild")
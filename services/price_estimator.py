@@ -0,0 +1,319 @@
+"""
+Fair-price estimates for used listings: k nearest comparable listings of the same model, found
+with vectorized distances over an in-memory NumPy pool per model (year, mileage, horsepower,
+fuel type, transmission). Pools follow `cars` incrementally through ListingChangeFeed.
+
+    python benchmarks/price_estimate_bench.py --listings 1000000
+"""
+import os
+import threading
+import time
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session
+from models import Car
+from services.listing_changes import ListingChangeFeed
+
+# --- Config ---
+ESTIMATE_NEIGHBOURS = int(os.getenv("ESTIMATE_NEIGHBOURS", "15"))
+ESTIMATE_MIN_COMPARABLES = int(os.getenv("ESTIMATE_MIN_COMPARABLES", "3"))
+ESTIMATE_REFRESH_SECONDS = float(os.getenv("ESTIMATE_REFRESH_SECONDS", "30"))
+ESTIMATE_FULL_REFRESH_SECONDS = float(os.getenv("ESTIMATE_FULL_REFRESH_SECONDS", "3600"))
+ESTIMATE_RANGE = (20, 80)  # weighted percentiles of the neighbours' prices returned as low/high
+
+# One unit of distance ~ 2 model years ~ 40% more mileage ~ 30 hp; another fuel type / gearbox adds 1 / 0.5
+SCALES = np.array([2.0, 0.35, 30.0], dtype=np.float32)  # year, log1p(mileage), horsepower
+FUEL_PENALTY = 1.0
+TRANSMISSION_PENALTY = 0.5
+
+COLUMNS = [Car.id, Car.model_id, Car.year, Car.mileage, Car.horsepower, Car.fuel_type, Car.transmission, Car.price]
+
+
+@dataclass
+class EstimateQuery:
+    model_id: int
+    year: int
+    mileage: int
+    horsepower: Optional[int] = None
+    fuel_type: Optional[str] = None
+    transmission: Optional[str] = None
+
+
+class ModelPool:
+    """Listings of one model as dense arrays (swap-remove on delete, capacity doubling on insert)."""
+
+    def __init__(self, capacity: int = 16):
+        self.size = 0
+        self.ids = np.empty(capacity, np.int64)
+        self.numeric = np.empty((capacity, 3), np.float32)   # scaled year, log1p(mileage), horsepower
+        self.codes = np.empty((capacity, 2), np.int16)       # fuel type, transmission
+        self.prices = np.empty(capacity, np.float32)
+        self.rows: Dict[int, int] = {}
+        self._matrix = None  # cached distance matrix, see `matrix`
+
+    @classmethod
+    def from_arrays(cls, ids, numeric, codes, prices) -> "ModelPool":
+        pool = cls(0)
+        pool.size = len(ids)
+        pool.ids, pool.numeric, pool.codes, pool.prices = ids, numeric, codes, prices
+        pool.rows = {int(id): row for row, id in enumerate(ids)}
+        pool._matrix = None
+        pool._fill_horsepower()
+        return pool
+
+    def _fill_horsepower(self) -> None:
+        # Unknown horsepower counts as the model median so the distance stays NaN-free
+        hp = self.numeric[:self.size, 2]
+        missing = np.isnan(hp)
+        if missing.any():
+            hp[missing] = np.nanmedian(hp) if not missing.all() else 0.0
+
+    def _grow(self) -> None:
+        capacity = max(16, 2 * len(self.ids))
+        for name in ("ids", "numeric", "codes", "prices"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def upsert(self, car_id: int, numeric: np.ndarray, codes, price: float) -> None:
+        row = self.rows.get(car_id)
+        if row is None:
+            if self.size == len(self.ids):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.rows[car_id] = row
+            self.ids[row] = car_id
+        self.numeric[row] = numeric
+        if np.isnan(numeric[2]):
+            self.numeric[row, 2] = np.nanmedian(self.numeric[:self.size, 2]) if self.size > 1 else 0.0
+        self.codes[row] = codes
+        self.prices[row] = price
+        self._matrix = None
+
+    def remove(self, car_id: int) -> None:
+        row = self.rows.pop(car_id, None)
+        if row is None:
+            return
+        last = self.size - 1
+        if row != last:
+            moved = int(self.ids[last])
+            for array in (self.ids, self.numeric, self.codes, self.prices):
+                array[row] = array[last]
+            self.rows[moved] = row
+        self.size = last
+        self._matrix = None
+
+    def matrix(self, fuels: int, gearboxes: int) -> Tuple[np.ndarray, float, np.ndarray, np.ndarray]:
+        """
+        Listings as rows of [numeric - center, one-hot fuel type and gearbox scaled so a mismatch adds
+        its penalty to the squared distance] and their squared norms: every query distance is then one
+        matrix product. Centering keeps float32 exact enough for x^2 - 2xq + q^2. Rebuilt after changes.
+        """
+        if self._matrix is None or self._matrix[0] != (fuels, gearboxes):
+            n = self.size
+            numeric, codes = self.numeric[:n], self.codes[:n]
+            center = numeric.mean(axis=0)
+            x = np.zeros((n, 3 + fuels + gearboxes), np.float32)
+            x[:, :3] = numeric - center
+            for column, offset, penalty in ((0, 3, FUEL_PENALTY), (1, 3 + fuels, TRANSMISSION_PENALTY)):
+                known = np.flatnonzero(codes[:, column] >= 0)
+                x[known, offset + codes[known, column]] = np.sqrt(penalty / 2)
+            self._matrix = ((fuels, gearboxes), center, float(np.median(numeric[:, 2])), x, np.einsum("ij,ij->i", x, x))
+        return self._matrix[1:]
+
+
+class PriceEstimator:
+    def __init__(self):
+        self.pools: Dict[int, ModelPool] = {}
+        self.model_of: Dict[int, int] = {}     # car_id -> model_id
+        self.vocab = ({}, {})                   # fuel type / transmission -> code
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.model_of)
+
+    # --- Encoding ---
+    def _code(self, which: int, value: Optional[str], grow: bool = True) -> int:
+        if not value:
+            return -1
+        vocab = self.vocab[which]
+        key = value.strip().lower()
+        if key not in vocab:
+            if not grow:
+                return -1
+            vocab[key] = len(vocab)
+        return vocab[key]
+
+    @staticmethod
+    def _scaled(year, mileage, horsepower) -> np.ndarray:
+        return np.array([year, np.log1p(mileage), np.nan if horsepower is None else horsepower], np.float32) / SCALES
+
+    # --- Maintenance ---
+    def load(self, rows: Sequence) -> None:
+        """Full build: one vectorized pass, then one argsort to cut the arrays into per-model pools."""
+        if not rows:
+            return
+        n = len(rows)
+        ids = np.fromiter((r.id for r in rows), np.int64, n)
+        models = np.fromiter((r.model_id for r in rows), np.int64, n)
+        numeric = np.empty((n, 3), np.float32)
+        numeric[:, 0] = np.fromiter((r.year for r in rows), np.float32, n)
+        numeric[:, 1] = np.log1p(np.fromiter((r.mileage for r in rows), np.float32, n))
+        numeric[:, 2] = np.fromiter((np.nan if r.horsepower is None else r.horsepower for r in rows), np.float32, n)
+        numeric /= SCALES
+        codes = np.empty((n, 2), np.int16)
+        codes[:, 0] = np.fromiter((self._code(0, r.fuel_type) for r in rows), np.int16, n)
+        codes[:, 1] = np.fromiter((self._code(1, r.transmission) for r in rows), np.int16, n)
+        prices = np.fromiter((r.price for r in rows), np.float32, n)
+
+        order = np.argsort(models, kind="stable")
+        bounds = np.flatnonzero(np.diff(models[order])) + 1
+        for chunk in np.split(order, bounds):
+            model_id = int(models[chunk[0]])
+            self.pools[model_id] = ModelPool.from_arrays(ids[chunk], numeric[chunk], codes[chunk], prices[chunk])
+        self.model_of = dict(zip(ids.tolist(), models.tolist()))
+
+    def upsert(self, rows: Iterable) -> None:
+        with self.lock:
+            for r in rows:
+                previous = self.model_of.get(r.id)
+                if previous is not None and previous != r.model_id:
+                    self.pools[previous].remove(r.id)
+                pool = self.pools.setdefault(r.model_id, ModelPool())
+                codes = (self._code(0, r.fuel_type), self._code(1, r.transmission))
+                pool.upsert(r.id, self._scaled(r.year, r.mileage, r.horsepower), codes, float(r.price))
+                self.model_of[r.id] = r.model_id
+
+    def remove(self, car_ids: Iterable[int]) -> None:
+        with self.lock:
+            for car_id in car_ids:
+                model_id = self.model_of.pop(car_id, None)
+                if model_id is not None:
+                    self.pools[model_id].remove(car_id)
+
+    # --- Estimation ---
+    def estimate(self, queries: Sequence[EstimateQuery], k: int = ESTIMATE_NEIGHBOURS) -> List[dict]:
+        """One result per query, in order; queries of the same model share one distance computation."""
+        results: List[Optional[dict]] = [None] * len(queries)
+        by_model: Dict[int, List[int]] = {}
+        for i, q in enumerate(queries):
+            by_model.setdefault(q.model_id, []).append(i)
+        with self.lock:
+            for model_id, positions in by_model.items():
+                pool = self.pools.get(model_id)
+                if pool is None or pool.size < ESTIMATE_MIN_COMPARABLES:
+                    for i in positions:
+                        results[i] = {"estimate": None, "low": None, "high": None, "comparables": pool.size if pool else 0}
+                    continue
+                for i, result in zip(positions, self._estimate_pool(pool, [queries[i] for i in positions], k)):
+                    results[i] = result
+        return results
+
+    def _estimate_pool(self, pool: ModelPool, queries: Sequence[EstimateQuery], k: int) -> List[dict]:
+        n = pool.size
+        fuels, gearboxes = len(self.vocab[0]), len(self.vocab[1])
+        center, hp_median, x, norms = pool.matrix(fuels, gearboxes)
+        q = np.zeros((len(queries), x.shape[1]), np.float32)
+        unknown = np.zeros(len(queries), np.float32)  # penalty every listing pays for a category the query leaves out
+        for i, query in enumerate(queries):
+            numeric = self._scaled(query.year, query.mileage, query.horsepower)
+            if np.isnan(numeric[2]):  # horsepower is optional: assume a typical one for the model
+                numeric[2] = hp_median
+            q[i, :3] = numeric - center
+            for which, offset, penalty, value in ((0, 3, FUEL_PENALTY, query.fuel_type), (1, 3 + fuels, TRANSMISSION_PENALTY, query.transmission)):
+                code = self._code(which, value, grow=False)
+                if code >= 0:
+                    q[i, offset + code] = np.sqrt(penalty / 2)
+                else:
+                    unknown[i] += penalty / 2
+
+        # |x - q|^2 = |x|^2 - 2 x.q + |q|^2, computed in place over the (queries, listings) matrix
+        dist = q @ x.T
+        dist *= -2.0
+        dist += norms
+        dist += (np.einsum("ij,ij->i", q, q) - unknown)[:, None]
+        np.maximum(dist, 0.0, out=dist)
+        prices = pool.prices[:n]
+
+        k = min(k, n)
+        nearest = np.argpartition(dist, k - 1, axis=1)[:, :k] if k < n else np.broadcast_to(np.arange(n), (len(queries), n))
+        near_dist = np.take_along_axis(dist, nearest, axis=1)
+        near_prices = prices[nearest]
+        weights = 1.0 / (1.0 + near_dist)
+
+        # Weighted median as the point estimate, weighted percentiles around it as the range, so
+        # low <= estimate <= high always holds
+        order = np.argsort(near_prices, axis=1)
+        sorted_prices = np.take_along_axis(near_prices, order, axis=1)
+        cumulative = np.cumsum(np.take_along_axis(weights, order, axis=1), axis=1)
+        cumulative /= cumulative[:, -1:]
+        low, estimate, high = (
+            np.take_along_axis(sorted_prices, (cumulative >= p / 100).argmax(axis=1)[:, None], axis=1)[:, 0]
+            for p in (ESTIMATE_RANGE[0], 50, ESTIMATE_RANGE[1])
+        )
+        return [
+            {"estimate": round(float(e), 2), "low": round(float(lo), 2), "high": round(float(hi), 2), "comparables": int(k)}
+            for e, lo, hi in zip(estimate, low, high)
+        ]
+
+
+# --- Process-local estimator, refreshed from the change feed ---
+_estimator: Optional[PriceEstimator] = None
+_feed = ListingChangeFeed(COLUMNS)
+_checked_at = 0.0
+_lock = threading.Lock()
+_rebuilding = False
+
+
+def _load(db: Session, feed: ListingChangeFeed) -> PriceEstimator:
+    start = time.perf_counter()
+    loaded = PriceEstimator()
+    loaded.load(feed.load_all(db))
+    print(f"[price_estimator] Loaded {len(loaded)} listings in {len(loaded.pools)} models ({time.perf_counter() - start:.1f}s)")
+    return loaded
+
+
+def _rebuild() -> None:
+    """Full reload off the request path: requests keep using (and polling into) the current estimator."""
+    global _estimator, _feed, _checked_at, _rebuilding
+    from database import SessionLocal
+    try:
+        feed = ListingChangeFeed(COLUMNS)
+        with SessionLocal() as db:
+            rebuilt = _load(db, feed)
+        with _lock:
+            # Changes since the new feed's watermark are read by the next poll
+            _estimator, _feed, _checked_at = rebuilt, feed, 0.0
+    except Exception as e:
+        print(f"[price_estimator] Reload failed: {e}")
+    finally:
+        _rebuilding = False
+
+
+def get_price_estimator(db: Session) -> PriceEstimator:
+    """
+    Applies listings changed or deleted since the last check at most every ESTIMATE_REFRESH_SECONDS;
+    reloads everything in a background thread after ESTIMATE_FULL_REFRESH_SECONDS or when the feed
+    reports missed deletes. Only the first request of a process waits for a load.
+    """
+    global _estimator, _checked_at, _rebuilding
+    estimator = _estimator
+    if estimator is not None and time.monotonic() - _checked_at < ESTIMATE_REFRESH_SECONDS:
+        return estimator
+    with _lock:
+        if _estimator is None:
+            _estimator, _checked_at = _load(db, _feed), time.monotonic()
+            return _estimator
+        if time.monotonic() - _checked_at < ESTIMATE_REFRESH_SECONDS:
+            return _estimator
+        changed, deleted = _feed.poll(db)
+        _estimator.upsert(changed)
+        _estimator.remove(deleted)
+        if not _rebuilding and (_feed.age() >= ESTIMATE_FULL_REFRESH_SECONDS or _feed.out_of_sync(db, len(_estimator))):
+            _rebuilding = True
+            threading.Thread(target=_rebuild, name="price-estimator-reload", daemon=True).start()
+        _checked_at = time.monotonic()
+        return _estimator
@@ -0,0 +1,121 @@
+import os
+import asyncio
+import threading
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence, Set, Tuple
+
+# --- Config ---
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096"))
+QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "5"))
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "64"))
+
+# Encoding and FAISS search are CPU-bound; they run here, never on the event loop.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-batch")
+
+
+class MicroBatcher:
+    """
+    Collects items submitted within `window_ms` (or until `max_batch` items) on the event
+    loop and resolves them with one call of `batch_fn(items) -> results` in a worker thread.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], Sequence[Any]], window_ms: float = QUERY_BATCH_WINDOW_MS, max_batch: int = QUERY_BATCH_MAX_SIZE):
+        self.batch_fn = batch_fn
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()  # the loop only holds weak references to running tasks
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush(loop)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush, loop)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = loop.create_task(self._run(loop, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, loop: asyncio.AbstractEventLoop, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        try:
+            results = await loop.run_in_executor(_executor, self.batch_fn, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class QueryEmbeddingCache:
+    """LRU cache of query embeddings in front of a micro-batched encoder."""
+
+    def __init__(self, max_entries: int = QUERY_EMBEDDING_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._batcher = MicroBatcher(self._encode_batch)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return " ".join(text.lower().split())
+
+    def _get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return vector
+
+    def _put(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _encode_batch(self, keys: List[str]) -> List[np.ndarray]:
+        from services.embeddings import embed_texts
+        unique = list(dict.fromkeys(keys))  # identical concurrent queries are encoded once
+        vectors = dict(zip(unique, embed_texts(unique)))
+        for key, vector in vectors.items():
+            self._put(key, vector)
+        return [vectors[key] for key in keys]
+
+    async def encode(self, text: str) -> np.ndarray:
+        key = self._key(text)
+        vector = self._get(key)
+        if vector is not None:
+            return vector
+        return await self._batcher.submit(key)
+
+    def encode_sync(self, text: str) -> np.ndarray:
+        """For sync endpoints already running in the threadpool."""
+        key = self._key(text)
+        vector = self._get(key)
+        if vector is None:
+            vector = self._encode_batch([key])[0]
+        return vector
+
+
+query_embeddings = QueryEmbeddingCache()
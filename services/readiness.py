@@ -0,0 +1,35 @@
+import time
+from functools import lru_cache
+from pathlib import Path
+from sqlalchemy.exc import SQLAlchemyError
+from database import engine, schema_revision
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+
+@lru_cache(maxsize=1)
+def head_revision() -> str:
+    """Latest migration shipped with this build (read from migrations/, no database access)."""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    return ScriptDirectory.from_config(Config(str(ALEMBIC_INI))).get_current_head()
+
+
+def check_readiness() -> dict:
+    """
+    The only database work done at startup and by GET /ready: one query reading the
+    Alembic revision. Ready means reachable and migrated to this build's head.
+    """
+    start = time.perf_counter()
+    try:
+        current = schema_revision(engine)
+    except SQLAlchemyError as e:
+        return {"ready": False, "database": "unreachable", "error": e.__class__.__name__}
+    head = head_revision()
+    return {
+        "ready": current == head,
+        "database": "ok",
+        "revision": current,
+        "head": head,
+        "ms": round((time.perf_counter() - start) * 1000, 1),
+    }
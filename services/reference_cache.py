@@ -0,0 +1,140 @@
+import os
+import time
+import hashlib
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+from fastapi import Request, Response
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from models import Brand, Model, Category, Feature, CatalogVersion
+from schemas import BrandOut, ModelOut, CategoryOut, FeatureOut
+from services.response_cache import invalidate_tags
+
+# --- Config ---
+# How often a worker re-reads the version row; admin mutations in this worker take effect immediately
+REFERENCE_CACHE_CHECK_SECONDS = float(os.getenv("REFERENCE_CACHE_CHECK_SECONDS", "5"))
+
+
+class ReferenceCatalog:
+    """
+    Immutable snapshot of brands, models, categories and features at one catalog version.
+    A new snapshot replaces the old one whole, so readers never need a lock.
+    """
+
+    def __init__(self, version: int, brands, models, categories, features):
+        self.version = version
+        self.brands: Dict[int, BrandOut] = {}
+        self.brand_wmi: Dict[int, Optional[str]] = {}
+        for b in brands:
+            self.brands[b.id] = BrandOut(id=b.id, name=b.name, country=b.country)
+            self.brand_wmi[b.id] = b.wmi
+        self.models: Dict[int, ModelOut] = {}
+        self.model_vds: Dict[int, Optional[str]] = {}
+        self.models_by_brand: Dict[int, List[ModelOut]] = {}
+        for m in models:
+            model = ModelOut(id=m.id, name=m.name, brand_id=m.brand_id, brand=self.brands[m.brand_id])
+            self.models[m.id] = model
+            self.model_vds[m.id] = m.vds
+            self.models_by_brand.setdefault(m.brand_id, []).append(model)
+        self.categories: Dict[int, CategoryOut] = {c.id: CategoryOut(id=c.id, name=c.name) for c in categories}
+        self.features: Dict[int, FeatureOut] = {f.id: FeatureOut(id=f.id, name=f.name) for f in features}
+
+        # Case-insensitive name lookups (same semantics as the former `ilike` queries)
+        self.brand_ids_by_name = {b.name.lower(): b.id for b in self.brands.values()}
+        self.model_ids_by_name: Dict[Tuple[int, str], int] = {(m.brand_id, m.name.lower()): m.id for m in self.models.values()}
+        self.category_ids_by_name = {c.name.lower(): c.id for c in self.categories.values()}
+        self.feature_ids_by_name = {f.name.lower(): f.id for f in self.features.values()}
+
+    @classmethod
+    def load(cls, db: Session, version: int) -> "ReferenceCatalog":
+        return cls(
+            version,
+            db.query(Brand.id, Brand.name, Brand.country, Brand.wmi).order_by(Brand.id).all(),
+            db.query(Model.id, Model.name, Model.brand_id, Model.vds).order_by(Model.id).all(),
+            db.query(Category.id, Category.name).order_by(Category.id).all(),
+            db.query(Feature.id, Feature.name).order_by(Feature.id).all(),
+        )
+
+    def find_brand(self, name: str) -> Optional[BrandOut]:
+        brand_id = self.brand_ids_by_name.get(name.lower())
+        return self.brands.get(brand_id) if brand_id is not None else None
+
+    def find_model(self, brand_id: int, name: str) -> Optional[ModelOut]:
+        model_id = self.model_ids_by_name.get((brand_id, name.lower()))
+        return self.models.get(model_id) if model_id is not None else None
+
+
+def paginate(items: Sequence, order_by: Optional[str], order_dir: str, offset: int, limit: int) -> list:
+    """Sort by a field of the output schema (unknown fields keep id order), then slice."""
+    items = list(items)
+    if items and order_by and order_by in type(items[0]).model_fields:
+        present = [i for i in items if getattr(i, order_by) is not None]
+        missing = [i for i in items if getattr(i, order_by) is None]
+        present.sort(key=lambda i: getattr(i, order_by), reverse=order_dir == "desc")
+        # NULLs sort last ascending and first descending, as in Postgres
+        items = present + missing if order_dir == "asc" else missing + present
+    return items[offset:offset + limit]
+
+
+# --- Process-local cache ---
+_catalog: Optional[ReferenceCatalog] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _read_version(db: Session) -> int:
+    return db.query(CatalogVersion.version).filter(CatalogVersion.id == 1).scalar() or 0
+
+
+def get_reference_catalog(db: Session) -> ReferenceCatalog:
+    """Current snapshot; re-reads the version row at most every REFERENCE_CACHE_CHECK_SECONDS."""
+    global _catalog, _checked_at
+    catalog = _catalog
+    if catalog is not None and time.monotonic() - _checked_at < REFERENCE_CACHE_CHECK_SECONDS:
+        return catalog
+    with _lock:
+        if _catalog is not None and time.monotonic() - _checked_at < REFERENCE_CACHE_CHECK_SECONDS:
+            return _catalog  # another thread refreshed while we waited
+        # Version first, then data: the data is never older than the version it is labelled with
+        version = _read_version(db)
+        if _catalog is None or _catalog.version != version:
+            _catalog = ReferenceCatalog.load(db, version)
+        _checked_at = time.monotonic()
+        return _catalog
+
+
+def bump_catalog_version(db: Session) -> None:
+    """Call in the same transaction as a brand/model/category/feature mutation, before commit."""
+    db.execute(
+        pg_insert(CatalogVersion)
+        .values(id=1, version=1)
+        .on_conflict_do_update(index_elements=[CatalogVersion.id], set_={"version": CatalogVersion.version + 1})
+    )
+
+
+def invalidate_reference_cache() -> None:
+    """Call after the commit so this worker re-checks the version on its next lookup."""
+    global _checked_at
+    with _lock:
+        _checked_at = 0.0
+    invalidate_tags("catalog")
+
+
+# --- ETag / 304 for endpoints served from the snapshot ---
+def catalog_etag(request: Request, catalog: ReferenceCatalog) -> str:
+    url = f"{request.url.path}?{request.url.query}"
+    return f'"catalog-{catalog.version}-{hashlib.sha1(url.encode()).hexdigest()[:16]}"'
+
+
+def not_modified(request: Request, response: Response, catalog: ReferenceCatalog) -> Optional[Response]:
+    """
+    Sets ETag and Cache-Control on `response`; returns a 304 response when the client's
+    If-None-Match already matches, otherwise None.
+    """
+    etag = catalog_etag(request, catalog)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"  # always revalidate; revalidation is answered from memory
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    return None
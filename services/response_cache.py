@@ -0,0 +1,264 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+# --- Config ---
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+RESPONSE_CACHE_MAX_BODY_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BODY_KB", "512")) * 1024   # larger bodies are not cached
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL")  # optional shared tier + cross-worker invalidation
+RESPONSE_CACHE_PREFIX = "carplace:rc:"
+
+
+@dataclass
+class CacheRule:
+    pattern: re.Pattern
+    ttl: float                                  # server-side lifetime (tags normally invalidate first)
+    max_age: int                                # Cache-Control max-age for clients
+    tags: Callable[[re.Match], List[str]]
+
+
+def rule(pattern: str, ttl: float, max_age: int, tags: Callable[[re.Match], List[str]]) -> CacheRule:
+    return CacheRule(re.compile(pattern), ttl, max_age, tags)
+
+
+# Public, highly repeated GET routes and the tags their write endpoints invalidate.
+# Without the shared backend other workers only see an invalidation once the TTL expires.
+# /brands and /models are not listed: they answer conditional GETs themselves from the in-memory
+# reference catalog (services/reference_cache.py). Any response that sets its own ETag is passed through.
+CACHE_RULES: List[CacheRule] = [
+    rule(r"^/cars/new/?$", 60, 10, lambda m: ["new_cars", "catalog"]),  # brand/model deletes cascade to versions
+    rule(r"^/cars/used/(?P<id>\d+)$", 300, 10, lambda m: [f"used_car:{m['id']}", "catalog"]),
+    rule(r"^/dealers/?$", 120, 30, lambda m: ["dealers"]),
+    rule(r"^/dealers/(?P<id>\d+)/meta$", 300, 30, lambda m: ["dealers", f"dealer:{m['id']}"]),
+]
+
+
+@dataclass
+class CachedResponse:
+    expires: float
+    etag: str
+    body: bytes
+    headers: List[Tuple[str, str]]              # the route's response headers, minus those set on replay
+    tag_versions: Dict[str, int]
+
+    def dumps(self) -> bytes:
+        meta = {"etag": self.etag, "headers": self.headers, "tag_versions": self.tag_versions}
+        return json.dumps(meta).encode() + b"\n" + self.body
+
+    @classmethod
+    def loads(cls, raw: bytes, expires: float) -> "CachedResponse":
+        meta, body = raw.split(b"\n", 1)
+        meta = json.loads(meta)
+        headers = [tuple(h) for h in meta["headers"]] if "headers" in meta else [("content-type", meta["media_type"])]
+        return cls(expires, meta["etag"], body, headers, meta["tag_versions"])
+
+
+def strong_etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def cache_key(path: str, query_string: str) -> str:
+    """Route + query params with order and blank values normalized away."""
+    params = sorted((k, v) for k, v in parse_qsl(query_string, keep_blank_values=False))
+    return f"{path.rstrip('/') or '/'}?{urlencode(params)}"
+
+
+class ResponseCache:
+    """
+    In-memory LRU of rendered GET responses with tag-based invalidation. With
+    RESPONSE_CACHE_REDIS_URL set, Redis is a shared second tier and holds the tag versions,
+    so an invalidation in one worker is seen by all of them on their next lookup.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, redis_url: Optional[str] = RESPONSE_CACHE_REDIS_URL):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._tag_versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.metrics: Dict[str, Dict[str, int]] = {}
+        self._redis = self._async_redis = None
+        if redis_url:
+            try:
+                import redis
+                import redis.asyncio
+                self._redis = redis.Redis.from_url(redis_url)
+                self._async_redis = redis.asyncio.Redis.from_url(redis_url)
+            except ImportError:
+                print("[response_cache] RESPONSE_CACHE_REDIS_URL is set but the redis package is missing; using memory only")
+
+    def count(self, route: str, event: str) -> None:
+        with self._lock:
+            counters = self.metrics.setdefault(route, {"hits": 0, "misses": 0, "not_modified": 0, "stores": 0})
+            counters[event] += 1
+
+    # --- Tags ---
+    async def tag_versions(self, tags: Sequence[str]) -> Dict[str, int]:
+        if self._async_redis is not None:
+            try:
+                values = await self._async_redis.mget([RESPONSE_CACHE_PREFIX + "tag:" + t for t in tags])
+                return {t: int(v or 0) for t, v in zip(tags, values)}
+            except Exception as e:
+                print(f"[response_cache] Redis unavailable, using local tag versions: {e}")
+        with self._lock:
+            return {t: self._tag_versions.get(t, 0) for t in tags}
+
+    def invalidate_tags(self, *tags: str) -> None:
+        """Called by write endpoints after their commit; safe from sync code."""
+        with self._lock:
+            for tag in tags:
+                self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline()
+                for tag in tags:
+                    pipe.incr(RESPONSE_CACHE_PREFIX + "tag:" + tag)
+                pipe.execute()
+            except Exception as e:
+                print(f"[response_cache] Tag invalidation not shared (Redis error): {e}")
+
+    # --- Entries ---
+    async def get(self, key: str, tags: Sequence[str]) -> Optional[CachedResponse]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None and self._async_redis is not None:
+            try:
+                raw = await self._async_redis.get(RESPONSE_CACHE_PREFIX + key)
+                ttl = await self._async_redis.ttl(RESPONSE_CACHE_PREFIX + key) if raw else 0
+                if raw:
+                    entry = CachedResponse.loads(raw, now + max(ttl, 0))
+                    self._put_local(key, entry)
+            except Exception as e:
+                print(f"[response_cache] Redis read failed: {e}")
+        if entry is None or entry.expires <= now:
+            return None
+        if entry.tag_versions != await self.tag_versions(tags):
+            return None  # a write invalidated one of its tags
+        return entry
+
+    def _put_local(self, key: str, entry: CachedResponse) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def put(self, key: str, entry: CachedResponse, ttl: float) -> None:
+        self._put_local(key, entry)
+        if self._async_redis is not None:
+            try:
+                await self._async_redis.set(RESPONSE_CACHE_PREFIX + key, entry.dumps(), ex=max(int(ttl), 1))
+            except Exception as e:
+                print(f"[response_cache] Redis write failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "shared_backend": self._redis is not None, "routes": {r: dict(c) for r, c in self.metrics.items()}}
+
+
+response_cache = ResponseCache()
+
+
+def invalidate_tags(*tags: str) -> None:
+    response_cache.invalidate_tags(*tags)
+
+
+# Recomputed for every replay; everything else the route set is replayed as-is
+REPLAY_HEADERS = {"etag", "content-length", "x-cache"}
+# Not sent with a 304 (it has no body)
+BODY_HEADERS = {"content-type", "content-length", "content-encoding"}
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]
+
+
+class ResponseCacheMiddleware:
+    """ASGI middleware serving CACHE_RULES routes from `response_cache`, with strong ETags and Cache-Control."""
+
+    def __init__(self, app, cache: ResponseCache = response_cache, rules: Sequence[CacheRule] = CACHE_RULES):
+        self.app = app
+        self.cache = cache
+        self.rules = rules
+
+    def _match(self, path: str) -> Optional[Tuple[CacheRule, re.Match]]:
+        for cache_rule in self.rules:
+            match = cache_rule.pattern.match(path)
+            if match:
+                return cache_rule, match
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if not RESPONSE_CACHE_ENABLED or scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+        matched = self._match(scope["path"])
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        if not matched or "authorization" in headers:
+            return await self.app(scope, receive, send)
+
+        cache_rule, match = matched
+        route, tags = cache_rule.pattern.pattern, cache_rule.tags(match)
+        key = cache_key(scope["path"], scope.get("query_string", b"").decode("latin-1"))
+        if_none_match = headers.get("if-none-match")
+        cache_control = f"public, max-age={cache_rule.max_age}"
+
+        entry = await self.cache.get(key, tags)
+        if entry is not None:
+            self.cache.count(route, "hits")
+            return await self._send(send, entry, cache_control, if_none_match, route, "HIT")
+
+        self.cache.count(route, "misses")
+        # Tag versions are read before rendering, so a write racing with it invalidates the result
+        versions = await self.cache.tag_versions(tags)
+        start: dict = {}
+        body = bytearray()
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+                return
+            body.extend(message.get("body", b""))
+            if message.get("more_body"):
+                return
+            route_headers = [(k.decode("latin-1").lower(), v.decode("latin-1")) for k, v in start.get("headers", [])]
+            names = {k for k, _ in route_headers}
+            # Routes with their own ETag (conditional GETs) or cookies are passed through untouched
+            if start["status"] != 200 or len(body) > RESPONSE_CACHE_MAX_BODY_BYTES or names & {"set-cookie", "etag"}:
+                await send(start)
+                await send({"type": "http.response.body", "body": bytes(body)})
+                return
+            kept = [(k, v) for k, v in route_headers if k not in REPLAY_HEADERS]
+            fresh = CachedResponse(time.time() + cache_rule.ttl, strong_etag(bytes(body)), bytes(body), kept, versions)
+            await self.cache.put(key, fresh, cache_rule.ttl)
+            self.cache.count(route, "stores")
+            await self._send(send, fresh, cache_control, if_none_match, route, "MISS")
+
+        await self.app(scope, receive, capture)
+
+    async def _send(self, send, entry: CachedResponse, cache_control: str, if_none_match: Optional[str], route: str, outcome: str):
+        # The route's own Cache-Control wins over the rule's default
+        route_headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in entry.headers]
+        if not any(k == "cache-control" for k, _ in entry.headers):
+            route_headers.append((b"cache-control", cache_control.encode()))
+        headers = [(b"etag", entry.etag.encode()), (b"x-cache", outcome.encode())]
+        if _etag_matches(if_none_match, entry.etag):
+            self.cache.count(route, "not_modified")
+            headers += [(k, v) for k, v in route_headers if k.decode("latin-1") not in BODY_HEADERS]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers += route_headers + [(b"content-length", str(len(entry.body)).encode())]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": entry.body})
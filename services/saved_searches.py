@@ -0,0 +1,293 @@
+"""
+Saved-search alerts. The matcher (`python manage.py saved-search-alerts`) reads the listings created
+or updated since its watermark, finds the saved searches each one satisfies through an in-memory
+inverted index and queues (search, listing) rows in saved_search_matches. API processes push new
+rows to connected users over WebSocket (routers/saved_searches.py); the matcher also emails the
+pending ones as one digest per user.
+
+Each search is filed under its most selective filter only: its model, else its brand, else the
+price buckets of its range, else its years, else its fuel type or transmission. A listing is then
+checked against the searches filed under its own model, brand, price bucket, year, fuel type and
+transmission (plus the searches without any filter), never against every search.
+
+    python manage.py saved-search-alerts           # match + email loop
+    python manage.py saved-search-alerts --once    # one pass (cron)
+"""
+import math
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import TIMESTAMP, Integer, column, func, literal, or_, select, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from models import Brand, Car, Model, RollupWatermark, SavedSearch, SavedSearchMatch, User
+from services.analytics import lock_watermark
+from services.email_service import send_saved_search_alert, smtp_configured
+
+# --- Config ---
+# Listings are matched once they are this old: updated_at is set before commit, so the watermark
+# must not pass rows that are still uncommitted
+SAVED_SEARCH_MATCH_LAG = timedelta(seconds=float(os.getenv("SAVED_SEARCH_MATCH_LAG_SECONDS", "30")))
+SAVED_SEARCH_INTERVAL_SECONDS = float(os.getenv("SAVED_SEARCH_INTERVAL_SECONDS", "15"))
+SAVED_SEARCH_FULL_REFRESH_SECONDS = float(os.getenv("SAVED_SEARCH_FULL_REFRESH_SECONDS", "600"))
+SAVED_SEARCH_EMAIL_BATCH = int(os.getenv("SAVED_SEARCH_EMAIL_BATCH", "500"))
+# A digest that fails to send is retried after 1, 2, 4, ... minutes (at most 6 h apart), then given up
+SAVED_SEARCH_EMAIL_MAX_ATTEMPTS = int(os.getenv("SAVED_SEARCH_EMAIL_MAX_ATTEMPTS", "10"))
+EMAIL_RETRY_MAX_MINUTES = 360
+SAVED_SEARCH_MAX_PER_USER = int(os.getenv("SAVED_SEARCH_MAX_PER_USER", "20"))
+
+PIPELINE = "saved_searches"  # watermark row in rollup_watermarks
+QUEUE_CHUNK = 5000
+
+# Price ranges are filed under 25%-wide log buckets; open-ended ranges stop at PRICE_BUCKETS
+PRICE_BUCKET_RATIO = 1.25
+YEAR_FLOOR = 1950
+
+
+def _price_bucket(price) -> int:
+    return max(0, int(math.log(max(float(price), 1.0), PRICE_BUCKET_RATIO)))
+
+
+PRICE_BUCKETS = _price_bucket(10_000_000)
+
+SEARCH_COLUMNS = [
+    SavedSearch.id, SavedSearch.user_id, SavedSearch.brand_id, SavedSearch.model_id, SavedSearch.fuel_type,
+    SavedSearch.transmission, SavedSearch.min_price, SavedSearch.max_price, SavedSearch.min_year, SavedSearch.max_year,
+]
+LISTING_COLUMNS = [Car.id, Car.seller_id, Car.model_id, Model.brand_id, Car.fuel_type, Car.transmission, Car.price, Car.year]
+
+
+@dataclass(frozen=True)
+class SearchFilter:
+    id: int
+    user_id: int
+    brand_id: Optional[int] = None
+    model_id: Optional[int] = None
+    fuel_type: Optional[str] = None       # lower-case
+    transmission: Optional[str] = None    # lower-case
+    min_price: Optional[Decimal] = None
+    max_price: Optional[Decimal] = None
+    min_year: Optional[int] = None
+    max_year: Optional[int] = None
+
+    def matches(self, car) -> bool:
+        return (
+            (self.model_id is None or car.model_id == self.model_id)
+            and (self.brand_id is None or car.brand_id == self.brand_id)
+            and (self.fuel_type is None or (car.fuel_type or "").lower() == self.fuel_type)
+            and (self.transmission is None or (car.transmission or "").lower() == self.transmission)
+            and (self.min_price is None or car.price >= self.min_price)
+            and (self.max_price is None or car.price <= self.max_price)
+            and (self.min_year is None or car.year >= self.min_year)
+            and (self.max_year is None or car.year <= self.max_year)
+        )
+
+
+class SearchIndex:
+    """Inverted index: posting key -> ids of the searches filed under it."""
+
+    def __init__(self):
+        self.searches: Dict[int, SearchFilter] = {}
+        self.postings: Dict[tuple, Set[int]] = {}
+        self.filed: Dict[int, List[tuple]] = {}  # search id -> its posting keys
+        self.year_ceiling = datetime.utcnow().year + 1
+
+    def __len__(self) -> int:
+        return len(self.searches)
+
+    def _keys(self, s: SearchFilter) -> List[tuple]:
+        if s.model_id is not None:
+            return [("model", s.model_id)]
+        if s.brand_id is not None:
+            return [("brand", s.brand_id)]
+        if s.min_price is not None or s.max_price is not None:
+            lo = _price_bucket(s.min_price) if s.min_price is not None else 0
+            hi = min(_price_bucket(s.max_price), PRICE_BUCKETS) if s.max_price is not None else PRICE_BUCKETS
+            return [("price", bucket) for bucket in range(min(lo, PRICE_BUCKETS), hi + 1)]
+        if s.min_year is not None or s.max_year is not None:
+            # Clamped like _listing_keys: a min_year past the ceiling is filed under the ceiling bucket
+            # (the exact filter runs on match), otherwise the search would have no keys and never match
+            lo = min(max(s.min_year or YEAR_FLOOR, YEAR_FLOOR), self.year_ceiling)
+            hi = max(min(s.max_year or self.year_ceiling, self.year_ceiling), YEAR_FLOOR)
+            return [("year", year) for year in range(lo, hi + 1)]
+        if s.fuel_type:
+            return [("fuel", s.fuel_type)]
+        if s.transmission:
+            return [("transmission", s.transmission)]
+        return [("all",)]
+
+    def _listing_keys(self, car) -> List[tuple]:
+        return [
+            ("model", car.model_id),
+            ("brand", car.brand_id),
+            ("price", min(_price_bucket(car.price), PRICE_BUCKETS)),
+            ("year", min(max(car.year, YEAR_FLOOR), self.year_ceiling)),
+            ("fuel", (car.fuel_type or "").lower()),
+            ("transmission", (car.transmission or "").lower()),
+            ("all",),
+        ]
+
+    def add(self, search: SearchFilter) -> None:
+        self.remove(search.id)
+        keys = self._keys(search)
+        for key in keys:
+            self.postings.setdefault(key, set()).add(search.id)
+        self.filed[search.id] = keys
+        self.searches[search.id] = search
+
+    def remove(self, search_id: int) -> None:
+        for key in self.filed.pop(search_id, ()):
+            posting = self.postings[key]
+            posting.discard(search_id)
+            if not posting:
+                del self.postings[key]
+        self.searches.pop(search_id, None)
+
+    def candidates(self, car) -> Set[int]:
+        found: Set[int] = set()
+        for key in self._listing_keys(car):
+            found |= self.postings.get(key, set())
+        return found
+
+    def match(self, car) -> List[SearchFilter]:
+        """Searches the listing satisfies, except its own seller's."""
+        return [
+            search for search in map(self.searches.__getitem__, self.candidates(car))
+            if search.user_id != car.seller_id and search.matches(car)
+        ]
+
+
+def search_filter(row) -> SearchFilter:
+    return SearchFilter(
+        row.id, row.user_id, row.brand_id, row.model_id, row.fuel_type, row.transmission,
+        row.min_price, row.max_price, row.min_year, row.max_year,
+    )
+
+
+def _queue(db: Session, pairs: List[Tuple[int, int]], now: datetime) -> int:
+    """
+    INSERT the (search_id, car_id) matches, joined with saved_searches and cars so searches deleted
+    since the index was loaded and listings deleted meanwhile are skipped; one row per pair ever.
+    """
+    found = values(column("search_id", Integer), column("car_id", Integer), name="found").data(pairs)
+    rows = (
+        select(SavedSearch.id, SavedSearch.user_id, Car.id, literal(now, TIMESTAMP))
+        .select_from(found)
+        .join(SavedSearch, SavedSearch.id == found.c.search_id)
+        .join(Car, Car.id == found.c.car_id)
+    )
+    stmt = pg_insert(SavedSearchMatch.__table__).from_select(["search_id", "user_id", "car_id", "matched_at"], rows)
+    return len(db.execute(stmt.on_conflict_do_nothing(index_elements=["search_id", "car_id"]).returning(SavedSearchMatch.id)).all())
+
+
+class SavedSearchMatcher:
+    """Matcher state kept between runs: the search index and how far it follows saved_searches."""
+
+    def __init__(self):
+        self.index = SearchIndex()
+        self.synced_until: Optional[datetime] = None
+        self.loaded_at = 0.0
+
+    def sync(self, db: Session) -> None:
+        """
+        Re-files searches created or edited since the last sync; a periodic full load drops deleted
+        ones (until then they are still candidates, but `_queue` skips them).
+        """
+        if self.synced_until is None or time.monotonic() - self.loaded_at > SAVED_SEARCH_FULL_REFRESH_SECONDS:
+            index = SearchIndex()
+            synced_until = db.query(func.max(SavedSearch.updated_at)).scalar() or datetime(1970, 1, 1)
+            for row in db.query(*SEARCH_COLUMNS).yield_per(10000):
+                index.add(search_filter(row))
+            self.index, self.synced_until, self.loaded_at = index, synced_until, time.monotonic()
+            print(f"[saved_searches] Indexed {len(index)} saved searches")
+            return
+        rows = db.query(*SEARCH_COLUMNS, SavedSearch.updated_at).filter(
+            SavedSearch.updated_at > self.synced_until - SAVED_SEARCH_MATCH_LAG
+        ).all()
+        for row in rows:
+            self.index.add(search_filter(row))
+            self.synced_until = max(self.synced_until, row.updated_at)
+
+    def run_once(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Matches listings changed in (watermark, now - lag]; returns the number of new matches queued."""
+        self.sync(db)
+        now = now or datetime.utcnow()
+        horizon = now - SAVED_SEARCH_MATCH_LAG
+        processed_until = lock_watermark(db, PIPELINE)
+        if processed_until is None or processed_until >= horizon:
+            if processed_until is None:  # first run: alert on listings from now on, not on the existing catalog
+                db.query(RollupWatermark).filter(RollupWatermark.pipeline == PIPELINE).update({"processed_until": horizon})
+            db.commit()
+            return 0
+
+        listings = db.query(*LISTING_COLUMNS).join(Model, Car.model_id == Model.id).filter(
+            Car.updated_at > processed_until, Car.updated_at <= horizon
+        )
+        pairs = [(search.id, car.id) for car in listings.yield_per(QUEUE_CHUNK) for search in self.index.match(car)]
+        queued = sum(_queue(db, pairs[start:start + QUEUE_CHUNK], now) for start in range(0, len(pairs), QUEUE_CHUNK))
+        db.query(RollupWatermark).filter(RollupWatermark.pipeline == PIPELINE).update({"processed_until": horizon})
+        db.commit()
+        return queued
+
+
+# --- Email delivery (the queued rows are the outbox) ---
+def send_email_alerts(db: Session, batch: int = SAVED_SEARCH_EMAIL_BATCH) -> int:
+    """
+    Emails the oldest pending matches as one digest per user and marks the sent ones handled (matches
+    of searches without email alerts are only marked). Matches of a digest that failed stay pending
+    and are retried with backoff; without SMTP settings nothing is emailed and they wait.
+    SKIP LOCKED lets several workers share the queue. Returns the number of digests sent.
+    """
+    now = datetime.utcnow()
+    query = (
+        db.query(
+            SavedSearchMatch.id, User.email, SavedSearch.name.label("search_name"), SavedSearch.notify_email,
+            Brand.name.label("brand_name"), Model.name.label("model_name"), Car.id.label("car_id"), Car.year, Car.mileage, Car.price,
+        )
+        .join(SavedSearch, SavedSearch.id == SavedSearchMatch.search_id)
+        .join(User, User.id == SavedSearchMatch.user_id)
+        .join(Car, Car.id == SavedSearchMatch.car_id)
+        .join(Model, Model.id == Car.model_id)
+        .join(Brand, Brand.id == Model.brand_id)
+        .filter(
+            SavedSearchMatch.emailed_at.is_(None),
+            SavedSearchMatch.email_attempts < SAVED_SEARCH_EMAIL_MAX_ATTEMPTS,
+            or_(SavedSearchMatch.next_email_at.is_(None), SavedSearchMatch.next_email_at <= now),
+        )
+    )
+    if not smtp_configured():
+        query = query.filter(SavedSearch.notify_email.is_(False))
+    rows = query.order_by(SavedSearchMatch.id).limit(batch).with_for_update(of=SavedSearchMatch, skip_locked=True).all()
+    if not rows:
+        db.commit()
+        return 0
+
+    handled = [row.id for row in rows if not row.notify_email]
+    digests: Dict[str, Tuple[List[int], List[str]]] = {}
+    for row in rows:
+        if row.notify_email:
+            ids, lines = digests.setdefault(row.email, ([], []))
+            ids.append(row.id)
+            lines.append(f"[{row.search_name}] {row.brand_name} {row.model_name} {row.year}, {row.mileage} km, {row.price} (listing #{row.car_id})")
+    sent, failed = 0, []
+    for email, (ids, lines) in digests.items():
+        if send_saved_search_alert(email, lines):
+            sent += 1
+            handled += ids
+        else:
+            failed += ids
+
+    if handled:
+        db.query(SavedSearchMatch).filter(SavedSearchMatch.id.in_(handled)).update({"emailed_at": now}, synchronize_session=False)
+    if failed:
+        backoff = func.least(func.power(2, SavedSearchMatch.email_attempts), EMAIL_RETRY_MAX_MINUTES) * literal(timedelta(minutes=1))
+        db.query(SavedSearchMatch).filter(SavedSearchMatch.id.in_(failed)).update(
+            {"email_attempts": SavedSearchMatch.email_attempts + 1, "next_email_at": literal(now, TIMESTAMP) + backoff},
+            synchronize_session=False,
+        )
+        print(f"[saved_searches] {len(digests) - sent} digests failed; {len(failed)} matches will be retried")
+    db.commit()
+    return sent
@@ -0,0 +1,94 @@
+import os
+import typing
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Type
+import orjson
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+# --- Config ---
+# Dev/CI safety net: validate every fast-path payload against its response schema
+SERIALIZATION_VALIDATE = os.getenv("SERIALIZATION_VALIDATE", "false").lower() in ("1", "true", "yes")
+
+Serializer = Callable[[Any], Optional[dict]]
+
+
+def _unwrap(annotation):
+    """Returns (kind, inner) for Model, Optional[Model], List[Model]; ("value", None) otherwise."""
+    origin, args = typing.get_origin(annotation), typing.get_args(annotation)
+    if origin is typing.Union and type(None) in args:
+        inner = [a for a in args if a is not type(None)]
+        return _unwrap(inner[0]) if len(inner) == 1 else ("value", None)
+    if origin in (list, List) and args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+        return "list", args[0]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return "model", annotation
+    return "value", None
+
+
+def _plain(value):
+    # orjson handles datetime and Enums natively; DECIMAL columns become floats like pydantic does for `float`
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def compile_serializer(schema: Type[BaseModel], sources: Optional[Dict[str, Callable[[Any], Any]]] = None) -> Serializer:
+    """
+    Precompiles `schema` into a function mapping a trusted ORM object or Row straight to a dict,
+    without building or validating pydantic models. `sources` overrides how a field is read
+    (default: attribute of the same name); nested schemas are compiled recursively.
+    """
+    sources = sources or {}
+    plan = []
+    for name, info in schema.model_fields.items():
+        kind, nested = _unwrap(info.annotation)
+        getter = sources.get(name) or (lambda obj, name=name: getattr(obj, name, None))
+        plan.append((name, kind, getter, compile_serializer(nested) if nested else None))
+
+    def serialize(obj) -> Optional[dict]:
+        if obj is None:
+            return None
+        out = {}
+        for name, kind, getter, nested in plan:
+            value = getter(obj)
+            if kind == "model":
+                out[name] = nested(value)
+            elif kind == "list":
+                out[name] = [nested(v) for v in value or ()]
+            else:
+                out[name] = _plain(value)
+        return out
+
+    return serialize
+
+
+def schema_columns(schema: Type[BaseModel], entity, **overrides) -> list:
+    """
+    List-view projection: the columns of `entity` named like the fields of `schema`, plus labelled
+    `overrides` (e.g. brand_name=Brand.name). Querying these returns plain rows, so read-only list
+    endpoints skip loading unused columns, the identity map and unit-of-work bookkeeping.
+    """
+    columns = []
+    for name in schema.model_fields:
+        if name in overrides:
+            columns.append(overrides[name].label(name))
+        elif name in entity.__table__.c:
+            columns.append(getattr(entity, name))
+    return columns
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def json_response(payload: Any, schema: Any = None, status_code: int = 200) -> Response:
+    """
+    Renders already-serialized dicts with orjson. FastAPI does not re-validate a returned
+    Response against `response_model`; `schema` is only checked when SERIALIZATION_VALIDATE is on.
+    """
+    if SERIALIZATION_VALIDATE and schema is not None:
+        _adapter(schema).validate_python(payload)
+    return Response(content=orjson.dumps(payload), status_code=status_code, media_type="application/json")
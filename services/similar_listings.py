@@ -0,0 +1,315 @@
+"""
+"Similar cars" for each used listing: the top-k neighbours of every listing are precomputed and
+served from memory. Listings are kept in (brand, model, price) order and compared with the
+SIMILAR_WINDOW listings on either side, on normalized price, year, mileage and horsepower, their
+category/feature bitsets (cars.category_ids / feature_ids) and a penalty for another model or brand.
+Changes from ListingChangeFeed only recompute the changed listings' lists and the lists that
+mention them; changed listings are also offered to the lists of their window.
+
+    python benchmarks/similar_listings_bench.py --listings 1000000
+"""
+import os
+import threading
+import time
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models import Car
+from services.listing_changes import ListingChangeFeed
+from services.reference_cache import get_reference_catalog
+
+# --- Config ---
+SIMILAR_NEIGHBOURS = int(os.getenv("SIMILAR_NEIGHBOURS", "12"))   # precomputed per listing (max `limit`)
+SIMILAR_WINDOW = int(os.getenv("SIMILAR_WINDOW", "1024"))         # candidates on each side in (brand, model, price) order
+SIMILAR_REFRESH_SECONDS = float(os.getenv("SIMILAR_REFRESH_SECONDS", "30"))
+SIMILAR_FULL_REFRESH_SECONDS = float(os.getenv("SIMILAR_FULL_REFRESH_SECONDS", "3600"))
+BLOCK = 512  # listings whose lists are computed together, as one matrix product against their shared window
+
+# Squared-distance weights; numeric values are z-scored first: log price, year, log1p(mileage), horsepower
+WEIGHTS = np.array([1.0, 0.5, 0.5, 0.25], dtype=np.float32)
+CATEGORY_WEIGHT = 0.5  # per category only one of the two listings has
+FEATURE_WEIGHT = 0.1   # per feature only one of the two listings has
+MODEL_PENALTY = np.float32(0.5)
+BRAND_PENALTY = np.float32(1.0)
+
+COLUMNS = [Car.id, Car.model_id, Car.price, Car.year, Car.mileage, Car.horsepower]
+ARRAYS = ("ids", "model", "brand", "numeric", "categories", "features", "neighbours", "distances")
+
+
+class SimilarListings:
+    def __init__(self, brand_of: Dict[int, int], category_ids: Iterable[int], feature_ids: Iterable[int], k: int = SIMILAR_NEIGHBOURS):
+        self.k = k
+        self.brand_of = brand_of  # model_id -> brand_id
+        self.bits = tuple({id: bit for bit, id in enumerate(sorted(ids))} for ids in (category_ids, feature_ids))
+        self.mean = np.zeros(4, np.float32)
+        self.scale = np.ones(4, np.float32)
+        self.size = 0
+        self.rows: Dict[int, int] = {}      # car_id -> slot
+        self._allocate(0)
+        self.order = np.empty(0, np.int64)     # slots in (brand, model, price) order
+        self.position = np.empty(0, np.int64)  # slot -> index in `order`
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in ARRAYS)
+
+    # --- Storage (dense slots, swap-remove on delete, capacity doubling on insert) ---
+    def _allocate(self, capacity: int) -> None:
+        self.ids = np.empty(capacity, np.int32)
+        self.model = np.empty(capacity, np.int32)
+        self.brand = np.empty(capacity, np.int32)
+        self.numeric = np.empty((capacity, 4), np.float32)
+        self.categories = np.zeros((capacity, (len(self.bits[0]) + 7) // 8), np.uint8)
+        self.features = np.zeros((capacity, (len(self.bits[1]) + 7) // 8), np.uint8)
+        self.neighbours = np.full((capacity, self.k), -1, np.int32)   # car ids, nearest first
+        self.distances = np.full((capacity, self.k), np.inf, np.float32)
+
+    def _grow(self) -> None:
+        size, old = self.size, {name: getattr(self, name) for name in ARRAYS}
+        self._allocate(max(16, 2 * len(self.ids)))
+        for name, array in old.items():
+            getattr(self, name)[:size] = array[:size]
+
+    # --- Encoding ---
+    def _normalized(self, rows: Sequence) -> np.ndarray:
+        n = len(rows)
+        raw = np.empty((n, 4), np.float32)
+        raw[:, 0] = np.log(np.maximum(np.fromiter((float(r.price) for r in rows), np.float64, n), 1.0))
+        raw[:, 1] = np.fromiter((r.year for r in rows), np.float32, n)
+        raw[:, 2] = np.log1p(np.fromiter((r.mileage for r in rows), np.float32, n))
+        raw[:, 3] = np.fromiter((np.nan if r.horsepower is None else r.horsepower for r in rows), np.float32, n)
+        if not self.size:  # first load fixes the normalization until the next full load
+            self.mean = np.nanmean(raw, axis=0)
+            std = np.nanstd(raw, axis=0)
+            self.scale = np.where(std > 0, std, 1.0).astype(np.float32)
+        z = (raw - self.mean) / self.scale
+        z[np.isnan(z)] = 0.0  # unknown horsepower counts as average
+        return z * np.sqrt(WEIGHTS)
+
+    def _set_bits(self, which: int, pairs: Sequence[Tuple[int, int]]) -> None:
+        """(car_id, category/feature id) pairs -> bits of the listings' bitsets."""
+        if not pairs:
+            return
+        bits, target = self.bits[which], (self.categories, self.features)[which]
+        slots = np.fromiter((self.rows.get(car_id, -1) for car_id, _ in pairs), np.int64, len(pairs))
+        bit = np.fromiter((bits.get(id, -1) for _, id in pairs), np.int64, len(pairs))
+        keep = (slots >= 0) & (bit >= 0)  # ids created after the last full load are ignored until the next one
+        np.bitwise_or.at(target, (slots[keep], bit[keep] // 8), (128 >> (bit[keep] % 8)).astype(np.uint8))
+
+    def _vectors(self, slots: np.ndarray) -> np.ndarray:
+        """[numeric, category bits, feature bits] scaled so the squared distance is the weighted sum above."""
+        categories = np.unpackbits(self.categories[slots], axis=1, count=len(self.bits[0]))
+        features = np.unpackbits(self.features[slots], axis=1, count=len(self.bits[1]))
+        return np.hstack([
+            self.numeric[slots],
+            categories * np.float32(np.sqrt(CATEGORY_WEIGHT)),
+            features * np.float32(np.sqrt(FEATURE_WEIGHT)),
+        ])
+
+    def _distances(self, rows: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        a, b = self._vectors(rows), self._vectors(candidates)
+        dist = a @ b.T
+        dist *= -2.0
+        dist += np.einsum("ij,ij->i", b, b)
+        dist += np.einsum("ij,ij->i", a, a)[:, None]
+        dist += MODEL_PENALTY * (self.model[rows][:, None] != self.model[candidates])
+        dist += BRAND_PENALTY * (self.brand[rows][:, None] != self.brand[candidates])
+        return np.maximum(dist, 0.0, out=dist)
+
+    # --- Neighbour lists ---
+    def _sort(self) -> None:
+        n = self.size
+        self.order = np.lexsort((self.numeric[:n, 0], self.model[:n], self.brand[:n]))
+        self.position = np.empty(n, np.int64)
+        self.position[self.order] = np.arange(n)
+
+    def _compute(self, slots: np.ndarray, offer: Optional[np.ndarray] = None) -> None:
+        """
+        Recomputes the lists of `slots`, a block of BLOCK listings at a time against the window around
+        the block. Listings flagged in `offer` (by slot) also join the lists they now belong to.
+        """
+        n = self.size
+        positions = np.sort(self.position[slots])
+        blocks = positions // BLOCK
+        for chunk in np.split(positions, np.flatnonzero(np.diff(blocks)) + 1):
+            if not len(chunk):
+                continue
+            block = chunk[0] // BLOCK
+            lo, hi = max(0, block * BLOCK - SIMILAR_WINDOW), min(n, (block + 1) * BLOCK + SIMILAR_WINDOW)
+            rows, candidates = self.order[chunk], self.order[lo:hi]
+            dist = self._distances(rows, candidates)
+            dist[np.arange(len(rows)), chunk - lo] = np.inf  # a listing is not similar to itself
+
+            k = min(self.k, len(candidates) - 1)
+            self.neighbours[rows], self.distances[rows] = -1, np.inf
+            if k > 0:
+                nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+                near = np.take_along_axis(dist, nearest, axis=1)
+                ranked = np.argsort(near, axis=1)
+                self.neighbours[rows, :k] = self.ids[candidates[np.take_along_axis(nearest, ranked, axis=1)]]
+                self.distances[rows, :k] = np.take_along_axis(near, ranked, axis=1)
+            if offer is not None and offer[rows].any():
+                self._offer(rows[offer[rows]], candidates, dist[offer[rows]])
+
+    def _offer(self, rows: np.ndarray, candidates: np.ndarray, dist: np.ndarray) -> None:
+        for i, j in zip(*np.nonzero(dist < self.distances[candidates, -1])):
+            slot, car_id, d = candidates[j], self.ids[rows[i]], dist[i, j]
+            if slot == rows[i] or car_id in self.neighbours[slot]:
+                continue
+            at = np.searchsorted(self.distances[slot], d)
+            if at == self.k:  # an earlier offer in this pass filled the list with closer listings
+                continue
+            self.neighbours[slot, at + 1:] = self.neighbours[slot, at:-1]
+            self.distances[slot, at + 1:] = self.distances[slot, at:-1]
+            self.neighbours[slot, at], self.distances[slot, at] = car_id, d
+
+    # --- Maintenance ---
+    def load(self, rows: Sequence, categories: Sequence[Tuple[int, int]], features: Sequence[Tuple[int, int]]) -> None:
+        """Full build; `categories` / `features` are (car_id, id) pairs."""
+        with self.lock:
+            self.size, self.rows = 0, {}
+            self._allocate(len(rows))
+            self._upsert(rows)
+            self._set_bits(0, categories)
+            self._set_bits(1, features)
+            self._sort()
+            self._compute(np.arange(self.size))
+
+    def _upsert(self, rows: Sequence) -> None:
+        if not rows:
+            return
+        for r, values in zip(rows, self._normalized(rows)):
+            slot = self.rows.get(r.id)
+            if slot is None:
+                if self.size == len(self.ids):
+                    self._grow()
+                slot, self.size = self.size, self.size + 1
+                self.rows[r.id] = slot
+                self.ids[slot] = r.id
+            self.model[slot], self.brand[slot] = r.model_id, self.brand_of.get(r.model_id, -1)
+            self.numeric[slot] = values
+            self.categories[slot], self.features[slot] = 0, 0
+
+    def _remove(self, car_id: int) -> None:
+        slot = self.rows.pop(car_id)
+        last = self.size - 1
+        if slot != last:
+            for name in ARRAYS:
+                array = getattr(self, name)
+                array[slot] = array[last]
+            self.rows[int(self.ids[slot])] = slot
+        self.size = last
+
+    def apply(self, rows: Sequence, categories: Sequence[Tuple[int, int]], features: Sequence[Tuple[int, int]], deleted: Iterable[int]) -> None:
+        """Changed listings (with their category/feature pairs) and deleted ids, as read by ListingChangeFeed.poll."""
+        with self.lock:
+            changed = [r.id for r in rows]
+            self._upsert(rows)
+            self._set_bits(0, categories)
+            self._set_bits(1, features)
+            deleted = [car_id for car_id in deleted if car_id in self.rows]
+            for car_id in deleted:
+                self._remove(car_id)
+            if not changed and not deleted:
+                return
+            self._sort()
+            slots = np.array([self.rows[car_id] for car_id in changed if car_id in self.rows], np.int64)
+            stale = np.flatnonzero(np.isin(self.neighbours[:self.size], np.array(changed + deleted, np.int32)).any(axis=1))
+            offer = np.zeros(self.size, bool)
+            offer[slots] = True
+            self._compute(np.union1d(stale, slots), offer)
+
+    def similar(self, car_id: int, limit: int = SIMILAR_NEIGHBOURS) -> Optional[List[int]]:
+        """Ids of the most similar listings, nearest first; None if the listing is not indexed."""
+        with self.lock:
+            slot = self.rows.get(car_id)
+            if slot is None:
+                return None
+            return [int(id) for id in self.neighbours[slot, :limit] if id >= 0]
+
+
+# --- Process-local index, refreshed from the change feed ---
+_similar: Optional[SimilarListings] = None
+_feed = ListingChangeFeed(COLUMNS)
+_checked_at = 0.0
+_lock = threading.Lock()
+_rebuilding = False
+
+
+def _pairs(db: Session, column, car_ids: Optional[List[int]] = None, chunk: int = 10000) -> List[Tuple[int, int]]:
+    """(car_id, category/feature id) pairs of the given listings, or of all listings, from an id array column of cars."""
+    query = db.query(Car.id, func.unnest(column))
+    if car_ids is None:
+        return [tuple(pair) for pair in query.yield_per(50000)]
+    pairs = []
+    for start in range(0, len(car_ids), chunk):
+        pairs += [tuple(pair) for pair in query.filter(Car.id.in_(car_ids[start:start + chunk]))]
+    return pairs
+
+
+def _brand_of(db: Session) -> Dict[int, int]:
+    return {model.id: model.brand_id for model in get_reference_catalog(db).models.values()}
+
+
+def _load(db: Session, feed: ListingChangeFeed) -> SimilarListings:
+    start = time.perf_counter()
+    catalog = get_reference_catalog(db)
+    loaded = SimilarListings(_brand_of(db), catalog.categories.keys(), catalog.features.keys())
+    loaded.load(feed.load_all(db), _pairs(db, Car.category_ids), _pairs(db, Car.feature_ids))
+    print(f"[similar_listings] Indexed {len(loaded)} listings ({loaded.nbytes / 2**20:.0f} MB, {time.perf_counter() - start:.1f}s)")
+    return loaded
+
+
+def _rebuild() -> None:
+    """Full rebuild off the request path: requests keep using (and polling into) the current index."""
+    global _similar, _feed, _checked_at, _rebuilding
+    from database import SessionLocal
+    try:
+        feed = ListingChangeFeed(COLUMNS)
+        with SessionLocal() as db:
+            rebuilt = _load(db, feed)
+        with _lock:
+            # Changes since the new feed's watermark are read by the next poll
+            _similar, _feed, _checked_at = rebuilt, feed, 0.0
+    except Exception as e:
+        print(f"[similar_listings] Rebuild failed: {e}")
+    finally:
+        _rebuilding = False
+
+
+def get_similar_listings(db: Session) -> SimilarListings:
+    """
+    Applies listings changed or deleted since the last check at most every SIMILAR_REFRESH_SECONDS;
+    rebuilds everything in a background thread after SIMILAR_FULL_REFRESH_SECONDS or when the feed
+    reports missed deletes (tens of seconds at catalog scale). Only the first request of a process
+    waits for a build; while another request applies changes, the others keep the current index.
+    """
+    global _similar, _checked_at, _rebuilding
+    similar = _similar
+    if similar is not None and time.monotonic() - _checked_at < SIMILAR_REFRESH_SECONDS:
+        return similar
+    if not _lock.acquire(blocking=similar is None):
+        return similar
+    try:
+        if _similar is None:
+            _similar, _checked_at = _load(db, _feed), time.monotonic()
+            return _similar
+        if time.monotonic() - _checked_at < SIMILAR_REFRESH_SECONDS:
+            return _similar
+        changed, deleted = _feed.poll(db)
+        if changed or deleted:
+            ids = [r.id for r in changed]
+            _similar.brand_of = _brand_of(db)
+            _similar.apply(changed, _pairs(db, Car.category_ids, ids), _pairs(db, Car.feature_ids, ids), deleted)
+        if not _rebuilding and (_feed.age() >= SIMILAR_FULL_REFRESH_SECONDS or _feed.out_of_sync(db, len(_similar))):
+            _rebuilding = True
+            threading.Thread(target=_rebuild, name="similar-listings-rebuild", daemon=True).start()
+        _checked_at = time.monotonic()
+        return _similar
+    finally:
+        _lock.release()
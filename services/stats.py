@@ -0,0 +1,329 @@
+"""
+Denormalized counters behind the stats endpoints: per seller/dealer and per table row count,
+price sum and newest posting date, kept in `stats_counters` so every stats read is one primary-key
+lookup (or, for cars/versions totals, one range scan over the per-owner rows) instead of
+COUNT/AVG/MAX scans over the base tables.
+
+Listings and versions only write per-owner rows: a single whole-table row would be locked by every
+listing write until its commit and serialize them all. Their totals are summed on read; only the
+admin-written scopes (brands, models, categories, users) keep one whole-table row.
+
+Counters are updated in the same transaction as the rows they count:
+- ORM writes (create/update/delete, including cascades) through an `after_flush` listener on
+  every Session, registered when this module is imported (main.py and manage.py import it);
+- Core bulk inserts call `count_inserted` (services.bulk_import), Core deletes `count_deleted`.
+
+Raw SQL writes (seed.sql, benchmark seeds, manual psql) bypass both; `reconcile` compares the
+counters with the base tables and repairs drift:
+
+    python manage.py reconcile-stats [--dry-run]
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import event, func, inspect, literal, null, or_, select, update, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from models import Brand, Model, Category, User, Version, Car, StatsCounter
+
+GLOBAL = 0  # owner_id of the whole-table counter (scopes without an owner); summed from owner rows otherwise
+
+
+@dataclass(frozen=True)
+class CounterSpec:
+    scope: str
+    model: type
+    owner: Optional[str] = None    # attribute holding the seller/dealer id (per-owner counters)
+    price: Optional[str] = None
+    posted: Optional[str] = None
+
+
+SPECS = [
+    CounterSpec("cars", Car, owner="seller_id", price="price", posted="posted_at"),
+    CounterSpec("versions", Version, owner="dealer_id", price="price"),
+    CounterSpec("brands", Brand),
+    CounterSpec("models", Model),
+    CounterSpec("categories", Category),
+    CounterSpec("users", User),
+]
+SPEC_BY_MODEL = {spec.model: spec for spec in SPECS}
+SPEC_BY_SCOPE = {spec.scope: spec for spec in SPECS}
+
+Key = Tuple[str, int]  # (scope, owner_id)
+
+
+@dataclass
+class Delta:
+    count: int = 0
+    price_sum: Decimal = field(default_factory=Decimal)
+    last_posted_at: Optional[datetime] = None
+
+
+@dataclass
+class CounterSnapshot:
+    row_count: int = 0
+    price_sum: Decimal = field(default_factory=Decimal)
+    last_posted_at: Optional[datetime] = None
+
+    @property
+    def avg_price(self) -> Optional[Decimal]:
+        return (self.price_sum / self.row_count).quantize(Decimal("0.01")) if self.row_count else None
+
+
+def _decimal(value) -> Decimal:
+    return Decimal(str(value)) if value is not None else Decimal(0)
+
+
+def _add(deltas: Dict[Key, Delta], spec: CounterSpec, row: tuple, sign: int) -> None:
+    """Counts one row (owner_id, price, posted_at) in or out of its per-owner (or whole-table) counter."""
+    owner_id, price, posted = row
+    delta = deltas.setdefault(_key(spec, owner_id), Delta())
+    delta.count += sign
+    delta.price_sum += sign * _decimal(price)
+    if sign > 0 and posted is not None and (delta.last_posted_at is None or posted > delta.last_posted_at):
+        delta.last_posted_at = posted
+
+
+def _key(spec: CounterSpec, owner_id: Optional[int]) -> Key:
+    return (spec.scope, owner_id if spec.owner else GLOBAL)
+
+
+# --- Writes ---
+def apply_deltas(connection, deltas: Dict[Key, Delta]) -> None:
+    """
+    One multi-row upsert. Keys are sorted so concurrent writers lock counter rows in the same
+    order; listing writes only lock their owner's rows, so different sellers never wait on each other.
+    """
+    now = datetime.utcnow()
+    rows = [
+        {"scope": scope, "owner_id": owner_id, "row_count": d.count, "price_sum": d.price_sum, "last_posted_at": d.last_posted_at, "updated_at": now}
+        for (scope, owner_id), d in sorted(deltas.items())
+        if d.count or d.price_sum or d.last_posted_at
+    ]
+    if not rows:
+        return
+    table = StatsCounter.__table__
+    stmt = pg_insert(table).values(rows)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.scope, table.c.owner_id],
+        set_={
+            "row_count": table.c.row_count + stmt.excluded.row_count,
+            "price_sum": table.c.price_sum + stmt.excluded.price_sum,
+            "last_posted_at": func.greatest(table.c.last_posted_at, stmt.excluded.last_posted_at),
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ))
+
+
+def _resync_last_posted(connection, keys: Iterable[Key]) -> None:
+    """MAX(posted) can't be decremented: re-read it (index range scan) after deletes."""
+    table = StatsCounter.__table__
+    for scope, owner_id in sorted(keys):
+        spec = SPEC_BY_SCOPE[scope]
+        newest = select(func.max(getattr(spec.model, spec.posted)))
+        if owner_id != GLOBAL:
+            newest = newest.where(getattr(spec.model, spec.owner) == owner_id)
+        connection.execute(
+            update(table).where(table.c.scope == scope, table.c.owner_id == owner_id).values(last_posted_at=newest.scalar_subquery())
+        )
+
+
+def count_inserted(db: Session, model: type, rows: Sequence[tuple]) -> None:
+    """For Core inserts that bypass the ORM: rows are (owner_id, price, posted_at) from RETURNING."""
+    spec = SPEC_BY_MODEL[model]
+    deltas: Dict[Key, Delta] = {}
+    for row in rows:
+        _add(deltas, spec, row, 1)
+    apply_deltas(db.connection(), deltas)
+
+
+def count_deleted(db: Session, model: type, rows: Sequence[tuple]) -> None:
+    """For Core deletes that bypass the ORM: rows are (owner_id, price, posted_at) from RETURNING."""
+    spec = SPEC_BY_MODEL[model]
+    deltas: Dict[Key, Delta] = {}
+    for row in rows:
+        _add(deltas, spec, row, -1)
+    connection = db.connection()
+    apply_deltas(connection, deltas)
+    if spec.posted:
+        _resync_last_posted(connection, deltas.keys())
+
+
+_UNLOADED = object()
+
+def _counted_values(state, spec: CounterSpec, before: bool) -> Optional[tuple]:
+    """(owner_id, price, posted_at) of a row before or after this flush; None if an attribute was never loaded."""
+    values = []
+    for key in (spec.owner, spec.price, spec.posted):
+        if key is None:
+            values.append(None)
+        elif before:
+            history = state.attrs[key].history
+            loaded = history.deleted or history.unchanged
+            if not loaded:
+                return None
+            values.append(loaded[0])
+        else:
+            value = state.dict.get(key, _UNLOADED)
+            if value is _UNLOADED:
+                return None
+            values.append(value)
+    return tuple(values)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_counters(session: Session, flush_context) -> None:
+    # new/dirty/deleted and attribute history still describe this flush here
+    deltas: Dict[Key, Delta] = {}
+    resync: set = set()
+    removed_owners: List[int] = []
+
+    for sign, objects in ((1, session.new), (-1, session.deleted)):
+        for obj in objects:
+            if sign < 0 and isinstance(obj, User):
+                removed_owners.append(obj.id)
+            spec = SPEC_BY_MODEL.get(type(obj))
+            if not spec:
+                continue
+            row = _counted_values(inspect(obj), spec, before=False)
+            if row is None:
+                print(f"[stats] {spec.scope} row flushed without its counted columns; counters drift until reconcile-stats")
+                continue
+            _add(deltas, spec, row, sign)
+            if sign < 0 and spec.posted:
+                resync.add(_key(spec, row[0]))
+
+    for obj in session.dirty:
+        spec = SPEC_BY_MODEL.get(type(obj))
+        if not spec or not (spec.owner or spec.price or spec.posted):
+            continue
+        state = inspect(obj)
+        before, after = _counted_values(state, spec, before=True), _counted_values(state, spec, before=False)
+        if before == after:
+            continue
+        if before is None or after is None:
+            print(f"[stats] Updated {spec.scope} row without loaded history; counters drift until reconcile-stats")
+            continue
+        _add(deltas, spec, before, -1)
+        _add(deltas, spec, after, 1)
+        if spec.posted and before[0] != after[0]:
+            resync.add(_key(spec, before[0]))
+
+    if not (deltas or removed_owners):
+        return
+    connection = session.connection()
+    apply_deltas(connection, deltas)
+    if removed_owners:
+        table = StatsCounter.__table__
+        connection.execute(delete(table).where(table.c.owner_id.in_(removed_owners)))
+    _resync_last_posted(connection, {key for key in resync if key[1] not in removed_owners})
+
+
+# --- Reads (one primary-key lookup, or one scope range scan for owner-summed totals) ---
+def _counter_rows(scope: str):
+    """Filter for the rows making up a scope's whole-table figures."""
+    if SPEC_BY_SCOPE[scope].owner:
+        return (StatsCounter.scope == scope) & (StatsCounter.owner_id != GLOBAL)
+    return (StatsCounter.scope == scope) & (StatsCounter.owner_id == GLOBAL)
+
+
+def read_counter(db: Session, scope: str, owner_id: int = GLOBAL) -> CounterSnapshot:
+    if owner_id == GLOBAL and SPEC_BY_SCOPE[scope].owner:
+        row = db.query(
+            func.coalesce(func.sum(StatsCounter.row_count), 0),
+            func.coalesce(func.sum(StatsCounter.price_sum), 0),
+            func.max(StatsCounter.last_posted_at),
+        ).filter(_counter_rows(scope)).one()
+        return CounterSnapshot(int(row[0]), _decimal(row[1]), row[2])
+    row = db.query(StatsCounter.row_count, StatsCounter.price_sum, StatsCounter.last_posted_at).filter(
+        StatsCounter.scope == scope, StatsCounter.owner_id == owner_id
+    ).first()
+    return CounterSnapshot(*row) if row else CounterSnapshot()
+
+
+def read_totals(db: Session, scopes: Sequence[str]) -> Dict[str, int]:
+    """Whole-table row counts for several scopes in one query."""
+    totals = dict(db.query(StatsCounter.scope, func.sum(StatsCounter.row_count)).filter(
+        or_(*(_counter_rows(scope) for scope in scopes))
+    ).group_by(StatsCounter.scope).all())
+    return {scope: int(totals.get(scope) or 0) for scope in scopes}
+
+
+# --- Reconciliation ---
+def _actual(db: Session, spec: CounterSpec, owner_ids: Optional[Iterable[int]] = None) -> Dict[Key, tuple]:
+    """(row_count, price_sum, last_posted_at) computed from the base table, per owner or whole table."""
+    model = spec.model
+    aggregates = [
+        func.count(),
+        func.coalesce(func.sum(getattr(model, spec.price)), 0) if spec.price else literal(0),
+        func.max(getattr(model, spec.posted)) if spec.posted else null(),
+    ]
+    owner_ids = None if owner_ids is None else set(owner_ids)
+    actual: Dict[Key, tuple] = {}
+    if not spec.owner and (owner_ids is None or GLOBAL in owner_ids):
+        actual[(spec.scope, GLOBAL)] = tuple(db.query(*aggregates).select_from(model).one())
+    if spec.owner and (owner_ids is None or owner_ids - {GLOBAL}):
+        owner = getattr(model, spec.owner)
+        query = db.query(owner, *aggregates).group_by(owner)
+        if owner_ids is not None:
+            query = query.filter(owner.in_(owner_ids - {GLOBAL}))
+        for owner_id, *values in query:
+            actual[(spec.scope, owner_id)] = tuple(values)
+    return actual
+
+
+def _normalized(values: Optional[tuple]) -> tuple:
+    count, price_sum, last_posted = values or (0, 0, None)
+    return int(count), _decimal(price_sum), last_posted
+
+
+def reconcile(db: Session, fix: bool = True, sample: int = 20) -> Dict[str, dict]:
+    """
+    Compares every counter with the base tables and, with fix=True, rewrites the drifted ones.
+    Drifted rows are locked (FOR UPDATE) and recomputed before they are rewritten, so writes that
+    commit while the check runs are neither lost nor counted twice. One transaction per scope.
+    """
+    report: Dict[str, dict] = {}
+    for spec in SPECS:
+        stored = {
+            (spec.scope, owner_id): (count, price_sum, last_posted)
+            for owner_id, count, price_sum, last_posted in db.query(
+                StatsCounter.owner_id, StatsCounter.row_count, StatsCounter.price_sum, StatsCounter.last_posted_at
+            ).filter(StatsCounter.scope == spec.scope)
+        }
+        actual = _actual(db, spec)
+        drifted = sorted(
+            key for key in stored.keys() | actual.keys()
+            if _normalized(stored.get(key)) != _normalized(actual.get(key))
+        )
+        report[spec.scope] = {
+            "counters": len(stored),
+            "drifted": len(drifted),
+            "sample": [
+                {"owner_id": owner_id, "stored": _normalized(stored.get((scope, owner_id))), "actual": _normalized(actual.get((scope, owner_id)))}
+                for scope, owner_id in drifted[:sample]
+            ],
+        }
+        db.rollback()  # end the read snapshot before locking
+        if not (fix and drifted):
+            continue
+
+        table = StatsCounter.__table__
+        owner_ids = [owner_id for _, owner_id in drifted]
+        db.execute(pg_insert(table).values([{"scope": spec.scope, "owner_id": owner_id} for owner_id in owner_ids]).on_conflict_do_nothing())
+        db.execute(
+            select(table.c.owner_id).where(table.c.scope == spec.scope, table.c.owner_id.in_(owner_ids))
+            .order_by(table.c.owner_id).with_for_update()
+        ).all()
+        current = _actual(db, spec, owner_ids)
+        now = datetime.utcnow()
+        for owner_id in owner_ids:
+            count, price_sum, last_posted = _normalized(current.get((spec.scope, owner_id)))
+            db.execute(
+                update(table).where(table.c.scope == spec.scope, table.c.owner_id == owner_id)
+                .values(row_count=count, price_sum=price_sum, last_posted_at=last_posted, updated_at=now)
+            )
+        db.commit()
+        print(f"[stats] Repaired {len(owner_ids)} {spec.scope} counters")
+    return report
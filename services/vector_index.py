@@ -0,0 +1,107 @@
+import os
+import numpy as np
+import faiss
+from dataclasses import dataclass
+from typing import Optional
+
+# --- Config ---
+# Index type and parameters for every FAISS index in the app (catalog RAG, listing search).
+# All indexes use inner product on L2-normalized vectors, i.e. cosine similarity.
+INDEX_TYPES = ("flat", "ivfpq", "hnsw")
+
+
+@dataclass
+class IndexConfig:
+    kind: str = "flat"
+    # IVF-PQ
+    nlist: int = 1024
+    nprobe: int = 16
+    pq_m: int = 48          # sub-quantizers, must divide the vector dimension
+    pq_nbits: int = 8
+    # HNSW
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+
+    @property
+    def min_train_size(self) -> int:
+        # FAISS wants ~39 training points per centroid (and 2**nbits per PQ codebook)
+        return max(self.nlist * 39, 2 ** self.pq_nbits) if self.kind == "ivfpq" else 0
+
+
+def index_config_from_env(prefix: str = "VECTOR_INDEX_") -> IndexConfig:
+    """Reads e.g. VECTOR_INDEX_TYPE=hnsw, VECTOR_INDEX_HNSW_M=32, VECTOR_INDEX_NPROBE=16."""
+    def env_int(name: str, default: int) -> int:
+        return int(os.getenv(f"{prefix}{name}", str(default)))
+
+    defaults = IndexConfig()
+    kind = os.getenv(f"{prefix}TYPE", defaults.kind).lower()
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"{prefix}TYPE must be one of {INDEX_TYPES}, got '{kind}'")
+    return IndexConfig(
+        kind=kind,
+        nlist=env_int("NLIST", defaults.nlist),
+        nprobe=env_int("NPROBE", defaults.nprobe),
+        pq_m=env_int("PQ_M", defaults.pq_m),
+        pq_nbits=env_int("PQ_NBITS", defaults.pq_nbits),
+        hnsw_m=env_int("HNSW_M", defaults.hnsw_m),
+        ef_construction=env_int("HNSW_EF_CONSTRUCTION", defaults.ef_construction),
+        ef_search=env_int("HNSW_EF_SEARCH", defaults.ef_search),
+    )
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def build_index(dim: int, config: IndexConfig, train_vectors: Optional[np.ndarray] = None) -> faiss.Index:
+    """
+    Creates an ID-mapped inner-product index. IVF-PQ is trained on `train_vectors`;
+    when too few are given (small catalogs) it falls back to an exact flat index.
+    """
+    kind = config.kind
+    if kind == "ivfpq" and (train_vectors is None or len(train_vectors) < config.min_train_size):
+        kind = "flat"
+
+    if kind == "hnsw":
+        inner = faiss.IndexHNSWFlat(dim, config.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        inner.hnsw.efConstruction = config.ef_construction
+        inner.hnsw.efSearch = config.ef_search
+    elif kind == "ivfpq":
+        quantizer = faiss.IndexFlatIP(dim)
+        inner = faiss.IndexIVFPQ(quantizer, dim, config.nlist, config.pq_m, config.pq_nbits, faiss.METRIC_INNER_PRODUCT)
+        inner.train(np.ascontiguousarray(train_vectors, dtype="float32"))
+        inner.nprobe = config.nprobe
+    else:
+        inner = faiss.IndexFlatIP(dim)
+
+    return faiss.IndexIDMap2(inner)
+
+
+def supports_remove(index: faiss.Index) -> bool:
+    """HNSW graphs cannot delete nodes; callers tombstone instead."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    return not isinstance(inner, faiss.IndexHNSW)
+
+
+def search_params(index: faiss.Index, config: IndexConfig, sel: Optional[faiss.IDSelector] = None) -> Optional[faiss.SearchParameters]:
+    """Per-query parameters (nprobe / efSearch) plus an optional ID selector."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(inner, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF(nprobe=config.nprobe)
+    elif isinstance(inner, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(efSearch=config.ef_search)
+    elif sel is None:
+        return None
+    else:
+        params = faiss.SearchParameters()
+    if sel is not None:
+        params.sel = sel
+    return params
+
+
+def index_memory_bytes(index: faiss.Index) -> int:
+    """Approximate resident size, measured as the serialized index size."""
+    return int(faiss.serialize_index(index).nbytes)
@@ -0,0 +1,134 @@
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from services.reference_cache import ReferenceCatalog, get_reference_catalog
+
+# Model-year codes (10th VIN character) repeat every 30 years: 1980-2009, 2010-2039, ...
+YEAR_CODES = "ABCDEFGHJKLMNPRSTVWXY123456789"
+# First VIN character of North American manufacturers, the only ones bound by the position-7 rule
+NORTH_AMERICAN_REGIONS = "12345"
+
+
+def decode_model_year(vin: str, current_year: Optional[int] = None) -> Optional[int]:
+    """
+    Resolves the 30-year cycle: for North American VINs a digit in position 7 means
+    1980-2009 and a letter means 2010-2039; otherwise the latest non-future year wins.
+    """
+    if len(vin) < 10 or vin[9] not in YEAR_CODES:
+        return None
+    base = 1980 + YEAR_CODES.index(vin[9])
+    latest_allowed = (current_year or datetime.utcnow().year) + 1  # next model year is on sale
+    candidates = [base + 30 * cycle for cycle in range(3) if base + 30 * cycle <= latest_allowed]
+    if not candidates:
+        return None
+    if vin[0] not in NORTH_AMERICAN_REGIONS:
+        return candidates[-1]
+    if vin[6].isdigit():
+        preferred = [y for y in candidates if y < 2010]
+    else:
+        preferred = [y for y in candidates if 2010 <= y < 2040]
+    return (preferred or candidates)[-1]
+
+
+@dataclass
+class BrandEntry:
+    id: int
+    name: str
+    wmi: str
+    models: List[Tuple[str, Optional[str]]] = field(default_factory=list)  # (name, vds)
+    vds_trie: dict = field(default_factory=dict)
+
+
+def _trie_insert(trie: dict, key: str, model_name: str) -> None:
+    node = trie
+    for ch in key:
+        node = node.setdefault(ch, {})
+    node["$"] = model_name
+
+
+def _trie_longest_prefix(trie: dict, text: str) -> Optional[str]:
+    node, found = trie, None
+    for ch in text:
+        node = node.get(ch)
+        if node is None:
+            break
+        found = node.get("$", found)
+    return found
+
+
+class VinIndex:
+    """In-memory WMI -> brand map (3- and 4-character WMIs) and per-brand VDS prefix tries."""
+
+    def __init__(self, brands: List[BrandEntry], version: int = 0):
+        self.by_wmi: Dict[str, BrandEntry] = {b.wmi: b for b in brands}
+        self.version = version
+
+    @classmethod
+    def from_catalog(cls, catalog: ReferenceCatalog) -> "VinIndex":
+        brands = {
+            brand_id: BrandEntry(brand_id, catalog.brands[brand_id].name, wmi.strip().upper())
+            for brand_id, wmi in catalog.brand_wmi.items() if wmi
+        }
+        for model in sorted(catalog.models.values(), key=lambda m: m.name):
+            entry = brands.get(model.brand_id)
+            if not entry:
+                continue
+            vds = catalog.model_vds[model.id]
+            vds = vds.strip().upper() if vds else None
+            entry.models.append((model.name, vds))
+            if vds:
+                _trie_insert(entry.vds_trie, vds, model.name)
+        return cls(list(brands.values()), catalog.version)
+
+    def find_brand(self, vin: str) -> Optional[BrandEntry]:
+        # Longest match first so 4-character WMIs (e.g. Isuzu JAAN) win over 3-character ones
+        return self.by_wmi.get(vin[:4]) or self.by_wmi.get(vin[:3])
+
+    def decode(self, vin: str) -> dict:
+        vin = vin.strip().upper()
+        if len(vin) < 10:
+            return {"error": "VIN must be at least 10 characters long"}
+
+        year_code = vin[9]  # 10th character → year
+        year = decode_model_year(vin) or "Unknown"
+
+        brand = self.find_brand(vin)
+        if not brand:
+            return {"error": f"Brand with WMI {vin[:3]} not found in database"}
+
+        wmi = brand.wmi
+        vds = vin[len(wmi):9]  # characters after the WMI up to the check digit → model descriptor
+
+        # Longest model VDS code prefixing the VIN descriptor, O(len(vds)) per brand. Only on a miss
+        # (which lists every model anyway) fall back to the old SQL rule: model VDS contains the descriptor.
+        model = _trie_longest_prefix(brand.vds_trie, vds)
+        model = model or next((name for name, code in brand.models if code and vds in code), None)
+
+        result = {"vin": vin, "wmi": wmi, "vds": vds, "year_code": year_code, "year": year, "brand": brand.name}
+        if model:
+            result["model"] = model
+            return result
+
+        # Fallback: return brand + all models if exact VDS not matched
+        result["models"] = [name for name, _ in brand.models]
+        result["note"] = "Exact model not identified, showing all models for brand."
+        return result
+
+
+_index: Optional[VinIndex] = None
+_lock = threading.Lock()
+
+
+def get_vin_index(db: Session) -> VinIndex:
+    """Rebuilt from the reference catalog whenever its version changes."""
+    global _index
+    catalog = get_reference_catalog(db)
+    index = _index
+    if index is None or index.version != catalog.version:
+        with _lock:
+            if _index is None or _index.version != catalog.version:
+                _index = VinIndex.from_catalog(catalog)
+            index = _index
+    return index
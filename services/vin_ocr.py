@@ -0,0 +1,106 @@
+import os
+import io
+import re
+import asyncio
+import multiprocessing
+import pytesseract
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from PIL import Image, ImageOps, ImageFilter
+
+# --- Config ---
+VIN_OCR_WORKERS = int(os.getenv("VIN_OCR_WORKERS", "2"))
+VIN_OCR_MAX_QUEUE = int(os.getenv("VIN_OCR_MAX_QUEUE", "8"))     # in-flight scans per API worker before 503
+VIN_OCR_MAX_WIDTH = int(os.getenv("VIN_OCR_MAX_WIDTH", "1200"))  # px, images are downscaled to this
+
+# VINs never contain I, O or Q
+VIN_CHARSET = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"
+TESSERACT_LINE_CONFIG = f"--psm 7 -c tessedit_char_whitelist={VIN_CHARSET}"
+TESSERACT_BLOCK_CONFIG = f"--psm 6 -c tessedit_char_whitelist={VIN_CHARSET}"
+_VIN_PATTERN = re.compile(f"[{VIN_CHARSET}]{{17}}")
+
+
+class OcrBusy(Exception):
+    """Raised when the OCR queue is full; callers should answer 503."""
+
+
+# --- Image pipeline (runs in worker processes) ---
+def preprocess(image_bytes: bytes) -> Image.Image:
+    """Grayscale, downscale, denoise and crop to the text region."""
+    image = Image.open(io.BytesIO(image_bytes))
+    image = ImageOps.exif_transpose(image).convert("L")
+    if image.width > VIN_OCR_MAX_WIDTH:
+        image.thumbnail((VIN_OCR_MAX_WIDTH, VIN_OCR_MAX_WIDTH * 4))
+    image = ImageOps.autocontrast(image, cutoff=2)
+    image = image.filter(ImageFilter.MedianFilter())
+
+    # Crop to the bounding box of dark pixels (text), with a small margin
+    mask = image.point(lambda p: 255 if p < 128 else 0)
+    bbox = mask.getbbox()
+    if bbox:
+        margin = 10
+        left, top, right, bottom = bbox
+        image = image.crop((max(0, left - margin), max(0, top - margin), min(image.width, right + margin), min(image.height, bottom + margin)))
+    return image
+
+
+def _clean(text: str) -> str:
+    return "".join(c for c in text.upper() if c.isalnum())
+
+
+def ocr_vin(image_bytes: bytes) -> str:
+    """
+    OCR restricted to VIN characters. Tries single-line mode first and falls back to
+    block mode for photos with several lines, returning a 17-character VIN when found.
+    """
+    image = preprocess(image_bytes)
+    text = ""
+    for config in (TESSERACT_LINE_CONFIG, TESSERACT_BLOCK_CONFIG):
+        text = pytesseract.image_to_string(image, config=config)
+        match = _VIN_PATTERN.search(_clean(text))
+        if match:
+            return match.group(0)
+    return _clean(text)
+
+
+# --- Bounded process pool ---
+_pool: Optional[ProcessPoolExecutor] = None
+_in_flight = 0
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=VIN_OCR_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drops a pool broken by a dead worker (OOM kill, segfault); the next call spawns a fresh one."""
+    global _pool
+    if _pool is pool:  # another request may already have replaced it
+        _pool = None
+        print("[vin_ocr] OCR worker died, restarting the process pool")
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_ocr(image_bytes: bytes) -> str:
+    """Runs OCR in the process pool, rejecting work once VIN_OCR_MAX_QUEUE scans are in flight."""
+    global _in_flight
+    if _in_flight >= VIN_OCR_MAX_QUEUE:
+        raise OcrBusy()
+    _in_flight += 1
+    try:
+        loop = asyncio.get_running_loop()
+        # One retry on a fresh pool; an image that kills the worker again propagates BrokenProcessPool
+        for attempt in range(2):
+            pool = _get_pool()
+            try:
+                return await loop.run_in_executor(pool, ocr_vin, image_bytes)
+            except BrokenProcessPool:
+                _discard_pool(pool)
+                if attempt:
+                    raise
+    finally:
+        _in_flight -= 1
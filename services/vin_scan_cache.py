@@ -0,0 +1,88 @@
+import os
+import io
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+from PIL import Image, ImageOps
+
+# --- Config ---
+VIN_SCAN_CACHE_SIZE = int(os.getenv("VIN_SCAN_CACHE_SIZE", "1024"))
+VIN_SCAN_CACHE_TTL = float(os.getenv("VIN_SCAN_CACHE_TTL", "3600"))        # seconds
+VIN_SCAN_HASH_DISTANCE = int(os.getenv("VIN_SCAN_HASH_DISTANCE", "4"))     # max differing bits of the 64-bit dHash
+
+
+def perceptual_hash(image_bytes: bytes) -> int:
+    """
+    64-bit difference hash of the normalized image (orientation, grayscale, 9x8 thumbnail):
+    re-encoded, resized or slightly recompressed copies of a photo land within a few bits.
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    image.draft("L", (64, 64))  # JPEG: decode at reduced size, much cheaper than a full decode
+    image = ImageOps.exif_transpose(image).convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = list(image.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+
+class VinScanCache:
+    """
+    OCR results of recent scans, looked up by exact content hash first and then by perceptual-hash
+    Hamming distance among the same user's scans only: a near-identical photo from someone else may
+    be another vehicle's plate. LRU with a TTL; bounded to `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = VIN_SCAN_CACHE_SIZE, ttl: float = VIN_SCAN_CACHE_TTL, max_distance: int = VIN_SCAN_HASH_DISTANCE):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        # sha256 -> (expires, user_id, phash, vin_text); user_id/phash are None for anonymous scans
+        self._entries: "OrderedDict[str, Tuple[float, Optional[int], Optional[int], str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def get(self, sha: str) -> Optional[str]:
+        """Exact match on the upload's content hash."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(sha)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(sha)
+                self.hits += 1
+                return entry[3]
+            if entry:
+                del self._entries[sha]
+            self.misses += 1  # near_hits counts how many of these a similar photo answered
+            return None
+
+    def get_similar(self, user_id: int, phash: int) -> Optional[str]:
+        """Closest live entry of `user_id` within `max_distance` bits of the perceptual hash."""
+        now = time.monotonic()
+        with self._lock:
+            best_key, best_distance = None, self.max_distance + 1
+            for key, (expires, owner, other, _) in self._entries.items():
+                if owner != user_id or expires <= now:
+                    continue
+                distance = bin(phash ^ other).count("1")
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            self.near_hits += 1
+            return self._entries[best_key][3]
+
+    def put(self, sha: str, vin_text: str, user_id: Optional[int] = None, phash: Optional[int] = None) -> None:
+        with self._lock:
+            self._entries[sha] = (time.monotonic() + self.ttl, user_id, phash, vin_text)
+            self._entries.move_to_end(sha)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+vin_scan_cache = VinScanCache()